@@ -0,0 +1,186 @@
+"""
+Daily agronomic indices from Open-Meteo hourly forecasts, computed with
+NumPy over a (locations, hours) matrix so a whole cooperative or the
+prefetch job can be analysed in one pass.
+"""
+import numpy as np
+
+HOURS_PER_DAY = 24
+
+# Growing degree days, modified method: hourly extremes are clipped to
+# [GDD_BASE, GDD_CAP] (defaults suit maize, sorghum and most tropical crops)
+GDD_BASE = 10.0
+GDD_CAP = 30.0
+RAIN_WINDOW_DAYS = 3
+DRY_DAY_MM = 1.0
+
+# An hour counts towards leaf wetness when the air is near saturation or it
+# rains, inside the 15-30 degC band where most fungal pathogens infect.
+WET_HOUR_HUMIDITY = 90.0
+WET_HOUR_RAIN_MM = 0.1
+INFECTION_TEMPERATURE = (15.0, 30.0)
+# Daily wet hours from which the disease risk is "moderate" / "high"
+RISK_THRESHOLDS = (6, 10)
+RISK_LEVELS = np.array(["low", "moderate", "high"])
+
+FIELDS = {
+    "temperature_2m": "temperature",
+    "precipitation": "precipitation",
+    "soil_moisture_0_to_7cm": "soil_moisture",
+    "relative_humidity_2m": "humidity",
+}
+
+
+def hourly_matrix(forecasts):
+    """
+    Stack the hourly series of `forecasts` into (locations, hours) float
+    arrays, covering the whole days of the longest forecast. Shorter (or
+    empty) forecasts are padded, so one bad location does not cut the
+    others short; missing values and variables become NaN.
+    """
+    hourly = [forecast.get("hourly") or {} for forecast in forecasts]
+    longest = max(hourly, key=lambda h: len(h.get("temperature_2m") or ()))
+    hours = len(longest.get("temperature_2m") or ()) // HOURS_PER_DAY * HOURS_PER_DAY
+
+    def row(values):
+        if not values:
+            return [None] * hours
+        # Copying every list costs as much as the conversion; only trim or pad when needed
+        if len(values) < hours:
+            # A short forecast's partial last day is dropped like anyone else's
+            whole = len(values) // HOURS_PER_DAY * HOURS_PER_DAY
+            return values[:whole] + [None] * (hours - whole)
+        return values if len(values) == hours else values[:hours]
+
+    matrix = {}
+    for source, name in FIELDS.items():
+        rows = [row(h.get(source)) for h in hourly]
+        # None (a gap in the model output) converts to NaN
+        matrix[name] = np.array(rows, dtype=np.float64).reshape(len(hourly), hours)
+    times = longest.get("time") or []
+    matrix["dates"] = [stamp[:10] for stamp in times[:hours:HOURS_PER_DAY]]
+    return matrix
+
+
+# np.nanmin & co. warn on all-NaN days; fill instead and put NaN back for those days
+def _daily_min(hourly):
+    missing = np.isnan(hourly)
+    return np.where(missing.all(axis=2), np.nan, np.where(missing, np.inf, hourly).min(axis=2))
+
+
+def _daily_max(hourly):
+    missing = np.isnan(hourly)
+    return np.where(missing.all(axis=2), np.nan, np.where(missing, -np.inf, hourly).max(axis=2))
+
+
+def _daily_mean(hourly):
+    count = (~np.isnan(hourly)).sum(axis=2)
+    total = np.nansum(hourly, axis=2)
+    return np.divide(total, count, out=np.full(total.shape, np.nan), where=count > 0)
+
+
+def _rolling_sum(daily, window):
+    csum = np.cumsum(np.nan_to_num(daily), axis=1)
+    rolled = csum.copy()
+    rolled[:, window:] -= csum[:, :-window]
+    return rolled
+
+
+def _dry_run_lengths(dry):
+    """Consecutive dry days ending on each day: [T, T, F, T] -> [1, 2, 0, 1]."""
+    days = np.arange(dry.shape[1])
+    last_wet = np.maximum.accumulate(np.where(dry, -1, days), axis=1)
+    return days - last_wet
+
+
+def analyze(forecasts, gdd_base=GDD_BASE, gdd_cap=GDD_CAP, rain_window=RAIN_WINDOW_DAYS, dry_day_mm=DRY_DAY_MM):
+    """
+    Daily indices for every forecast, as (locations, days) arrays:
+    temperature min/max/mean, precipitation, rolling rainfall, soil
+    moisture, GDD (daily and cumulative), dry-spell length, wet hours and
+    disease risk level. Days with no data are NaN.
+    """
+    matrix = hourly_matrix(forecasts)
+    n = matrix["temperature"].shape[0]
+
+    def by_day(values):
+        return values.reshape(n, -1, HOURS_PER_DAY)
+
+    temperature = by_day(matrix["temperature"])
+    precipitation = by_day(matrix["precipitation"])
+    humidity = by_day(matrix["humidity"])
+
+    t_min, t_max, t_mean = _daily_min(temperature), _daily_max(temperature), _daily_mean(temperature)
+    soil = _daily_mean(by_day(matrix["soil_moisture"]))
+    rain = np.where(np.isnan(precipitation).all(axis=2), np.nan, np.nansum(precipitation, axis=2))
+
+    gdd = (np.clip(t_max, gdd_base, gdd_cap) + np.clip(t_min, gdd_base, gdd_cap)) / 2 - gdd_base
+
+    # NaN compares False, so gaps never count as wet
+    low, high = INFECTION_TEMPERATURE
+    wet = (humidity >= WET_HOUR_HUMIDITY) | (precipitation >= WET_HOUR_RAIN_MM)
+    wet_hours = (wet & (temperature >= low) & (temperature <= high)).sum(axis=2)
+
+    # Rounded so float noise in the sum (0.7 + 0.3 mm) cannot make a day dry;
+    # days without data end a dry spell rather than extend it
+    dry_spell = _dry_run_lengths((np.round(np.nan_to_num(rain), 6) < dry_day_mm) & ~np.isnan(rain))
+
+    return {
+        "dates": matrix["dates"],
+        "temperature_min": t_min,
+        "temperature_max": t_max,
+        "temperature_mean": t_mean,
+        "precipitation": rain,
+        "rain_rolling": _rolling_sum(rain, rain_window),
+        "soil_moisture": soil,
+        "gdd": gdd,
+        "gdd_cumulative": np.cumsum(np.nan_to_num(gdd), axis=1),
+        "dry_spell_days": dry_spell,
+        "wet_hours": wet_hours,
+        "disease_risk": RISK_LEVELS[np.searchsorted(RISK_THRESHOLDS, wet_hours, side="right")],
+    }
+
+
+def _rows(values, decimals):
+    """(locations, days) array -> list of JSON-ready lists, NaN as None."""
+    if values.dtype.kind != "f":
+        return values.tolist()
+    rounded = np.round(values, decimals)
+    rows = rounded.tolist()
+    for i in np.flatnonzero(np.isnan(rounded).any(axis=1)):
+        rows[i] = [None if v != v else v for v in rows[i]]
+    return rows
+
+
+def to_json(result, decimals=2):
+    """
+    Columnar JSON for every location of an analyze() result: per location,
+    one list per index aligned with "dates", plus an outlook over the whole
+    period. Arrays are converted once for all locations, not per location.
+    """
+    names = [name for name in result if name != "dates"]
+    columns = {name: _rows(result[name], decimals) for name in names}
+
+    days = len(result["dates"])
+    rain_total = np.round(np.nansum(result["precipitation"], axis=1), 2).tolist()
+    gdd_total = np.round(result["gdd_cumulative"][:, -1], 1).tolist() if days else [0.0] * len(rain_total)
+    longest_dry = result["dry_spell_days"].max(axis=1, initial=0).tolist()
+    high_risk = (result["disease_risk"] == "high").sum(axis=1).tolist()
+
+    return [
+        {
+            "daily": {"dates": result["dates"], **{name: columns[name][i] for name in names}},
+            "outlook": {
+                "gdd_total": gdd_total[i],
+                "rain_total": rain_total[i],
+                "longest_dry_spell_days": longest_dry[i],
+                "high_risk_days": high_risk[i],
+            },
+        }
+        for i in range(len(rain_total))
+    ]
+
+
+def summarize(forecast, **options):
+    """Columnar daily analytics for a single forecast."""
+    return to_json(analyze([forecast], **options))[0]
@@ -0,0 +1,103 @@
+"""
+Daily agronomic analytics for many locations: one vectorized analyze()
+over all forecasts vs. one call per location vs. a plain-Python loop over
+the hourly lists (the way the dashboard summed precipitation before).
+
+Run from the project root:
+    python -m analytics.benchmarks.bench_agronomy [--locations 10000]
+"""
+import argparse
+import json
+import random
+import time
+
+from analytics import agronomy
+
+
+def synthetic_forecasts(count, days=7, seed=0):
+    """Open-Meteo shaped JSON (lists of floats with occasional gaps)."""
+    rng = random.Random(seed)
+    hours = 24 * days
+    times = [f"2026-06-{1 + h // 24:02d}T{h % 24:02d}:00" for h in range(hours)]
+    forecasts = []
+    for _ in range(count):
+        base = rng.uniform(15, 30)
+        forecasts.append({"hourly": {
+            "time": times,
+            "temperature_2m": [round(base + 6 * rng.random() - 3 * (h % 24 < 6), 1) for h in range(hours)],
+            "precipitation": [round(rng.expovariate(2), 1) if rng.random() < 0.1 else 0.0 for _ in range(hours)],
+            "relative_humidity_2m": [rng.randint(40, 100) for _ in range(hours)],
+            "soil_moisture_0_to_7cm": [None if rng.random() < 0.01 else round(rng.uniform(0.1, 0.4), 3)
+                                       for _ in range(hours)],
+        }})
+    return forecasts
+
+
+def python_loop(forecasts):
+    """Reference: the same daily indices with lists and loops."""
+    low, high = agronomy.INFECTION_TEMPERATURE
+    out = []
+    for forecast in forecasts:
+        hourly = forecast["hourly"]
+        days = len(hourly["temperature_2m"]) // 24
+        gdd_total, dry, longest, high_risk = 0.0, 0, 0, 0
+        for d in range(days):
+            window = slice(d * 24, d * 24 + 24)
+            temps = [t for t in hourly["temperature_2m"][window] if t is not None]
+            rain = sum(p for p in hourly["precipitation"][window] if p is not None)
+            t_min, t_max = min(temps), max(temps)
+            clip = lambda t: min(max(t, agronomy.GDD_BASE), agronomy.GDD_CAP)  # noqa: E731
+            gdd_total += (clip(t_max) + clip(t_min)) / 2 - agronomy.GDD_BASE
+            dry = dry + 1 if round(rain, 6) < agronomy.DRY_DAY_MM else 0
+            longest = max(longest, dry)
+            wet = sum(
+                1 for t, p, rh in zip(hourly["temperature_2m"][window], hourly["precipitation"][window],
+                                      hourly["relative_humidity_2m"][window])
+                if t is not None and low <= t <= high
+                and ((rh or 0) >= agronomy.WET_HOUR_HUMIDITY or (p or 0) >= agronomy.WET_HOUR_RAIN_MM)
+            )
+            high_risk += wet >= agronomy.RISK_THRESHOLDS[1]
+        out.append((round(gdd_total, 1), longest, high_risk))
+    return out
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--locations", type=int, default=10000)
+    args = parser.parse_args()
+
+    forecasts = synthetic_forecasts(args.locations)
+    print(f"{args.locations} locations x {len(forecasts[0]['hourly']['time'])} hours")
+
+    result, vectorized = timed(agronomy.analyze, forecasts)
+    payload, to_json = timed(agronomy.to_json, result)
+    _, per_location = timed(lambda: [agronomy.summarize(f) for f in forecasts])
+    reference, loop = timed(python_loop, forecasts)
+
+    # Same answers as the reference loop
+    for i, (gdd_total, longest, high_risk) in enumerate(reference):
+        outlook = payload[i]["outlook"]
+        # Both sides are rounded to 0.1, so they may land one step apart
+        assert abs(outlook["gdd_total"] - gdd_total) <= 0.1 + 1e-9, (i, outlook, gdd_total)
+        assert (outlook["longest_dry_spell_days"], outlook["high_risk_days"]) == (longest, high_risk), i
+
+    size = len(json.dumps(payload[0]))
+    print(f"{'method':<28} {'total s':>8} {'us/location':>12}")
+    for name, seconds in (
+        ("analyze() all at once", vectorized),
+        ("  + columnar JSON", vectorized + to_json),
+        ("summarize() per location", per_location),
+        ("plain Python loop", loop),
+    ):
+        print(f"{name:<28} {seconds:>8.3f} {seconds / len(forecasts) * 1e6:>12.1f}")
+    print(f"columnar JSON per location: {size} bytes")
+
+
+if __name__ == "__main__":
+    main()
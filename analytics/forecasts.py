@@ -0,0 +1,211 @@
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+
+from utils import background
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastUnavailable(Exception):
+    """No prefetched forecast for this cell yet."""
+
+
+def grid_cell(lat, lon, size):
+    """
+    Snap coordinates to the center of a `size`-degree grid cell. Farmers in
+    the same cell share one forecast, fetched for the cell center.
+    """
+    def snap(value):
+        return round((math.floor(value / size) + 0.5) * size, 6)
+
+    return snap(lat), snap(lon)
+
+
+def fresh_until(now, interval, lag):
+    """
+    End of the current model cycle: the provider publishes a new run every
+    `interval` seconds, available `lag` seconds after the boundary.
+    """
+    return (math.floor((now - lag) / interval) + 1) * interval + lag
+
+
+class SingleFlight:
+    """Concurrent calls for the same key share one execution of `fn`."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Returns (result, shared): `shared` is True when another caller did the work."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class ForecastCache:
+    """
+    Forecasts per grid cell in the Django cache.
+
+    An entry is fresh until the provider's next model update, then served
+    stale (for at most `stale_ttl` seconds) while one background refresh
+    replaces it. Misses in this process are single-flighted, so concurrent
+    requests for a cell make one upstream call.
+
+    With `prefetched`, entries are only written by store() (see prefetch.py):
+    get() never calls upstream and raises ForecastUnavailable on a miss.
+    """
+
+    def __init__(self, fetch, grid_size=0.1, interval=3600, lag=900, stale_ttl=6 * 3600,
+                 prefix="forecast", cache_alias="default", prefetched=False, fetch_concurrency=8):
+        self.fetch = fetch
+        self.grid_size = grid_size
+        self.interval = interval
+        self.lag = lag
+        self.stale_ttl = stale_ttl
+        self.prefix = prefix
+        self.cache_alias = cache_alias
+        self.prefetched = prefetched
+        self.fetch_concurrency = fetch_concurrency
+        self._flight = SingleFlight()
+        self._counter_lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def key(self, cell):
+        return f"{self.prefix}:{cell[0]}:{cell[1]}"
+
+    def cell(self, lat, lon):
+        return grid_cell(lat, lon, self.grid_size)
+
+    def get(self, lat, lon):
+        """Forecast for the cell containing (lat, lon). Upstream errors on a miss propagate."""
+        cell = self.cell(lat, lon)
+        key = self.key(cell)
+        entry = self.cache.get(key)
+        now = time.time()
+
+        if entry is not None and now < entry["fresh_until"]:
+            self._count("hits")
+            return entry["data"]
+
+        if entry is not None:
+            self._count("stale_hits")
+            if not self.prefetched:
+                self._revalidate(key, cell)
+            return entry["data"]
+
+        self._count("misses")
+        if self.prefetched:
+            raise ForecastUnavailable(f"No forecast prefetched for {cell} yet")
+        data, shared = self._flight.do(key, lambda: self._refresh(key, cell))
+        if shared:
+            self._count("coalesced")
+        return data
+
+    def get_many(self, cells):
+        """
+        Forecasts for several grid cells: {cell: forecast or the exception
+        raised}. Cached cells are read in one round trip; cells missing from
+        the cache are fetched upstream concurrently, `fetch_concurrency` at
+        a time.
+        """
+        cells = list(cells)
+        cached = self.cache.get_many([self.key(cell) for cell in cells])
+        cold = [cell for cell in cells if self.key(cell) not in cached]
+
+        def get(cell):
+            try:
+                return self.get(*cell)
+            except Exception as e:
+                return e
+
+        results = {}
+        if len(cold) > 1 and not self.prefetched:
+            with ThreadPoolExecutor(max_workers=min(self.fetch_concurrency, len(cold)), thread_name_prefix="forecast") as pool:
+                results.update(zip(cold, pool.map(get, cold)))
+        return {cell: results[cell] if cell in results else get(cell) for cell in cells}
+
+    def store(self, cell, data, now=None):
+        now = time.time() if now is None else now
+        expires = fresh_until(now, self.interval, self.lag)
+        entry = {"data": data, "fresh_until": expires, "fetched_at": now}
+        self.cache.set(self.key(cell), entry, timeout=max(1, int(expires + self.stale_ttl - now)))
+
+    def _refresh(self, key, cell):
+        self._count("upstream_calls")
+        try:
+            data = self.fetch(*cell)
+        except Exception:
+            self._count("upstream_errors")
+            raise
+        self.store(cell, data)
+        return data
+
+    def _revalidate(self, key, cell):
+        # One refresh per cell across processes; others keep serving stale
+        if not self.cache.add(f"{key}:refreshing", 1, timeout=60):
+            return
+
+        def refresh():
+            try:
+                self._flight.do(key, lambda: self._refresh(key, cell))
+            except Exception as e:
+                logger.warning(f"Forecast refresh for {cell} failed, serving stale data: {e}")
+            finally:
+                self.cache.delete(f"{key}:refreshing")
+
+        background.submit(refresh)
+
+    def _count(self, name):
+        with self._counter_lock:
+            self._stats[name] += 1
+
+    def reset_stats(self):
+        self._stats = dict.fromkeys(
+            ("hits", "stale_hits", "misses", "coalesced", "upstream_calls", "upstream_errors"), 0
+        )
+
+    def stats(self):
+        with self._counter_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else None
+        return stats
+
+
+def cache_from_settings(fetch):
+    return ForecastCache(
+        fetch,
+        grid_size=getattr(settings, "ANALYTICS_FORECAST_GRID_DEG", 0.1),
+        interval=getattr(settings, "ANALYTICS_FORECAST_UPDATE_INTERVAL", 3600),
+        lag=getattr(settings, "ANALYTICS_FORECAST_UPDATE_LAG", 900),
+        stale_ttl=getattr(settings, "ANALYTICS_FORECAST_STALE_TTL", 6 * 3600),
+        cache_alias="analytics" if "analytics" in settings.CACHES else "default",
+        prefetched=getattr(settings, "ANALYTICS_FORECAST_PREFETCHED", False),
+        fetch_concurrency=getattr(settings, "ANALYTICS_FORECAST_FETCH_CONCURRENCY", 8),
+    )
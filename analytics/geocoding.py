@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GeocodeEntry
+
+
+def location_key(city, state=None, country=None):
+    """'  Ibadan ', 'Oyo', 'Nigeria' -> 'ibadan|oyo|nigeria'."""
+    return "|".join(" ".join((value or "").split()).lower() for value in (city, state, country))
+
+
+def stored_coordinates(keys, chunk_size=500):
+    """
+    key -> (lat, lon) for the `keys` already in the GeocodeEntry table (both
+    None for places the geocoder could not find), one query per `chunk_size` keys.
+    """
+    keys = list(keys)
+    coordinates = {}
+    for start in range(0, len(keys), chunk_size):
+        entries = GeocodeEntry.objects.filter(key__in=keys[start:start + chunk_size])
+        coordinates.update((e.key, (e.latitude, e.longitude)) for e in entries.only("key", "latitude", "longitude"))
+    return coordinates
+
+
+class GeocodeCache:
+    """
+    Two-level cache in front of a geocoder: an in-process LRU, then the
+    GeocodeEntry table shared by all workers. `fetch(city, state, country)`
+    is only called on a miss in both (or when refreshing), and "not found"
+    answers are kept for `negative_ttl` so a misspelt city is not looked up
+    on every request.
+    """
+
+    def __init__(self, fetch, max_entries=1024, negative_ttl=timedelta(days=1)):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # key -> ((lat, lon), cached_at)
+        self._lock = threading.Lock()
+
+    def get(self, city, state=None, country=None, refresh=False):
+        key = location_key(city, state, country)
+        if not refresh:
+            coords = self._memory_get(key)
+            if coords is not None:
+                return coords
+
+            entry = GeocodeEntry.objects.filter(key=key).first()
+            if entry is not None and self._fresh(entry.latitude, entry.updated_at):
+                coords = (entry.latitude, entry.longitude)
+                self._memory_set(key, coords, entry.updated_at)
+                return coords
+
+        coords = self.fetch(city, state, country)
+        if coords is None:
+            # Upstream error: nothing to cache, try again next time
+            return None, None
+        GeocodeEntry.objects.update_or_create(key=key, defaults={"latitude": coords[0], "longitude": coords[1]})
+        self._memory_set(key, coords, timezone.now())
+        return coords
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _fresh(self, latitude, cached_at):
+        return latitude is not None or timezone.now() - cached_at < self.negative_ttl
+
+    def _memory_get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            coords, cached_at = item
+            if not self._fresh(coords[0], cached_at):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return coords
+
+    def _memory_set(self, key, coords, cached_at):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (coords, cached_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def cache_from_settings(fetch):
+    return GeocodeCache(
+        fetch,
+        max_entries=getattr(settings, "ANALYTICS_GEOCODE_LRU_SIZE", 1024),
+        negative_ttl=timedelta(seconds=getattr(settings, "ANALYTICS_GEOCODE_NEGATIVE_TTL", 86400)),
+    )
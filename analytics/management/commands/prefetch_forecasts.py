@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from analytics.prefetch import prefetch
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch the weather forecast for every grid cell with an active farmer and store it in "
+        "the analytics cache. Schedule it once per forecast update interval (e.g. hourly cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.ANALYTICS_PREFETCH_BATCH_SIZE,
+                            help="Grid cells per Open-Meteo request.")
+        parser.add_argument("--concurrency", type=int, default=settings.ANALYTICS_PREFETCH_CONCURRENCY,
+                            help="Requests in flight at once.")
+        parser.add_argument(
+            "--skip-geocoding",
+            action="store_true",
+            help="Only use locations already in the geocode table.",
+        )
+
+    def handle(self, *args, **options):
+        summary = prefetch(
+            batch_size=options["batch_size"],
+            concurrency=options["concurrency"],
+            geocode_missing=not options["skip_geocoding"],
+        )
+
+        message = (
+            f"{summary['locations']} farmer locations in {summary['cells']} cells: "
+            f"{summary['stored']} forecasts stored in {summary['requests']} requests, {summary['failed']} failed"
+        )
+        if summary["failed"]:
+            self.stderr.write(message)
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
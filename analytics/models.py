@@ -1,3 +1,16 @@
 from django.db import models
 
-# Create your models here.
+
+class GeocodeEntry(models.Model):
+    """
+    Coordinates for a normalized "city|state|country" key, so the geocoding
+    API is called once per place rather than on every dashboard load.
+    Null coordinates record a lookup that found nothing.
+    """
+    key = models.CharField(max_length=400, unique=True)
+    latitude = models.FloatField(null=True)
+    longitude = models.FloatField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.latitude}, {self.longitude}"
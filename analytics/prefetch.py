@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from collections import Counter
+
+import httpx
+from django.contrib.auth import get_user_model
+
+from .geocoding import location_key, stored_coordinates
+from .services import WeatherAnalyticsService, forecast_cache, geocode_cache
+
+logger = logging.getLogger(__name__)
+
+
+def farmer_locations():
+    """Distinct (city, state, country) of active farmers, keyed by geocode key."""
+    rows = (
+        get_user_model().objects
+        .filter(role="farmer", is_active=True)
+        .exclude(city__isnull=True).exclude(city="")
+        .values_list("city", "state", "country")
+        .distinct()
+    )
+    # Case and spacing variants of a place collapse onto one key
+    return {location_key(*row): row for row in rows}
+
+
+def farmer_cells(geocode_missing=True):
+    """
+    Grid cell -> number of distinct farmer locations in it. Coordinates come
+    from the GeocodeEntry table; places not geocoded yet are looked up once
+    (unless `geocode_missing` is False) and skipped when unknown.
+    """
+    locations = farmer_locations()
+    coordinates = stored_coordinates(locations)
+
+    cells = Counter()
+    for key, location in locations.items():
+        if key not in coordinates and geocode_missing:
+            coordinates[key] = geocode_cache.get(*location)
+        lat, lon = coordinates.get(key, (None, None))
+        if lat is not None and lon is not None:
+            cells[forecast_cache.cell(lat, lon)] += 1
+    return cells
+
+
+async def fetch_cells(cells, batch_size=50, concurrency=4, timeout=30):
+    """
+    Forecasts for `cells` using Open-Meteo's multi-coordinate requests
+    (`batch_size` cells per request, at most `concurrency` in flight).
+    Returns ({cell: forecast}, [(batch, error)]).
+    """
+    batches = [cells[start:start + batch_size] for start in range(0, len(cells), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def fetch(batch):
+            params = {
+                "latitude": ",".join(str(lat) for lat, _ in batch),
+                "longitude": ",".join(str(lon) for _, lon in batch),
+                **WeatherAnalyticsService.FORECAST_PARAMS,
+            }
+            async with semaphore:
+                response = await client.get(WeatherAnalyticsService.WEATHER_URL, params=params)
+            response.raise_for_status()
+            data = response.json()
+            # One location comes back as an object, several as a list in request order
+            data = data if isinstance(data, list) else [data]
+            if len(data) != len(batch):
+                raise ValueError(f"Expected {len(batch)} forecasts, got {len(data)}")
+            return dict(zip(batch, data))
+
+        results = await asyncio.gather(*(fetch(batch) for batch in batches), return_exceptions=True)
+
+    forecasts, errors = {}, []
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            errors.append((batch, result))
+        else:
+            forecasts.update(result)
+    return forecasts, errors
+
+
+def prefetch(batch_size=50, concurrency=4, geocode_missing=True):
+    """Fetch and cache the forecast of every farmer grid cell. Returns a summary."""
+    cells = farmer_cells(geocode_missing=geocode_missing)
+    forecasts, errors = asyncio.run(fetch_cells(sorted(cells), batch_size, concurrency))
+    for cell, data in forecasts.items():
+        forecast_cache.store(cell, data)
+    for batch, error in errors:
+        logger.warning(f"Forecast prefetch failed for {len(batch)} cells: {error}")
+
+    return {
+        "locations": sum(cells.values()),
+        "cells": len(cells),
+        "requests": -(-len(cells) // batch_size),
+        "stored": len(forecasts),
+        "failed": len(cells) - len(forecasts),
+    }
@@ -1,13 +1,51 @@
-import requests
+import logging
+
 from django.conf import settings
+from django.db.models import Count
+
+from utils import background, http_client
+
+from . import agronomy, forecasts, geocoding
+
+logger = logging.getLogger(__name__)
+
 
 class WeatherAnalyticsService:
     GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
     WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+    FORECAST_PARAMS = {
+        "hourly": "temperature_2m,precipitation,soil_moisture_0_to_7cm,relative_humidity_2m",
+        # Local midnight-aligned hours, so every 24 values are one day (see agronomy.py)
+        "timezone": "auto",
+        "forecast_days": 7,
+    }
+    GEOCODE_PENDING_TTL = 300
 
     @staticmethod
-    def get_coordinates(city, state=None, country=None):
-        """Convert city, state, country into lat/lon using Open-Meteo Geocoding API."""
+    def get_coordinates(city, state=None, country=None, refresh=False):
+        """
+        lat/lon for a profile location. Served from the geocode cache; the
+        API is only called for places not seen before (or with `refresh`).
+        """
+        return geocode_cache.get(city, state, country, refresh=refresh)
+
+    @staticmethod
+    def geocode_in_background(city, state=None, country=None):
+        """
+        Geocode a new place off the request path. Repeated requests for a
+        place that is still pending queue it once per GEOCODE_PENDING_TTL,
+        across workers (the marker lives in the shared analytics cache).
+        """
+        marker = f"geocode-pending:{geocoding.location_key(city, state, country)}"
+        if forecast_cache.cache.add(marker, 1, timeout=WeatherAnalyticsService.GEOCODE_PENDING_TTL):
+            background.submit(WeatherAnalyticsService.get_coordinates, city, state, country)
+
+    @staticmethod
+    def fetch_coordinates(city, state=None, country=None):
+        """
+        Convert city, state, country into lat/lon using Open-Meteo Geocoding API.
+        Returns (None, None) when the place is unknown and None on API errors.
+        """
         # Open-Meteo searches by 'name' (city) primarily. 
         # Adding state/country to the name often fails if the format isn't exact.
         # It's safer to search by city name and filter/trust the top result, 
@@ -21,7 +59,7 @@ class WeatherAnalyticsService:
         }
         
         try:
-            response = requests.get(WeatherAnalyticsService.GEOCODING_URL, params=params, timeout=10)
+            response = http_client.get(WeatherAnalyticsService.GEOCODING_URL, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -31,42 +69,57 @@ class WeatherAnalyticsService:
                 result = data["results"][0]
                 return result["latitude"], result["longitude"]
         except Exception as e:
-            print(f"Geocoding error: {e}")
-        
+            logger.warning(f"Geocoding {city!r} failed: {e}")
+            return None
+
         return None, None
 
+    @staticmethod
+    def fetch_forecast(lat, lon):
+        """7-day hourly forecast from the Open-Meteo API. Raises on errors."""
+        params = {"latitude": lat, "longitude": lon, **WeatherAnalyticsService.FORECAST_PARAMS}
+        response = http_client.get(WeatherAnalyticsService.WEATHER_URL, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def current_stats(data):
+        """Current temperature and soil moisture, and total rainfall over the forecast."""
+        hourly = data.get("hourly", {})
+        return {
+            "temperature": hourly.get("temperature_2m", [0])[0],
+            "soil_moisture": hourly.get("soil_moisture_0_to_7cm", [0])[0],
+            "expected_rainfall": round(sum(hourly.get("precipitation", [0])), 2),
+        }
+
     @staticmethod
     def get_farmer_analytics(user):
-        """Fetch weather and soil stats for a user's location."""
-        lat, lon = WeatherAnalyticsService.get_coordinates(
-            city=user.city,
-            state=user.state,
-            country=user.country
-        )
+        """
+        Fetch weather and soil stats for a user's location. Returns
+        {"pending": ..., "retry_after": seconds} while the location or its
+        forecast is not available locally yet (ANALYTICS_FORECAST_PREFETCHED).
+        """
+        location = (user.city, user.state, user.country)
+        if forecast_cache.prefetched:
+            # Only local data on the request path; the prefetch job covers the place once geocoded
+            key = geocoding.location_key(*location)
+            coordinates = geocoding.stored_coordinates([key]).get(key)
+            if coordinates is None:
+                WeatherAnalyticsService.geocode_in_background(*location)
+                return {
+                    "pending": "Your location is being set up; weather analytics will be available shortly.",
+                    "retry_after": WeatherAnalyticsService.GEOCODE_PENDING_TTL,
+                }
+            lat, lon = coordinates
+        else:
+            lat, lon = WeatherAnalyticsService.get_coordinates(*location)
 
         if not lat or not lon:
             return {"error": "Could not determine location coordinates."}
 
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "hourly": "temperature_2m,precipitation,soil_moisture_0_to_7cm",
-            "timezone": "auto",
-            "forecast_days": 7
-        }
-
         try:
-            response = requests.get(WeatherAnalyticsService.WEATHER_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            # Extract current or summary data
-            hourly = data.get("hourly", {})
-            
-            # Simple average/current stats for the dashboard
-            current_temp = hourly.get("temperature_2m", [0])[0]
-            current_soil_moisture = hourly.get("soil_moisture_0_to_7cm", [0])[0]
-            total_expected_rainfall = sum(hourly.get("precipitation", [0]))
+            # Shared by every farmer in the same grid cell (see forecasts.py)
+            data = forecast_cache.get(lat, lon)
 
             return {
                 "location": {
@@ -76,16 +129,90 @@ class WeatherAnalyticsService:
                     "latitude": lat,
                     "longitude": lon
                 },
-                "stats": {
-                    "temperature": current_temp,
-                    "soil_moisture": current_soil_moisture,
-                    "expected_rainfall": round(total_expected_rainfall, 2),
-                },
+                "stats": WeatherAnalyticsService.current_stats(data),
+                # Daily columns ("daily") and whole-period "outlook"
+                **agronomy.summarize(data),
                 "unit_details": {
                     "temperature": data.get("hourly_units", {}).get("temperature_2m", "°C"),
                     "soil_moisture": data.get("hourly_units", {}).get("soil_moisture_0_to_7cm", "m³/m³"),
-                    "precipitation": data.get("hourly_units", {}).get("precipitation", "mm")
+                    "precipitation": data.get("hourly_units", {}).get("precipitation", "mm"),
+                    "gdd": "°C·day",
                 }
             }
+        except forecasts.ForecastUnavailable:
+            return {
+                "pending": "The forecast for your area has not been fetched yet.",
+                "retry_after": forecast_cache.interval,
+            }
         except Exception as e:
             return {"error": f"Weather API error: {str(e)}"}
+
+    @staticmethod
+    def get_regional_analytics(users):
+        """
+        Weather and soil stats per forecast grid cell for a group of farmers
+        (e.g. a cooperative's members). Members are counted per place in one
+        query and coordinates read in one more, and each cell's forecast is
+        read once (cells not cached yet are fetched concurrently), so the
+        cost grows with distinct places, not members. Places that were
+        never geocoded are geocoded in the background and reported as
+        pending.
+        """
+        rows = (
+            users.exclude(city__isnull=True).exclude(city="")
+            .values_list("city", "state", "country")
+            .annotate(members=Count("id"))
+            .order_by()
+        )
+        places = {}
+        for city, state, country, members in rows:
+            key = geocoding.location_key(city, state, country)
+            place = places.setdefault(key, {"location": (city, state, country), "members": 0})
+            place["members"] += members
+
+        coordinates = geocoding.stored_coordinates(places)
+        cells = {}
+        totals = {"members": 0, "located": 0, "pending_geocoding": 0, "unlocated": 0}
+        for key, place in places.items():
+            totals["members"] += place["members"]
+            if key not in coordinates:
+                WeatherAnalyticsService.geocode_in_background(*place["location"])
+                totals["pending_geocoding"] += place["members"]
+                continue
+            lat, lon = coordinates[key]
+            if lat is None or lon is None:
+                totals["unlocated"] += place["members"]
+                continue
+
+            totals["located"] += place["members"]
+            cell = forecast_cache.cell(lat, lon)
+            entry = cells.setdefault(cell, {"latitude": cell[0], "longitude": cell[1], "members": 0, "locations": []})
+            entry["members"] += place["members"]
+            entry["locations"].append(", ".join(part for part in place["location"] if part))
+
+        forecasts = {}
+        for cell, result in forecast_cache.get_many(cells).items():
+            if isinstance(result, Exception):
+                cells[cell]["error"] = f"Weather API error: {str(result)}"
+            else:
+                forecasts[cell] = result
+
+        # One vectorized pass over every cell with a forecast
+        if forecasts:
+            outlooks = agronomy.to_json(agronomy.analyze(list(forecasts.values())))
+            for (cell, data), analytics in zip(forecasts.items(), outlooks):
+                cells[cell]["stats"] = WeatherAnalyticsService.current_stats(data)
+                cells[cell]["outlook"] = analytics["outlook"]
+
+        totals["cells"] = len(cells)
+        totals["members_at_disease_risk"] = sum(
+            entry["members"] for entry in cells.values() if entry.get("outlook", {}).get("high_risk_days")
+        )
+        return {
+            "totals": totals,
+            "cells": sorted(cells.values(), key=lambda entry: -entry["members"]),
+        }
+
+
+geocode_cache = geocoding.cache_from_settings(WeatherAnalyticsService.fetch_coordinates)
+forecast_cache = forecasts.cache_from_settings(WeatherAnalyticsService.fetch_forecast)
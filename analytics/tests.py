@@ -1,3 +1,494 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from io import StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import agronomy
+from utils.http_client import CircuitOpenError, HttpClient
+
+from .forecasts import ForecastCache, fresh_until, grid_cell
+from .models import GeocodeEntry
+from .services import WeatherAnalyticsService, forecast_cache, geocode_cache
+
+PLACES = {"ibadan": (7.3776, 3.9470), "kano": (12.0022, 8.5920)}
+
+
+class StubOpenMeteo(BaseHTTPRequestHandler):
+    """Local stand-in for the geocoding and forecast APIs."""
+
+    calls = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.calls.append(url.path)
+
+        if url.path == "/geocoding":
+            place = PLACES.get(query["name"][0].strip().lower())
+            body = {"results": [{"latitude": place[0], "longitude": place[1]}]} if place else {}
+        else:
+            forecast = {
+                "hourly": {
+                    "temperature_2m": [27.5, 28.0],
+                    "precipitation": [0.5, 1.25],
+                    "soil_moisture_0_to_7cm": [0.31, 0.30],
+                },
+            }
+            # Several comma-separated coordinates get a list, like the real API
+            coordinates = query["latitude"][0].split(",")
+            body = [forecast] * len(coordinates) if len(coordinates) > 1 else forecast
+
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+LOCMEM = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, CACHES={"default": LOCMEM, "analytics": LOCMEM})
+class OpenMeteoTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenMeteo)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.patches = [
+            patch.object(WeatherAnalyticsService, "GEOCODING_URL", f"{base}/geocoding"),
+            patch.object(WeatherAnalyticsService, "WEATHER_URL", f"{base}/forecast"),
+        ]
+        for p in cls.patches:
+            p.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for p in cls.patches:
+            p.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StubOpenMeteo.calls.clear()
+        geocode_cache.clear()
+        # Both aliases are private LocMem caches in these tests
+        caches["analytics"].clear()
+        forecast_cache.reset_stats()
+        self.user = get_user_model().objects.create_user(
+            email="farmer@example.com", password="password", city="Ibadan", state="Oyo", country="Nigeria"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+
+class GeocodeCacheTests(OpenMeteoTestCase):
+    def geocoding_calls(self):
+        return StubOpenMeteo.calls.count("/geocoding")
+
+    def test_dashboard_geocodes_a_location_once(self):
+        for _ in range(3):
+            response = self.client.get("/analytics/farmer-stats")
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["location"]["latitude"], 7.3776)
+        self.assertEqual(response.data["stats"]["expected_rainfall"], 1.75)
+        self.assertIn("outlook", response.data)
+        self.assertEqual(self.geocoding_calls(), 1)
+
+        # A new process (empty LRU) is served from the table
+        geocode_cache.clear()
+        self.assertEqual(WeatherAnalyticsService.get_coordinates(" ibadan ", "OYO", "nigeria"), (7.3776, 3.9470))
+        self.assertEqual(self.geocoding_calls(), 1)
+
+    def test_unknown_places_are_cached_as_misses(self):
+        self.assertEqual(WeatherAnalyticsService.get_coordinates("Atlantis"), (None, None))
+        self.assertEqual(WeatherAnalyticsService.get_coordinates("Atlantis"), (None, None))
+        self.assertEqual(self.geocoding_calls(), 1)
+        self.assertIsNone(GeocodeEntry.objects.get(key="atlantis||").latitude)
+
+    def test_profile_location_change_geocodes_the_new_place(self):
+        response = self.client.patch("/users/me", {"city": "Kano", "state": "Kano"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.geocoding_calls(), 1)
+        self.assertTrue(GeocodeEntry.objects.filter(key="kano|kano|nigeria").exists())
+
+        self.client.get("/analytics/farmer-stats")
+        self.assertEqual(self.geocoding_calls(), 1)
+
+        # Other profile edits do not touch the geocoder
+        self.client.patch("/users/me", {"first_name": "Ade"}, format="json")
+        self.assertEqual(self.geocoding_calls(), 1)
+
+
+class ForecastCacheTests(OpenMeteoTestCase):
+    def test_farmers_in_one_cell_share_a_forecast(self):
+        neighbour = get_user_model().objects.create_user(
+            email="neighbour@example.com", password="password", city="Ibadan", state="Oyo", country="Nigeria"
+        )
+        self.client.get("/analytics/farmer-stats")
+        self.client.force_authenticate(user=neighbour)
+        response = self.client.get("/analytics/farmer-stats")
+
+        self.assertEqual(response.data["stats"]["expected_rainfall"], 1.75)
+        self.assertEqual(StubOpenMeteo.calls.count("/forecast"), 1)
+        stats = forecast_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["upstream_calls"]), (1, 1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_concurrent_misses_make_one_upstream_call(self):
+        release = threading.Event()
+
+        def fetch(lat, lon):
+            release.wait(5)
+            return {"cell": [lat, lon]}
+
+        forecasts = ForecastCache(fetch)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(forecasts.get(7.3776, 3.9470))) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        while forecasts.stats()["misses"] < 5:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [{"cell": [7.35, 3.95]}] * 5)
+        stats = forecasts.stats()
+        self.assertEqual((stats["upstream_calls"], stats["coalesced"]), (1, 4))
+
+    def test_cold_cells_are_fetched_concurrently(self):
+        # Both fetches must be in flight at once to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def fetch(lat, lon):
+            barrier.wait()
+            return {"cell": [lat, lon]}
+
+        forecasts = ForecastCache(fetch)
+        cached = grid_cell(9.0, 7.5, forecasts.grid_size)
+        forecasts.store(cached, "cached")
+        cells = [cached, grid_cell(7.3776, 3.9470, forecasts.grid_size), grid_cell(12.0, 8.5, forecasts.grid_size)]
+
+        results = forecasts.get_many(cells)
+        self.assertEqual(list(results), cells)
+        self.assertEqual(results[cached], "cached")
+        self.assertEqual(results[cells[1]], {"cell": list(cells[1])})
+        stats = forecasts.stats()
+        self.assertEqual((stats["hits"], stats["upstream_calls"]), (1, 2))
+
+    def test_stale_entries_are_served_while_refreshing(self):
+        forecasts = ForecastCache(lambda lat, lon: "new run")
+        cell = grid_cell(7.3776, 3.9470, forecasts.grid_size)
+        forecasts.store(cell, "old run", now=time.time() - 2 * forecasts.interval)
+
+        # Refresh runs inline under BACKGROUND_TASKS_EAGER
+        self.assertEqual(forecasts.get(7.3776, 3.9470), "old run")
+        self.assertEqual(forecasts.get(7.3776, 3.9470), "new run")
+        stats = forecasts.stats()
+        self.assertEqual((stats["stale_hits"], stats["hits"], stats["upstream_calls"]), (1, 1, 1))
+
+    def test_stale_entry_survives_upstream_errors(self):
+        def fetch(lat, lon):
+            raise ConnectionError("upstream down")
+
+        forecasts = ForecastCache(fetch)
+        cell = grid_cell(7.3776, 3.9470, forecasts.grid_size)
+        forecasts.store(cell, "old run", now=time.time() - 2 * forecasts.interval)
+
+        self.assertEqual(forecasts.get(7.3776, 3.9470), "old run")
+        self.assertEqual(forecasts.get(7.3776, 3.9470), "old run")
+        self.assertEqual(forecasts.stats()["upstream_errors"], 2)
+
+
+class ForecastPrefetchTests(OpenMeteoTestCase):
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        User.objects.create_user(email="f2@example.com", city=" IBADAN", state="oyo", country="Nigeria")
+        User.objects.create_user(email="f3@example.com", city="Kano", state="Kano", country="Nigeria")
+        User.objects.create_user(email="buyer@example.com", role="buyer", city="Lagos", country="Nigeria")
+        User.objects.create_user(email="gone@example.com", is_active=False, city="Abuja", country="Nigeria")
+
+    def test_prefetch_batches_farmer_cells_and_serves_the_dashboard_locally(self):
+        out = StringIO()
+        call_command("prefetch_forecasts", stdout=out)
+
+        self.assertIn("2 farmer locations in 2 cells: 2 forecasts stored in 1 requests", out.getvalue())
+        # Each place geocoded once; the buyer and inactive farmer are ignored
+        self.assertEqual(StubOpenMeteo.calls, ["/geocoding", "/geocoding", "/forecast"])
+
+        with patch.object(forecast_cache, "prefetched", True):
+            response = self.client.get("/analytics/farmer-stats")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["stats"]["expected_rainfall"], 1.75)
+        self.assertEqual(StubOpenMeteo.calls.count("/forecast"), 1)
+
+    def test_prefetched_mode_never_calls_upstream(self):
+        with patch.object(forecast_cache, "prefetched", True):
+            # New place: geocoded in the background (inline under EAGER), not in the request
+            geocoder = patch.object(
+                WeatherAnalyticsService, "get_coordinates", wraps=WeatherAnalyticsService.get_coordinates
+            )
+            with geocoder as geocode:
+                response = self.client.get("/analytics/farmer-stats")
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response.data["status"], "pending")
+                geocode.assert_called_once_with("Ibadan", "Oyo", "Nigeria")
+
+                # Geocoded but not prefetched yet
+                for _ in range(2):
+                    response = self.client.get("/analytics/farmer-stats")
+                    self.assertEqual(response.status_code, 503)
+                    self.assertEqual(response["Retry-After"], str(forecast_cache.interval))
+                self.assertEqual(geocode.call_count, 1)
+
+        self.assertEqual(StubOpenMeteo.calls, ["/geocoding"])
+
+    def test_pending_geocodes_are_queued_once(self):
+        with patch("analytics.services.background.submit") as submit:
+            for _ in range(3):
+                WeatherAnalyticsService.geocode_in_background("Kano", "Kano", "Nigeria")
+        submit.assert_called_once()
+
+
+class ForecastScheduleTests(SimpleTestCase):
+    def test_entries_expire_when_the_next_run_is_published(self):
+        hour = 3600
+        # Run published at 05:15 is fresh until the 06:00 run lands at 06:15
+        self.assertEqual(fresh_until(5 * hour + 1000, hour, 900), 6 * hour + 900)
+        # Between 06:00 and 06:15 the 05:00 run is still the latest
+        self.assertEqual(fresh_until(6 * hour + 100, hour, 900), 6 * hour + 900)
+
+    def test_grid_cells_snap_to_their_center(self):
+        self.assertEqual(grid_cell(7.3776, 3.9470, 0.1), (7.35, 3.95))
+        self.assertEqual(grid_cell(7.3201, 3.9001, 0.1), (7.35, 3.95))
+        self.assertEqual(grid_cell(-0.01, -0.01, 0.1), (-0.05, -0.05))
+
+
+class CooperativeAnalyticsTests(OpenMeteoTestCase):
+    def setUp(self):
+        super().setUp()
+        from cooperatives.models import Cooperative, CooperativeMembership
+
+        self.coop = Cooperative.objects.create(name="Oyo Growers", created_by=self.user)
+        self.join = lambda user, role="member_farmer": CooperativeMembership.objects.create(
+            user=user, cooperative=self.coop, role=role
+        )
+        self.join(self.user, role="owner")
+        for email, city, state, role in (
+            ("a@example.com", "ibadan ", "OYO", "farmer"),
+            ("b@example.com", "Ibadan", "Oyo", "farmer"),
+            ("c@example.com", "Kano", "Kano", "farmer"),
+            ("d@example.com", "Atlantis", "", "farmer"),
+            ("e@example.com", "Lagos", "Lagos", "buyer"),
+        ):
+            self.join(self.member(email, city, state, role), role="member_" + role)
+        for place in (("Ibadan", "Oyo", "Nigeria"), ("Kano", "Kano", "Nigeria"), ("Atlantis", "", "Nigeria")):
+            WeatherAnalyticsService.get_coordinates(*place)
+        StubOpenMeteo.calls.clear()
+
+    def member(self, email, city, state, role="farmer"):
+        return get_user_model().objects.create_user(email=email, city=city, state=state, country="Nigeria", role=role)
+
+    def get(self):
+        return self.client.get(f"/cooperatives/{self.coop.id}/analytics/")
+
+    def test_members_are_grouped_by_cell_with_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(4):
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(response.data["totals"], {
+            "members": 5, "located": 4, "pending_geocoding": 0, "unlocated": 1,
+            "cells": 2, "members_at_disease_risk": 0,
+        })
+        ibadan, kano = response.data["cells"]
+        self.assertEqual((ibadan["latitude"], ibadan["longitude"], ibadan["members"]), (7.35, 3.95, 3))
+        self.assertEqual(ibadan["stats"]["expected_rainfall"], 1.75)
+        self.assertIn("outlook", ibadan)
+        self.assertEqual(kano["members"], 1)
+        self.assertEqual(StubOpenMeteo.calls, ["/forecast", "/forecast"])
+
+        # More members in known places: same queries, no new forecasts
+        for i in range(10):
+            self.join(self.member(f"more{i}@example.com", "Kano", "Kano"))
+        with self.assertNumQueries(4):
+            response = self.get()
+        self.assertEqual(response.data["cells"][0]["members"], 11)
+        self.assertEqual(StubOpenMeteo.calls.count("/forecast"), 2)
+
+    def test_new_places_are_geocoded_in_the_background(self):
+        self.join(self.member("new@example.com", "Kano", "Kano State"))
+        response = self.get()
+        self.assertEqual(response.data["totals"]["pending_geocoding"], 1)
+        self.assertTrue(GeocodeEntry.objects.filter(key="kano|kano state|nigeria").exists())
+
+        self.assertEqual(self.get().data["totals"]["pending_geocoding"], 0)
+
+    def test_only_members_can_see_it(self):
+        outsider = self.member("outsider@example.com", "Kano", "Kano")
+        self.client.force_authenticate(user=outsider)
+        self.assertEqual(self.get().status_code, 403)
+
+
+def hourly_forecast(days, temperature, precipitation=None, humidity=None):
+    """Forecast with constant hourly values per day; `precipitation` is spread over the first hour."""
+    hours = 24 * days
+    rain = [0.0] * hours
+    for day, amount in enumerate(precipitation or []):
+        rain[day * 24] = amount
+    return {
+        "hourly": {
+            "time": [f"2026-06-{1 + h // 24:02d}T{h % 24:02d}:00" for h in range(hours)],
+            "temperature_2m": [t for t in temperature for _ in range(24)],
+            "precipitation": rain,
+            "relative_humidity_2m": [rh for rh in humidity for _ in range(24)] if humidity else None,
+        }
+    }
+
+
+class AgronomyTests(SimpleTestCase):
+    def test_daily_indices(self):
+        forecast = hourly_forecast(
+            4, temperature=[20, 35, 5, 25], precipitation=[12, 0, 0.5, 3], humidity=[95, 50, 95, 92]
+        )
+        forecast["hourly"]["temperature_2m"][1] = 28  # one warm hour on day 1
+        daily = agronomy.summarize(forecast)["daily"]
+
+        self.assertEqual(daily["dates"], ["2026-06-01", "2026-06-02", "2026-06-03", "2026-06-04"])
+        self.assertEqual(daily["temperature_min"], [20, 35, 5, 25])
+        self.assertEqual(daily["temperature_max"], [28, 35, 5, 25])
+        self.assertEqual(daily["temperature_mean"], [20.33, 35, 5, 25])
+        # (clip(max) + clip(min)) / 2 - 10 with clipping to [10, 30]
+        self.assertEqual(daily["gdd"], [14, 20, 0, 15])
+        self.assertEqual(daily["gdd_cumulative"], [14, 34, 34, 49])
+        self.assertEqual(daily["rain_rolling"], [12, 12, 12.5, 3.5])
+        self.assertEqual(daily["dry_spell_days"], [0, 1, 2, 0])
+        # Humid and within 15-30 degC; the cold day is too cold to infect
+        self.assertEqual(daily["wet_hours"], [24, 0, 0, 24])
+        self.assertEqual(daily["disease_risk"], ["high", "low", "low", "high"])
+
+    def test_gaps_become_null_and_partial_days_are_dropped(self):
+        forecast = hourly_forecast(2, temperature=[20, 22])
+        forecast["hourly"]["temperature_2m"][24:48] = [None] * 24
+        forecast["hourly"]["temperature_2m"].append(30)  # incomplete third day
+        result = agronomy.summarize(forecast)
+
+        self.assertEqual(result["daily"]["temperature_mean"], [20, None])
+        self.assertEqual(result["daily"]["soil_moisture"], [None, None])
+        self.assertEqual(result["outlook"]["gdd_total"], 10)
+
+    def test_short_forecasts_do_not_truncate_the_others(self):
+        full = hourly_forecast(3, temperature=[20, 22, 24], precipitation=[0, 0, 5])
+        short = hourly_forecast(2, temperature=[25, 25])
+        del short["hourly"]["temperature_2m"][30:]  # 30 hours: one whole day
+        result = agronomy.to_json(agronomy.analyze([full, short, {}]))
+
+        self.assertEqual(result[0], agronomy.summarize(full))
+        self.assertEqual(result[1]["daily"]["temperature_mean"], [25, None, None])
+        self.assertEqual(result[1]["outlook"]["gdd_total"], 15)
+        self.assertEqual(result[2]["daily"]["gdd"], [None, None, None])
+        self.assertEqual(result[2]["outlook"]["longest_dry_spell_days"], 0)
+
+    def test_locations_are_analyzed_together(self):
+        forecasts = [
+            hourly_forecast(7, temperature=[18 + i + d for d in range(7)], precipitation=[i, 0, 0, 0, 0, 2 * i, 0])
+            for i in range(5)
+        ]
+        result = agronomy.analyze(forecasts)
+
+        self.assertEqual(result["temperature_max"].shape, (5, 7))
+        self.assertEqual(agronomy.to_json(result), [agronomy.summarize(forecast) for forecast in forecasts])
+
+
+class FlakyUpstream(BaseHTTPRequestHandler):
+    """Keep-alive server answering with the queued statuses, then 200."""
+
+    protocol_version = "HTTP/1.1"
+    statuses = []
+    requests = []
+
+    def respond(self):
+        self.requests.append((self.command, self.client_address[1]))
+        status = self.statuses.pop(0) if self.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    do_GET = do_POST = respond
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpClientTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyUpstream)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/v1"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        FlakyUpstream.statuses.clear()
+        FlakyUpstream.requests.clear()
+        self.client = HttpClient(retries=2, backoff=0.01, failure_threshold=3, reset_timeout=0.2)
+        self.host = f"127.0.0.1:{self.server.server_port}"
+
+    def test_connections_are_reused(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        ports = {port for _, port in FlakyUpstream.requests}
+        self.assertEqual(len(ports), 1)
+        self.assertEqual(self.client.stats()[self.host]["requests"], 5)
+
+    def test_idempotent_calls_are_retried(self):
+        FlakyUpstream.statuses[:] = [503, 502]
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.stats()[self.host]["retries"], 2)
+
+        FlakyUpstream.statuses[:] = [503]
+        self.assertEqual(self.client.post(self.url, json={}).status_code, 503)
+        self.assertEqual(self.client.stats()[self.host]["retries"], 2)
+
+    def test_circuit_opens_and_recovers(self):
+        FlakyUpstream.statuses[:] = [500] * 3
+        for _ in range(3):
+            self.assertEqual(self.client.post(self.url).status_code, 500)
+
+        with self.assertRaises(CircuitOpenError):
+            self.client.get(self.url)
+        self.assertEqual(len(FlakyUpstream.requests), 3)
+        self.assertEqual(self.client.stats()[self.host]["circuit"], "open")
+
+        # After reset_timeout one trial request goes through and closes it
+        time.sleep(0.25)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        stats = self.client.stats()[self.host]
+        self.assertEqual((stats["circuit"], stats["short_circuited"]), ("closed", 1))
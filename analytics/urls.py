@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import FarmerAnalyticsView
+from .views import FarmerAnalyticsView, ForecastCacheStatsView
 
 urlpatterns = [
     path("farmer-stats", FarmerAnalyticsView.as_view(), name="farmer_analytics"),
+    path("forecast-cache-stats", ForecastCacheStatsView.as_view(), name="forecast_cache_stats"),
 ]
@@ -1,7 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .services import WeatherAnalyticsService
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from .services import WeatherAnalyticsService, forecast_cache
 
 class FarmerAnalyticsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -16,8 +16,21 @@ class FarmerAnalyticsView(APIView):
             }, status=400)
 
         stats = WeatherAnalyticsService.get_farmer_analytics(user)
-        
+
+        if "pending" in stats:
+            response = Response({"status": "pending", "detail": stats["pending"]}, status=503)
+            response["Retry-After"] = str(stats["retry_after"])
+            return response
+
         if "error" in stats:
             return Response(stats, status=500)
             
         return Response(stats)
+
+
+class ForecastCacheStatsView(APIView):
+    """Hit ratio and upstream calls of this process's forecast cache."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(forecast_cache.stats())
@@ -1,7 +1,8 @@
 import os
-import requests
 from django.conf import settings
 
+from utils import http_client
+
 PAYSTACK_SECRET_KEY = getattr(settings, "PAYSTACK_SECRET_KEY", None)
 PAYSTACK_BASE = "https://api.paystack.co"
 
@@ -26,13 +27,14 @@ def initialize_transaction(email, amount_kobo, callback_url=None, metadata=None)
     if metadata:
         payload["metadata"] = metadata
 
-    resp = requests.post(url, json=payload, headers=HEADERS, timeout=30)
+    # Not retried: a second initialize would create a second Paystack transaction
+    resp = http_client.post(url, json=payload, headers=HEADERS, timeout=30)
     resp.raise_for_status()
     return resp.json()
 
 
 def verify_transaction(reference):
     url = f"{PAYSTACK_BASE}/transaction/verify/{reference}"
-    resp = requests.get(url, headers=HEADERS, timeout=30)
+    resp = http_client.get(url, headers=HEADERS, timeout=30)
     resp.raise_for_status()
     return resp.json()
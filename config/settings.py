@@ -51,7 +51,9 @@ INSTALLED_APPS = [
     'crops',
     'analytics',
     'orders',
-    'transactions'
+    'transactions',
+    'detector',
+    'pest_detection',
 ]
 
 # Django REST Framework and JWT configuration
@@ -118,6 +120,20 @@ DATABASES = {
     }
 }
 
+# "default" is local to each process. "analytics" holds the weather
+# forecasts written by `python manage.py prefetch_forecasts`, so it must be
+# shared by every worker (file-based on one host, or e.g. RedisCache).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'analytics': {
+        'BACKEND': config('ANALYTICS_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('ANALYTICS_CACHE_LOCATION', default='/var/tmp/farmintel/analytics'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
 
 
 # Password validation
@@ -219,3 +235,148 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='FarmIntel <noreply@farmintel.com>')
 APP_URL = config('APP_URL', default='https://farmintel.com')
+
+# --------------------------------------------------------------------
+#  Disease Detector
+# --------------------------------------------------------------------
+# Concurrent detect requests are coalesced into one forward pass of up to
+# DETECTOR_BATCH_MAX_SIZE images, waiting at most DETECTOR_BATCH_MAX_WAIT_MS.
+DETECTOR_BATCH_MAX_SIZE = config('DETECTOR_BATCH_MAX_SIZE', default=16, cast=int)
+DETECTOR_BATCH_MAX_WAIT_MS = config('DETECTOR_BATCH_MAX_WAIT_MS', default=5, cast=float)
+
+# Model artifact (weights + labels + preprocessing) for the eager backend.
+# `python manage.py export_disease_model` packages best_model.pth as model.pt;
+# a bare state dict like best_model.pth needs DETECTOR_LABELS_PATH as well.
+DETECTOR_MODEL_PATH = config('DETECTOR_MODEL_PATH', default='detector/model/disease_model/best_model.pth')
+DETECTOR_LABELS_PATH = config('DETECTOR_LABELS_PATH', default='detector/model/disease_model/labels.txt')
+
+# Inference backend for the disease classifier: "torch" (eager), "torchscript"
+# or "onnx" (ONNX Runtime, CPU). Build the artifacts with
+# `python manage.py export_disease_model`.
+DETECTOR_BACKEND = config('DETECTOR_BACKEND', default='torch')
+DETECTOR_TORCHSCRIPT_PATH = config('DETECTOR_TORCHSCRIPT_PATH', default='detector/model/disease_model/model.ts')
+DETECTOR_ONNX_PATH = config('DETECTOR_ONNX_PATH', default='detector/model/disease_model/model.onnx')
+
+# "int8" loads the statically quantized ONNX graph built by
+# `python manage.py quantize_disease_model` (requires DETECTOR_BACKEND=onnx).
+DETECTOR_PRECISION = config('DETECTOR_PRECISION', default='fp32')
+DETECTOR_ONNX_INT8_PATH = config('DETECTOR_ONNX_INT8_PATH', default='detector/model/disease_model/model.int8.onnx')
+
+# Load all registered ML models when config.wsgi is imported. Enable together
+# with `gunicorn --preload` so weights are loaded before the workers fork.
+MODEL_WARMUP = config('MODEL_WARMUP', default=False, cast=bool)
+
+# `uncertainty=true` on /detector/detect runs Monte Carlo dropout with this
+# many samples (one batched pass through the classifier head).
+DETECTOR_MC_DROPOUT_RUNS = config('DETECTOR_MC_DROPOUT_RUNS', default=20, cast=int)
+DETECTOR_MC_DROPOUT_RATE = config('DETECTOR_MC_DROPOUT_RATE', default=0.2, cast=float)
+
+# Per-worker cache of predictions for repeat uploads, keyed by exact SHA-256
+# and by perceptual hash within DETECTOR_PHASH_MAX_DISTANCE bits (-1 turns
+# near-duplicate matching off, a cache size of 0 disables the cache).
+DETECTOR_RESULT_CACHE_SIZE = config('DETECTOR_RESULT_CACHE_SIZE', default=1024, cast=int)
+DETECTOR_RESULT_CACHE_TTL = config('DETECTOR_RESULT_CACHE_TTL', default=3600, cast=int)
+DETECTOR_PHASH_MAX_DISTANCE = config('DETECTOR_PHASH_MAX_DISTANCE', default=4, cast=int)
+
+# Bulk detection (/detector/batch, API key clients). Batches up to
+# DETECTOR_BATCH_SYNC_LIMIT images are answered inline, larger ones become
+# a background job. Uploads are spooled to DETECTOR_BATCH_TMP_DIR.
+# Small chunks are fastest on 1-2 vCPU hosts; raise the chunk size on bigger boxes.
+DETECTOR_BATCH_MAX_IMAGES = config('DETECTOR_BATCH_MAX_IMAGES', default=1000, cast=int)
+DETECTOR_BATCH_SYNC_LIMIT = config('DETECTOR_BATCH_SYNC_LIMIT', default=32, cast=int)
+DETECTOR_BATCH_CHUNK_SIZE = config('DETECTOR_BATCH_CHUNK_SIZE', default=4, cast=int)
+DETECTOR_BATCH_TMP_DIR = config('DETECTOR_BATCH_TMP_DIR', default=None)
+
+# /detector/outbreaks reads the counters kept by
+# `python manage.py aggregate_disease_outbreaks` (run it from cron); responses
+# are cached this many seconds per region and window.
+DETECTOR_OUTBREAK_CACHE_TTL = config('DETECTOR_OUTBREAK_CACHE_TTL', default=300, cast=int)
+
+# --------------------------------------------------------------------
+#  Pest Detection
+# --------------------------------------------------------------------
+# "ultralytics" runs ai_models/best.pt eagerly; "onnx" runs the graph built by
+# `python manage.py export_pest_model` with ONNX Runtime on CPU.
+PEST_BACKEND = config('PEST_BACKEND', default='ultralytics')
+PEST_ONNX_PATH = config('PEST_ONNX_PATH', default='ai_models/best.onnx')
+
+# Images per YOLO forward pass for batched and tiled inference.
+PEST_BATCH_SIZE = config('PEST_BATCH_SIZE', default=8, cast=int)
+
+# Tiled (sliced) inference for large field photos: overlapping
+# PEST_TILE_SIZE px tiles, duplicates across tiles merged when they overlap
+# by more than PEST_TILE_MERGE_THRESHOLD of the smaller box.
+PEST_TILED_INFERENCE = config('PEST_TILED_INFERENCE', default=False, cast=bool)
+PEST_TILE_SIZE = config('PEST_TILE_SIZE', default=640, cast=int)
+PEST_TILE_OVERLAP = config('PEST_TILE_OVERLAP', default=0.2, cast=float)
+PEST_TILE_MERGE_THRESHOLD = config('PEST_TILE_MERGE_THRESHOLD', default=0.5, cast=float)
+
+# Tips are matched on normalized labels and aliases first; labels with no
+# match fall back to the closest name by trigram similarity if it scores at
+# least PEST_TIP_FUZZY_THRESHOLD (0 disables the fallback).
+PEST_TIP_FUZZY_THRESHOLD = config('PEST_TIP_FUZZY_THRESHOLD', default=0.6, cast=float)
+
+# --------------------------------------------------------------------
+#  Analytics
+# --------------------------------------------------------------------
+# Geocoded profile locations are stored in the database and the most
+# recent ANALYTICS_GEOCODE_LRU_SIZE kept in memory per process. Places the
+# geocoder could not find are retried after ANALYTICS_GEOCODE_NEGATIVE_TTL.
+ANALYTICS_GEOCODE_LRU_SIZE = config('ANALYTICS_GEOCODE_LRU_SIZE', default=1024, cast=int)
+ANALYTICS_GEOCODE_NEGATIVE_TTL = config('ANALYTICS_GEOCODE_NEGATIVE_TTL', default=86400, cast=int)
+
+# Forecasts are cached per ANALYTICS_FORECAST_GRID_DEG grid cell (0.1 deg is
+# about 11 km, the resolution of the global models behind Open-Meteo). An
+# entry is fresh until the next model update (every
+# ANALYTICS_FORECAST_UPDATE_INTERVAL seconds, published
+# ANALYTICS_FORECAST_UPDATE_LAG seconds after the hour), then served stale
+# for up to ANALYTICS_FORECAST_STALE_TTL while it is refreshed in the background.
+ANALYTICS_FORECAST_GRID_DEG = config('ANALYTICS_FORECAST_GRID_DEG', default=0.1, cast=float)
+ANALYTICS_FORECAST_UPDATE_INTERVAL = config('ANALYTICS_FORECAST_UPDATE_INTERVAL', default=3600, cast=int)
+ANALYTICS_FORECAST_UPDATE_LAG = config('ANALYTICS_FORECAST_UPDATE_LAG', default=900, cast=int)
+ANALYTICS_FORECAST_STALE_TTL = config('ANALYTICS_FORECAST_STALE_TTL', default=21600, cast=int)
+# Cold cells of a cooperative dashboard are fetched this many at a time
+ANALYTICS_FORECAST_FETCH_CONCURRENCY = config('ANALYTICS_FORECAST_FETCH_CONCURRENCY', default=8, cast=int)
+
+# With ANALYTICS_FORECAST_PREFETCHED the dashboard never calls the weather
+# API: forecasts come only from the scheduled `prefetch_forecasts` job (run
+# it once per update interval). Locations it has not covered yet get an error.
+ANALYTICS_FORECAST_PREFETCHED = config('ANALYTICS_FORECAST_PREFETCHED', default=False, cast=bool)
+ANALYTICS_PREFETCH_BATCH_SIZE = config('ANALYTICS_PREFETCH_BATCH_SIZE', default=50, cast=int)
+ANALYTICS_PREFETCH_CONCURRENCY = config('ANALYTICS_PREFETCH_CONCURRENCY', default=4, cast=int)
+
+# --------------------------------------------------------------------
+#  Inference service
+# --------------------------------------------------------------------
+# With INFERENCE_SOCKET set, disease (single and bulk) and pest detection run in the model
+# processes of `python manage.py run_inference_server` (listening on that
+# Unix socket) instead of every web worker loading its own model copies.
+# Each task queues at most INFERENCE_MAX_QUEUE requests; beyond that the
+# API answers 503 with Retry-After. Empty runs models in-process (dev/tests).
+INFERENCE_SOCKET = config('INFERENCE_SOCKET', default='')
+INFERENCE_WORKERS = config('INFERENCE_WORKERS', default=2, cast=int)
+INFERENCE_MAX_QUEUE = config('INFERENCE_MAX_QUEUE', default=64, cast=int)
+INFERENCE_TIMEOUT = config('INFERENCE_TIMEOUT', default=30, cast=float)
+
+# --------------------------------------------------------------------
+#  Outbound HTTP
+# --------------------------------------------------------------------
+# Calls to Open-Meteo and Paystack go through utils/http_client.py: a
+# keep-alive pool of HTTP_POOL_SIZE connections per host, up to HTTP_RETRIES
+# jittered retries for idempotent requests, and a per-host circuit breaker
+# that fails fast for HTTP_BREAKER_RESET seconds after
+# HTTP_BREAKER_THRESHOLD consecutive connection errors, timeouts or 5xx.
+HTTP_POOL_SIZE = config('HTTP_POOL_SIZE', default=10, cast=int)
+HTTP_RETRIES = config('HTTP_RETRIES', default=2, cast=int)
+HTTP_RETRY_BACKOFF = config('HTTP_RETRY_BACKOFF', default=0.2, cast=float)
+HTTP_RETRY_BACKOFF_MAX = config('HTTP_RETRY_BACKOFF_MAX', default=2.0, cast=float)
+HTTP_BREAKER_THRESHOLD = config('HTTP_BREAKER_THRESHOLD', default=5, cast=int)
+HTTP_BREAKER_RESET = config('HTTP_BREAKER_RESET', default=30.0, cast=float)
+
+# --------------------------------------------------------------------
+#  Background tasks
+# --------------------------------------------------------------------
+# In-process thread pool used for work that should not block a request
+# (e.g. generating treatment plans). EAGER runs tasks inline (tests).
+BACKGROUND_WORKERS = config('BACKGROUND_WORKERS', default=4, cast=int)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
@@ -16,7 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from utils.views import CloudinaryUploadView
+from utils.views import CloudinaryUploadView, OutboundHttpStatsView
 
 urlpatterns = [
     path('admin/', admin.site.urls), 
@@ -26,9 +26,11 @@ urlpatterns = [
     path("cooperatives/", include("cooperatives.urls")),
     path("notifications/", include("notifications.urls")),
     path("detector/", include("detector.urls")),
+    path("pest/", include("pest_detection.urls")),
     path("crops/", include("crops.urls")),
     path("analytics/", include("analytics.urls")),
     path("orders/", include("orders.urls")),
     path("transactions/", include("transactions.urls")),
     path("upload/", CloudinaryUploadView.as_view(), name="cloudinary_upload"),
+    path("outbound-stats/", OutboundHttpStatsView.as_view(), name="outbound_http_stats"),
 ]
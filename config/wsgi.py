@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# With `gunicorn --preload` this module is imported once in the master, so
+# loading the models here shares their weights copy-on-write with every
+# forked worker instead of each worker loading its own copy. With the
+# inference server (INFERENCE_SOCKET) web workers hold no models at all.
+from django.conf import settings
+
+if settings.MODEL_WARMUP and not settings.INFERENCE_SOCKET:
+    from utils.model_registry import registry
+    registry.warmup()
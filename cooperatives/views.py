@@ -5,6 +5,8 @@ from django.shortcuts import get_object_or_404
 from .models import Cooperative, CooperativeMembership
 from .serializers import CooperativeSerializer, CooperativeMembershipSerializer
 from .permissions import IsOwnerOrReadOnly
+from analytics.services import WeatherAnalyticsService
+from users.models import User
 
 class CooperativeViewSet(viewsets.ModelViewSet):
     queryset = Cooperative.objects.all()
@@ -12,7 +14,7 @@ class CooperativeViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
 
     def get_permissions(self):
-        if self.action in ['join', 'members']:
+        if self.action in ['join', 'members', 'analytics']:
             return [permissions.IsAuthenticated()]
         return [permissions.IsAuthenticated(), IsOwnerOrReadOnly()]
 
@@ -63,3 +65,16 @@ class CooperativeViewSet(viewsets.ModelViewSet):
         from .serializers import CooperativeMemberDetailSerializer
         serializer = CooperativeMemberDetailSerializer(memberships, many=True)
         return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Weather and soil conditions across the cooperative's farmers, grouped by forecast grid cell."""
+        cooperative = self.get_object()
+        if not cooperative.memberships.filter(user=request.user).exists():
+            return Response({"detail": "Only members can view cooperative analytics."}, status=status.HTTP_403_FORBIDDEN)
+
+        farmers = User.objects.filter(coop_memberships__cooperative=cooperative, role='farmer', is_active=True)
+        return Response({
+            "cooperative": {"id": cooperative.id, "name": cooperative.name},
+            **WeatherAnalyticsService.get_regional_analytics(farmers),
+        })
@@ -4,3 +4,23 @@ from django.apps import AppConfig
 class DetectorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'detector'
+
+    def ready(self):
+        from django.conf import settings
+
+        from utils import inference
+        from utils.model_registry import registry
+
+        # Loaded on first request (or by the pre-fork warmup in config/wsgi.py)
+        registry.register("disease", "detector.predictors.disease_predictor.load_default_model")
+
+        # Served by the shared inference workers when INFERENCE_SOCKET is set
+        inference.register_task(
+            "disease",
+            "detector.predictors.disease_predictor.predict_uploads",
+            max_batch=getattr(settings, "DETECTOR_BATCH_MAX_SIZE", 16),
+        )
+        inference.register_task(
+            "disease-uncertainty",
+            "detector.predictors.disease_predictor.predict_uploads_with_uncertainty",
+        )
@@ -0,0 +1,178 @@
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils import timezone
+
+from utils import inference
+from utils.inference import InferenceBusy, InferenceUnavailable
+from utils.model_registry import registry
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def is_image_name(name):
+    base = os.path.basename(name)
+    return (
+        not name.endswith("/")
+        and not name.startswith("__MACOSX/")
+        and not base.startswith(".")
+        and base.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def spool_uploads(files=None, archive=None):
+    """
+    Write an uploaded zip (or a set of uploaded images) to one local zip file
+    so the batch can be processed later from any thread in this process.
+
+    Returns (path, image_names).
+    """
+    fd, path = tempfile.mkstemp(
+        suffix=".zip",
+        prefix="detect-batch-",
+        dir=getattr(settings, "DETECTOR_BATCH_TMP_DIR", None),
+    )
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if archive is not None:
+                for chunk in archive.chunks():
+                    out.write(chunk)
+            else:
+                # Images are already compressed; store them as-is
+                with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as zf:
+                    for i, upload in enumerate(files):
+                        name = f"{i:05d}_{os.path.basename(upload.name)}"
+                        with zf.open(name, "w") as dst:
+                            for chunk in upload.chunks():
+                                dst.write(chunk)
+
+        with zipfile.ZipFile(path) as zf:
+            names = [name for name in zf.namelist() if is_image_name(name)]
+    except Exception:
+        os.remove(path)
+        raise
+
+    return path, names
+
+
+class InferenceTaskModel:
+    """
+    run_batch() model for INFERENCE_SOCKET deployments: images stay encoded
+    and each one is sent to the inference server's task, several at a time,
+    so the server batches them with other requests and no weights are loaded
+    in this process.
+    """
+
+    def __init__(self, task="disease", concurrency=4):
+        self.task = task
+        self.concurrency = concurrency
+
+    def preprocess_image(self, f):
+        return f.read()
+
+    def predict_tensors(self, items):
+        def predict(data):
+            try:
+                return inference.run(self.task, data)
+            except (InferenceBusy, InferenceUnavailable):
+                raise
+            except Exception as e:
+                # Undecodable images fail on the server; report them per image
+                return e
+
+        # The task's handler uses its default top_k (3), the same as run_batch()
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(items)),
+                                thread_name_prefix="batch-infer") as pool:
+            return list(pool.map(predict, [data for data, _ in items]))
+
+
+def batch_model():
+    """The disease model for run_batch(): remote when INFERENCE_SOCKET is set."""
+    if getattr(settings, "INFERENCE_SOCKET", ""):
+        return InferenceTaskModel("disease", concurrency=getattr(settings, "DETECTOR_BATCH_CHUNK_SIZE", 4))
+    return registry.get("disease")
+
+
+def _decode_chunk(model, zf, names):
+    """Decode + preprocess a chunk; undecodable images become per-image errors."""
+    tensors, errors = [], {}
+    for name in names:
+        try:
+            with zf.open(name) as f:
+                tensors.append((name, model.preprocess_image(f)))
+        except Exception as e:
+            errors[name] = f"Could not read image: {e}"
+    return tensors, errors
+
+
+def run_batch(model, path, names, top_k=3, chunk_size=4, on_progress=None):
+    """
+    Classify every image in the spooled zip at `path`.
+
+    Images are decoded chunk by chunk; the next chunk is decoded on a helper
+    thread while the current one runs through the model, so only two chunks
+    of tensors are ever held in memory. Returns results in input order.
+    """
+    results = []
+    chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+
+    with zipfile.ZipFile(path) as decode_zf, \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-decode") as decoder:
+        pending = decoder.submit(_decode_chunk, model, decode_zf, chunks[0]) if chunks else None
+
+        for i, chunk in enumerate(chunks):
+            tensors, errors = pending.result()
+            if i + 1 < len(chunks):
+                pending = decoder.submit(_decode_chunk, model, decode_zf, chunks[i + 1])
+
+            predictions = {}
+            if tensors:
+                outputs = model.predict_tensors([(tensor, top_k) for _, tensor in tensors])
+                for (name, _), preds in zip(tensors, outputs):
+                    if isinstance(preds, Exception):
+                        errors[name] = f"Could not read image: {preds}"
+                    else:
+                        predictions[name] = preds
+
+            for name in chunk:
+                if name in predictions:
+                    results.append({"image": name, "predictions": predictions[name]})
+                else:
+                    results.append({"image": name, "error": errors.get(name, "Could not read image")})
+
+            if on_progress is not None:
+                on_progress(len(results), results)
+
+    return results
+
+
+def process_batch_job(job_id, path, names):
+    """Background task for batches too large to answer in one request."""
+    from .models import BatchDetectionJob
+
+    def on_progress(processed, _results):
+        BatchDetectionJob.objects.filter(id=job_id).update(processed=processed, updated_at=timezone.now())
+
+    BatchDetectionJob.objects.filter(id=job_id).update(status="running", updated_at=timezone.now())
+    try:
+        results = run_batch(
+            batch_model(),
+            path,
+            names,
+            chunk_size=getattr(settings, "DETECTOR_BATCH_CHUNK_SIZE", 4),
+            on_progress=on_progress,
+        )
+    except Exception as e:
+        BatchDetectionJob.objects.filter(id=job_id).update(
+            status="failed", error=str(e)[:255], updated_at=timezone.now()
+        )
+        raise
+    finally:
+        os.remove(path)
+
+    BatchDetectionJob.objects.filter(id=job_id).update(
+        status="done", processed=len(results), results=results, updated_at=timezone.now()
+    )
@@ -0,0 +1,79 @@
+"""
+Bulk detection benchmark: 500 validation images through the batch pipeline
+vs. one predict() call per image (what a client looping over /detect gets,
+minus HTTP).
+
+Run from the project root:
+    python -m detector.benchmarks.bench_batch [--images 500] [--chunk-size 4]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import zipfile
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import torch
+
+from detector.batch import run_batch
+from detector.predictors.disease_predictor import load_default_model
+
+VAL_DIR = "detector/datasets/PlantVillage2/val"
+
+
+def pick_images(count, seed=0):
+    paths = []
+    for root, _, files in os.walk(VAL_DIR):
+        paths.extend(os.path.join(root, f) for f in files if f.lower().endswith((".jpg", ".jpeg", ".png")))
+    random.Random(seed).shuffle(paths)
+    return paths[:count]
+
+
+def build_archive(paths):
+    fd, path = tempfile.mkstemp(suffix=".zip")
+    with os.fdopen(fd, "wb") as out, zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as zf:
+        for i, src in enumerate(paths):
+            zf.write(src, f"{i:05d}_{os.path.basename(src)}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=4)
+    args = parser.parse_args()
+
+    model = load_default_model()
+    paths = pick_images(args.images)
+    archive = build_archive(paths)
+    with zipfile.ZipFile(archive) as zf:
+        names = zf.namelist()
+
+    model.predict(paths[0])  # warm up
+    print(f"torch threads: {torch.get_num_threads()}, images: {len(paths)}")
+
+    start = time.perf_counter()
+    sequential = [model.predict(p) for p in paths]
+    seq_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = run_batch(model, archive, names, chunk_size=args.chunk_size)
+    batch_elapsed = time.perf_counter() - start
+    os.remove(archive)
+
+    agree = sum(
+        s[0]["label"] == b["predictions"][0]["label"] for s, b in zip(sequential, batched)
+    )
+    print(f"{'mode':>12} {'seconds':>8} {'img/s':>8}")
+    print(f"{'sequential':>12} {seq_elapsed:>8.1f} {len(paths) / seq_elapsed:>8.1f}")
+    print(f"{'batch':>12} {batch_elapsed:>8.1f} {len(paths) / batch_elapsed:>8.1f}")
+    print(f"speedup: {seq_elapsed / batch_elapsed:.2f}x, top-1 agreement: {agree}/{len(paths)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Throughput/latency benchmark for the disease classifier micro-batcher.
+
+Run from the project root:
+    python -m detector.benchmarks.bench_batching
+"""
+import os
+import statistics
+import threading
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import torch
+
+from detector.predictors.batcher import MicroBatcher
+from detector.predictors.disease_predictor import load_default_model
+
+BATCH_SIZES = [1, 8, 32]
+ROUNDS = 5
+
+model = load_default_model()
+
+
+def bench_forward(batch_size):
+    """Raw batched forward pass, no queueing."""
+    items = [(torch.randn(3, 224, 224), 3) for _ in range(batch_size)]
+    model.predict_tensors(items)  # warm up
+
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        model.predict_tensors(items)
+        timings.append(time.perf_counter() - start)
+
+    per_batch = statistics.median(timings)
+    return per_batch * 1000, batch_size / per_batch
+
+
+def bench_batcher(clients, requests_per_client=4):
+    """`clients` threads hitting the batcher concurrently, like gthread workers."""
+    batcher = MicroBatcher(model.predict_tensors, max_batch_size=32, max_wait_ms=5)
+    tensor = torch.randn(3, 224, 224)
+    batcher.predict((tensor, 3))  # warm up
+
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            batcher.predict((tensor, 3))
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    return len(latencies) / elapsed, p50, p99
+
+
+def main():
+    print(f"torch threads: {torch.get_num_threads()}")
+    print("\nBatched forward pass")
+    print(f"{'batch':>6} {'ms/batch':>10} {'img/s':>8}")
+    for size in BATCH_SIZES:
+        ms, ips = bench_forward(size)
+        print(f"{size:>6} {ms:>10.1f} {ips:>8.1f}")
+
+    print("\nMicro-batcher under concurrent load")
+    print(f"{'clients':>7} {'img/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for clients in BATCH_SIZES:
+        ips, p50, p99 = bench_batcher(clients)
+        print(f"{clients:>7} {ips:>8.1f} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
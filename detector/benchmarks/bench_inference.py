@@ -0,0 +1,108 @@
+"""
+Inference benchmark suite for the disease classifier (pytest-benchmark).
+
+Every backend x batch size runs through LeafDiseaseModel.predict_tensors,
+the same call used by the detect views, the micro-batcher and bulk batches.
+Reports p50/p99 latency per batch, images/sec and the peak RSS of a fresh
+process that loads the backend and runs one batch.
+
+Run from the project root (needs pytest-benchmark; artifacts that have not
+been exported are skipped):
+    pytest detector/benchmarks/bench_inference.py --benchmark-only
+    pytest detector/benchmarks/bench_inference.py --benchmark-json=bench.json
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import torch
+
+pytest.importorskip("pytest_benchmark")
+
+from detector.predictors.disease_predictor import LeafDiseaseModel  # noqa: E402
+
+MODEL_DIR = "detector/model/disease_model"
+MODEL_PATH = os.path.join(MODEL_DIR, "model.pt")
+if not os.path.exists(MODEL_PATH):
+    MODEL_PATH = os.path.join(MODEL_DIR, "best_model.pth")
+LABEL_PATH = os.path.join(MODEL_DIR, "labels.txt")
+
+BACKENDS = {
+    "torch": {"backend": "torch"},
+    "torchscript": {"backend": "torchscript", "torchscript_path": os.path.join(MODEL_DIR, "model.ts")},
+    "onnx": {"backend": "onnx", "onnx_path": os.path.join(MODEL_DIR, "model.onnx")},
+    "onnx-int8": {
+        "backend": "onnx",
+        "precision": "int8",
+        "onnx_int8_path": os.path.join(MODEL_DIR, "model.int8.onnx"),
+    },
+}
+BATCH_SIZES = [1, 8, 32]
+ROUNDS = 20
+
+_models = {}
+_peak_rss = {}
+
+RSS_PROBE = """
+import json, resource, sys, torch
+from detector.predictors.disease_predictor import LeafDiseaseModel
+kwargs, batch_size = json.loads(sys.argv[1]), int(sys.argv[2])
+model = LeafDiseaseModel(**kwargs)
+model.predict_tensors([(torch.randn(3, 224, 224), 3)] * batch_size)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def _kwargs(name):
+    kwargs = {"model_path": MODEL_PATH, "label_path": LABEL_PATH, **BACKENDS[name]}
+    for key, value in kwargs.items():
+        if key.endswith("_path") and not os.path.exists(value):
+            pytest.skip(f"{value} not found (run manage.py export_disease_model / quantize_disease_model)")
+    return kwargs
+
+
+def _model(name):
+    if name not in _models:
+        _models[name] = LeafDiseaseModel(**_kwargs(name))
+    return _models[name]
+
+
+def _peak_rss_mb(name):
+    """Peak RSS of a fresh process serving `name` at the largest batch size."""
+    if name not in _peak_rss:
+        out = subprocess.run(
+            [sys.executable, "-c", RSS_PROBE, json.dumps(_kwargs(name)), str(max(BATCH_SIZES))],
+            capture_output=True, text=True, check=True,
+        )
+        _peak_rss[name] = int(out.stdout.strip().splitlines()[-1]) / 1024  # KiB on Linux
+    return _peak_rss[name]
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_predict_tensors(benchmark, report, backend, batch_size):
+    model = _model(backend)
+    items = [(torch.randn(3, 224, 224), 3) for _ in range(batch_size)]
+
+    benchmark.group = f"batch={batch_size}"
+    results = benchmark.pedantic(model.predict_tensors, args=(items,), rounds=ROUNDS, warmup_rounds=2)
+    assert len(results) == batch_size
+
+    timings = sorted(benchmark.stats.stats.data)
+    p50 = _percentile(timings, 0.50)
+    row = {
+        "backend": backend,
+        "batch_size": batch_size,
+        "p50_ms": p50 * 1000,
+        "p99_ms": _percentile(timings, 0.99) * 1000,
+        "images_per_sec": batch_size / p50,
+        "peak_rss_mb": _peak_rss_mb(backend),
+    }
+    benchmark.extra_info.update(row)
+    report(row)
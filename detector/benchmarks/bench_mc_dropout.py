@@ -0,0 +1,55 @@
+"""
+Monte Carlo dropout: looped forward passes vs. one vectorized pass.
+
+Run from the project root:
+    python -m detector.benchmarks.bench_mc_dropout
+"""
+import statistics
+import time
+
+import timm
+import torch
+import torch.nn.functional as F
+
+from detector.predictors.backends import MODEL_NAME
+from detector.predictors.uncertainty import mc_dropout_probs
+
+RUNS = [10, 30]
+ROUNDS = 3
+
+
+def looped(model, x, runs):
+    """Previous implementation: model.train() and one forward pass per run."""
+    preds = []
+    model.train()
+    with torch.no_grad():
+        for _ in range(runs):
+            preds.append(F.softmax(model(x), dim=1)[0])
+    model.eval()
+    preds = torch.stack(preds)
+    return preds.mean(dim=0), preds.std(dim=0)
+
+
+def timed(fn, *args):
+    fn(*args)  # warm up
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    model = timm.create_model(MODEL_NAME, pretrained=False, num_classes=15, drop_rate=0.2).eval()
+    x = torch.randn(1, 3, 224, 224)
+
+    print(f"{'runs':>5} {'looped ms':>10} {'vectorized ms':>14} {'speedup':>8}")
+    for runs in RUNS:
+        loop_ms = timed(looped, model, x, runs)
+        vec_ms = timed(mc_dropout_probs, model, x, runs)
+        print(f"{runs:>5} {loop_ms:>10.1f} {vec_ms:>14.1f} {loop_ms / vec_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Upload preprocessing microbenchmark: reference torchvision transform vs.
+draft-decode + in-place normalization, on the sample photos in crop_images/
+and on a 12MP re-encode of each (typical phone upload).
+
+Run from the project root:
+    python -m detector.benchmarks.bench_preprocessing
+"""
+import glob
+import io
+import statistics
+import time
+
+import torch
+from PIL import Image
+
+from detector.predictors.preprocessing import build_transform, preprocess
+
+ROUNDS = 20
+PHONE_SIZE = (4032, 3024)
+
+
+def reference(data):
+    return build_transform()(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+def fast(data):
+    return preprocess(io.BytesIO(data))
+
+
+def timed(fn, data):
+    fn(data)  # warm up
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn(data)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def phone_photo(path):
+    buf = io.BytesIO()
+    Image.open(path).convert("RGB").resize(PHONE_SIZE, Image.Resampling.BICUBIC).save(buf, "JPEG", quality=92)
+    return buf.getvalue()
+
+
+def main():
+    torch.set_num_threads(1)
+    print(f"{'image':>34} {'size':>10} {'ref ms':>8} {'fast ms':>8} {'speedup':>8} {'max|diff|':>10}")
+    for path in sorted(glob.glob("crop_images/*")):
+        with open(path, "rb") as f:
+            original = f.read()
+        for label, data in (("original", original), ("12MP", phone_photo(path))):
+            size = "x".join(map(str, Image.open(io.BytesIO(data)).size))
+            ref_ms, fast_ms = timed(reference, data), timed(fast, data)
+            diff = (reference(data) - fast(data)).abs().max().item()
+            name = f"{path.split('/')[-1][:24]} {label}"
+            print(f"{name:>34} {size:>10} {ref_ms:>8.2f} {fast_ms:>8.2f} {ref_ms / fast_ms:>7.1f}x {diff:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
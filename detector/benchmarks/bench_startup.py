@@ -0,0 +1,60 @@
+"""
+Startup-time benchmark: wall time and peak RSS of `manage.py check`.
+
+Run from the project root:
+    python -m detector.benchmarks.bench_startup [--runs 5] [manage.py args...]
+"""
+import argparse
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+
+def run_once(args):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "manage.py", "check", *args],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    known, extra = parser.parse_known_args()
+
+    run_once(extra)  # warm the filesystem cache
+    timings = [run_once(extra) for _ in range(known.runs)]
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    print(f"manage.py check x{known.runs}")
+    print(f"  median: {statistics.median(timings):.2f} s")
+    print(f"  min:    {min(timings):.2f} s")
+    print(f"  peak RSS: {peak_rss_mb:.0f} MB")
+    print(f"  torch imported: {_imports_torch(extra)}")
+
+
+def _imports_torch(args):
+    code = (
+        "import sys, django, os;"
+        "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings');"
+        "from django.core.management import execute_from_command_line;"
+        f"execute_from_command_line(['manage.py', 'check', *{args!r}]);"
+        "print('torch' in sys.modules, file=sys.stderr)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return result.stderr.strip().splitlines()[-1]
+
+
+if __name__ == "__main__":
+    main()
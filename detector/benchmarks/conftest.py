@@ -0,0 +1,23 @@
+import pytest
+
+_rows = []
+
+
+@pytest.fixture
+def report():
+    """Collect one summary row per benchmark for the terminal table below."""
+    return _rows.append
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _rows:
+        return
+    terminalreporter.section("inference summary")
+    terminalreporter.write_line(
+        f"{'backend':<12} {'batch':>5} {'p50 ms':>8} {'p99 ms':>8} {'img/s':>8} {'peak RSS MB':>12}"
+    )
+    for row in sorted(_rows, key=lambda r: (r["backend"], r["batch_size"])):
+        terminalreporter.write_line(
+            f"{row['backend']:<12} {row['batch_size']:>5} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+            f"{row['images_per_sec']:>8.1f} {row['peak_rss_mb']:>12.0f}"
+        )
@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+
+from .models import DiseaseDetection, DiseaseLabel
+
+# Label ids never change once assigned, so both directions are cached
+_ids = {}
+_names = {}
+_lock = threading.Lock()
+
+
+def clear_label_cache():
+    with _lock:
+        _ids.clear()
+        _names.clear()
+
+
+def _remember(rows):
+    with _lock:
+        for label_id, name in rows:
+            _ids[name] = label_id
+            _names[label_id] = name
+
+
+def label_ids(names, create=True):
+    """Map label names to DiseaseLabel ids, creating missing labels if asked."""
+    missing = [name for name in set(names) if name not in _ids]
+    if missing:
+        if create:
+            DiseaseLabel.objects.bulk_create(
+                [DiseaseLabel(name=name) for name in missing], ignore_conflicts=True
+            )
+        _remember(DiseaseLabel.objects.filter(name__in=missing).values_list("id", "name"))
+    return [_ids.get(name) for name in names]
+
+
+def label_names(ids):
+    missing = [label_id for label_id in set(ids) if label_id not in _names]
+    if missing:
+        _remember(DiseaseLabel.objects.filter(id__in=missing).values_list("id", "name"))
+    return [_names.get(label_id) for label_id in ids]
+
+
+def encode_predictions(predictions):
+    """[{"label", "confidence"}, ...] -> (top-1 label id, packed ids, packed probs)."""
+    ids = label_ids([p["label"] for p in predictions])
+    packed_ids = np.asarray(ids, dtype="<i2").tobytes()
+    packed_probs = np.asarray([p["confidence"] for p in predictions], dtype="<f2").tobytes()
+    return ids[0], packed_ids, packed_probs
+
+
+def decode_predictions(packed_ids, packed_probs):
+    ids = np.frombuffer(bytes(packed_ids), dtype="<i2").tolist()
+    probs = np.frombuffer(bytes(packed_probs), dtype="<f2").astype(np.float32).tolist()
+    return [
+        {"label": name, "confidence": round(prob, 3)}
+        for name, prob in zip(label_names(ids), probs)
+    ]
+
+
+def record_detection(user, predictions):
+    label_id, packed_ids, packed_probs = encode_predictions(predictions)
+    return DiseaseDetection.objects.create(
+        user=user,
+        label_id=label_id,
+        top_labels=packed_ids,
+        top_probs=packed_probs,
+    )
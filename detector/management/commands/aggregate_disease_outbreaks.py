@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from detector.outbreaks import aggregate_detections
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll new disease detections up into per-region, per-day, per-label counters. "
+        "Incremental: run it from cron as often as the dashboard needs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        processed = aggregate_detections(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Aggregated {processed} new detections"))
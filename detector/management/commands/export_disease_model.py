@@ -0,0 +1,75 @@
+import os
+
+import torch
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.predictors.artifact import load_artifact
+from detector.predictors.backends import (
+    IMG_SIZE,
+    OnnxRuntimeBackend,
+    TorchScriptBackend,
+    export_onnx,
+    export_torchscript,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Package trained weights as a model artifact (weights + labels + preprocessing) "
+        "and export it to ONNX and TorchScript for the CPU inference backends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--weights",
+            default="detector/model/disease_model/best_model.pth",
+            help="Artifact or legacy checkpoint (bare state dict or model_utils checkpoint).",
+        )
+        parser.add_argument("--labels", default="detector/model/disease_model/labels.txt")
+        parser.add_argument("--artifact-path", default="detector/model/disease_model/model.pt")
+        parser.add_argument("--onnx-path", default=settings.DETECTOR_ONNX_PATH)
+        parser.add_argument("--torchscript-path", default=settings.DETECTOR_TORCHSCRIPT_PATH)
+        parser.add_argument(
+            "--format",
+            choices=["all", "artifact", "onnx", "torchscript"],
+            default="all",
+        )
+        parser.add_argument("--opset", type=int, default=17)
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["weights"]):
+            raise CommandError(f"Weights not found: {options['weights']}")
+
+        labels = options["labels"] if os.path.exists(options["labels"]) else None
+        try:
+            artifact = load_artifact(options["weights"], labels)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options["format"] in ("all", "artifact"):
+            path = artifact.save(options["artifact_path"])
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote artifact -> {path} ({artifact.num_classes} labels, "
+                f"{artifact.preprocessing['resize']} preprocessing)"
+            ))
+
+        model = artifact.build_model()
+        sample = torch.randn(4, 3, IMG_SIZE, IMG_SIZE)
+        with torch.no_grad():
+            reference = model(sample)
+
+        exported = []
+        if options["format"] in ("all", "torchscript"):
+            path = export_torchscript(model, options["torchscript_path"], metadata=artifact.metadata)
+            exported.append((path, TorchScriptBackend(path)))
+
+        if options["format"] in ("all", "onnx"):
+            path = export_onnx(model, options["onnx_path"], opset=options["opset"], metadata=artifact.metadata)
+            exported.append((path, OnnxRuntimeBackend(path)))
+
+        for path, backend in exported:
+            diff = (backend(sample) - reference).abs().max().item()
+            self.stdout.write(self.style.SUCCESS(
+                f"Exported {backend.name} -> {path} (max |logit diff| vs eager: {diff:.2e})"
+            ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from detector.models import TreatmentPlan
+from detector.services import PROMPT_VERSION, TreatmentService
+
+
+class Command(BaseCommand):
+    help = "Generate and store a treatment plan for every disease label and confidence bucket."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--labels", default="detector/model/disease_model/labels.txt")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate plans that already exist for the current prompt version.",
+        )
+
+    def handle(self, *args, **options):
+        with open(options["labels"]) as f:
+            labels = [line.strip() for line in f if line.strip()]
+
+        buckets = [value for value, _ in TreatmentPlan.CONFIDENCE_BUCKETS]
+        existing = set(
+            TreatmentPlan.objects.filter(prompt_version=PROMPT_VERSION)
+            .values_list("label", "confidence_bucket")
+        )
+
+        generated = skipped = failed = 0
+        for label in labels:
+            for bucket in buckets:
+                if (label, bucket) in existing and not options["force"]:
+                    skipped += 1
+                    continue
+
+                result = TreatmentService.generate_treatment_plan(label, bucket)
+                if result.get("status") != "success":
+                    failed += 1
+                    self.stderr.write(f"{label} [{bucket}]: {result.get('message')}")
+                    continue
+
+                TreatmentService.save_plan(label, bucket, result["treatment_plan"])
+                generated += 1
+                self.stdout.write(f"{label} [{bucket}]: ok")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Prompt v{PROMPT_VERSION}: {generated} generated, {skipped} already cached, {failed} failed"
+        ))
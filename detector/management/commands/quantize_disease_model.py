@@ -0,0 +1,73 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.predictors.backends import OnnxRuntimeBackend
+from detector.predictors.artifact import read_labels
+from detector.predictors.preprocessing import build_preprocess
+from detector.predictors.quantization import evaluate, quantize_onnx_model, sample_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a statically quantized INT8 ONNX model calibrated on the validation "
+        "split and report accuracy, latency and size against fp32."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--labels",
+            default="detector/model/disease_model/labels.txt",
+            help="Only used when the ONNX file predates embedded artifact metadata.",
+        )
+        parser.add_argument("--val-dir", default="detector/datasets/PlantVillage2/val")
+        parser.add_argument("--onnx-path", default=settings.DETECTOR_ONNX_PATH)
+        parser.add_argument("--output", default=settings.DETECTOR_ONNX_INT8_PATH)
+        parser.add_argument("--calibration-per-class", type=int, default=10)
+        parser.add_argument("--eval-per-class", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["onnx_path"]):
+            raise CommandError(
+                f"{options['onnx_path']} not found. Run `manage.py export_disease_model --format onnx` first."
+            )
+
+        fp32 = OnnxRuntimeBackend(options["onnx_path"])
+        metadata = fp32.metadata
+        labels = metadata["labels"] if metadata else read_labels(options["labels"])
+        preprocess = build_preprocess(metadata["preprocessing"] if metadata else None)
+
+        calibration = sample_dataset(
+            options["val_dir"], labels, options["calibration_per_class"], seed=options["seed"]
+        )
+        if not calibration:
+            raise CommandError(f"No calibration images found under {options['val_dir']}")
+
+        # Evaluate on images that were not used for calibration
+        held_out = sample_dataset(
+            options["val_dir"], labels, options["eval_per_class"],
+            seed=options["seed"] + 1, exclude={path for path, _ in calibration},
+        )
+
+        self.stdout.write(f"Calibrating on {len(calibration)} images...")
+        quantize_onnx_model(options["onnx_path"], options["output"], calibration, preprocess, metadata)
+
+        int8 = OnnxRuntimeBackend(options["output"])
+
+        self.stdout.write(f"Evaluating on {len(held_out)} held-out images...")
+        fp32_acc, fp32_ms, fp32_preds = evaluate(fp32, held_out, preprocess)
+        int8_acc, int8_ms, int8_preds = evaluate(int8, held_out, preprocess)
+        agreement = sum(a == b for a, b in zip(fp32_preds, int8_preds)) / max(len(held_out), 1)
+
+        fp32_mb = os.path.getsize(options["onnx_path"]) / 1e6
+        int8_mb = os.path.getsize(options["output"]) / 1e6
+
+        self.stdout.write("")
+        self.stdout.write(f"{'':<18}{'fp32':>10}{'int8':>10}{'delta':>10}")
+        self.stdout.write(f"{'top-1 accuracy':<18}{fp32_acc:>10.2%}{int8_acc:>10.2%}{int8_acc - fp32_acc:>+10.2%}")
+        self.stdout.write(f"{'ms / image':<18}{fp32_ms:>10.2f}{int8_ms:>10.2f}{fp32_ms / max(int8_ms, 1e-9):>9.2f}x")
+        self.stdout.write(f"{'model size (MB)':<18}{fp32_mb:>10.1f}{int8_mb:>10.1f}{fp32_mb / max(int8_mb, 1e-9):>9.2f}x")
+        self.stdout.write(f"{'top-1 agreement':<18}{agreement:>10.2%}")
+        self.stdout.write(self.style.SUCCESS(f"\nWrote {options['output']}"))
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.inference_server import InferenceServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve disease and pest detection from a small pool of model processes on a "
+        "Unix socket (INFERENCE_SOCKET). SIGHUP reloads models and restarts the workers "
+        "gracefully; SIGTERM drains the queues and exits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=settings.INFERENCE_SOCKET)
+        parser.add_argument("--workers", type=int, default=settings.INFERENCE_WORKERS)
+        parser.add_argument("--max-queue", type=int, default=settings.INFERENCE_MAX_QUEUE)
+        parser.add_argument(
+            "--no-preload",
+            action="store_true",
+            help="Let each worker load models on first use instead of sharing preloaded weights.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["socket"]:
+            raise CommandError("Set INFERENCE_SOCKET or pass --socket.")
+
+        server = InferenceServer(
+            options["socket"],
+            workers=options["workers"],
+            max_queue=options["max_queue"],
+            preload=not options["no_preload"],
+        )
+        server.install_signal_handlers()
+        self.stdout.write(self.style.SUCCESS(
+            f"Inference server on {options['socket']} ({options['workers']} workers, "
+            f"max {options['max_queue']} queued per task)"
+        ))
+        server.serve_forever()
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TreatmentPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=120)),
+                ('confidence_bucket', models.CharField(choices=[('moderate', 'Moderate (60-85%)'), ('high', 'High (85%+)')], max_length=20)),
+                ('prompt_version', models.PositiveSmallIntegerField()),
+                ('plan', models.TextField()),
+                ('model_name', models.CharField(max_length=60)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('label', 'confidence_bucket', 'prompt_version')},
+            },
+        ),
+    ]
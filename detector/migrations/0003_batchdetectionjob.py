@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:33
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detector', '0002_treatmentjob'),
+        ('organizations', '0003_b2borganization_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchDetectionJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total', models.PositiveIntegerField()),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('results', models.JSONField(blank=True, default=list)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('api_key', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='batch_detections', to='organizations.apikey')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batch_detections', to='organizations.b2borganization')),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detector', '0003_batchdetectionjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiseaseLabel',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=120, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DiseaseDetection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('top_labels', models.BinaryField()),
+                ('top_probs', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disease_detections', to=settings.AUTH_USER_MODEL)),
+                ('label', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='detections', to='detector.diseaselabel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at'], name='disease_det_user_created_idx'), models.Index(fields=['label', '-created_at'], name='disease_det_label_created_idx')],
+            },
+        ),
+    ]
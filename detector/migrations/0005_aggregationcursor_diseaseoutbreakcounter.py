@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detector', '0004_diseaselabel_diseasedetection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AggregationCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=60, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DiseaseOutbreakCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=255)),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('label', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='outbreak_counters', to='detector.diseaselabel')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('region', 'day', 'label'), name='disease_outbreak_region_day_label')],
+            },
+        ),
+    ]
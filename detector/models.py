@@ -1,3 +1,165 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class TreatmentPlan(models.Model):
+    """
+    Pre-generated (or previously generated) AI treatment plan for a disease
+    label. The plan text depends only on the label and confidence bucket, so
+    it is generated once per prompt version and reused for every detection.
+    """
+    CONFIDENCE_BUCKETS = [
+        ("moderate", "Moderate (60-85%)"),
+        ("high", "High (85%+)"),
+    ]
+
+    label = models.CharField(max_length=120)
+    confidence_bucket = models.CharField(max_length=20, choices=CONFIDENCE_BUCKETS)
+    prompt_version = models.PositiveSmallIntegerField()
+    plan = models.TextField()
+    model_name = models.CharField(max_length=60)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("label", "confidence_bucket", "prompt_version")
+
+    def __str__(self):
+        return f"{self.label} ({self.confidence_bucket}, v{self.prompt_version})"
+
+
+class TreatmentJob(models.Model):
+    """
+    Background generation of a treatment plan that was not cached yet.
+    `plan` fills up chunk by chunk while the LLM streams its answer.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="treatment_jobs",
+        null=True,
+        blank=True
+    )
+    label = models.CharField(max_length=120)
+    confidence_bucket = models.CharField(max_length=20, choices=TreatmentPlan.CONFIDENCE_BUCKETS)
+    prompt_version = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    plan = models.TextField(blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def __str__(self):
+        return f"{self.label} ({self.status})"
+
+
+class BatchDetectionJob(models.Model):
+    """Bulk disease detection submitted by an organization through its API key."""
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(
+        "organizations.B2BOrganization",
+        on_delete=models.CASCADE,
+        related_name="batch_detections"
+    )
+    api_key = models.ForeignKey(
+        "organizations.ApiKey",
+        on_delete=models.SET_NULL,
+        related_name="batch_detections",
+        null=True,
+        blank=True
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    total = models.PositiveIntegerField()
+    processed = models.PositiveIntegerField(default=0)
+    results = models.JSONField(default=list, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.organization.name} batch ({self.processed}/{self.total}, {self.status})"
+
+
+class DiseaseLabel(models.Model):
+    """Small lookup table so detections store a 2-byte label id, not the name."""
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=120, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class DiseaseDetection(models.Model):
+    """
+    One disease scan from /detector/detect. The top-k result is stored as
+    packed arrays: little-endian int16 label ids and float16 probabilities
+    (see detector/history.py), about 12 bytes for top-3.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="disease_detections"
+    )
+    label = models.ForeignKey(DiseaseLabel, on_delete=models.PROTECT, related_name="detections")
+    top_labels = models.BinaryField()
+    top_probs = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="disease_det_user_created_idx"),
+            models.Index(fields=["label", "-created_at"], name="disease_det_label_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Disease detection {self.label_id} by user {self.user_id} at {self.created_at}"
+
+
+class DiseaseOutbreakCounter(models.Model):
+    """
+    Detections per region, day and label, rolled up incrementally from
+    DiseaseDetection by detector/outbreaks.py.
+    """
+    region = models.CharField(max_length=255)
+    day = models.DateField()
+    label = models.ForeignKey(DiseaseLabel, on_delete=models.PROTECT, related_name="outbreak_counters")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["region", "day", "label"], name="disease_outbreak_region_day_label"),
+        ]
+
+    def __str__(self):
+        return f"{self.region} {self.day} {self.label_id}: {self.count}"
+
+
+class AggregationCursor(models.Model):
+    """High-water mark (last processed id) of an incremental aggregation job."""
+    name = models.CharField(max_length=60, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
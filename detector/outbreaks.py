@@ -0,0 +1,111 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AggregationCursor, DiseaseDetection, DiseaseOutbreakCounter
+
+CURSOR_NAME = "disease_outbreaks"
+
+# Rows younger than this are left for the next run, so a detection whose
+# INSERT commits after a higher id has been aggregated is not skipped.
+SETTLE_TIME = timedelta(seconds=5)
+
+
+def region_key(country, state):
+    """
+    Normalize the free-text profile location into a region key such as
+    "nigeria/oyo". Users without a country are not counted anywhere.
+    """
+    parts = [" ".join((value or "").split()).lower() for value in (country, state)]
+    if not parts[0]:
+        return None
+    return "/".join(part for part in parts if part)
+
+
+def aggregate_detections(chunk_size=5000):
+    """
+    Fold detections created since the last run into DiseaseOutbreakCounter.
+
+    Each chunk is read past the cursor's last id, summed in memory and
+    upserted in one statement, then the cursor moves forward in the same
+    transaction. The cursor row is locked, so concurrent runs queue up
+    instead of double counting. Returns the number of detections processed.
+    """
+    processed = 0
+    while True:
+        with transaction.atomic():
+            cursor, _ = AggregationCursor.objects.select_for_update().get_or_create(name=CURSOR_NAME)
+            rows = list(
+                DiseaseDetection.objects
+                .filter(id__gt=cursor.last_id, created_at__lt=timezone.now() - SETTLE_TIME)
+                .order_by("id")
+                .values_list("id", "label_id", "created_at", "user__country", "user__state")[:chunk_size]
+            )
+            if not rows:
+                return processed
+
+            deltas = Counter()
+            for _, label_id, created_at, country, state in rows:
+                region = region_key(country, state)
+                if region is not None:
+                    deltas[(region, timezone.localdate(created_at), label_id)] += 1
+
+            _apply(deltas)
+            cursor.last_id = rows[-1][0]
+            cursor.save(update_fields=["last_id", "updated_at"])
+            processed += len(rows)
+
+        if len(rows) < chunk_size:
+            return processed
+
+
+def _apply(deltas):
+    if not deltas:
+        return
+
+    regions = {region for region, _, _ in deltas}
+    days = {day for _, day, _ in deltas}
+    labels = {label_id for _, _, label_id in deltas}
+    existing = {
+        (region, day, label_id): count
+        for region, day, label_id, count in DiseaseOutbreakCounter.objects
+        .filter(region__in=regions, day__in=days, label_id__in=labels)
+        .values_list("region", "day", "label_id", "count")
+    }
+
+    DiseaseOutbreakCounter.objects.bulk_create(
+        [
+            DiseaseOutbreakCounter(region=region, day=day, label_id=label_id,
+                                   count=existing.get((region, day, label_id), 0) + delta)
+            for (region, day, label_id), delta in deltas.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["region", "day", "label"],
+        update_fields=["count"],
+    )
+
+
+def regional_trends(region, days):
+    """
+    Per-label detection counts for `region` over the last `days` days and
+    the `days` before that. Reads at most 2 * days * labels counter rows.
+    """
+    from .history import label_names
+
+    today = timezone.localdate()
+    window_start = today - timedelta(days=days - 1)
+    current, previous = Counter(), Counter()
+    for label_id, day, count in (
+        DiseaseOutbreakCounter.objects
+        .filter(region=region, day__gte=window_start - timedelta(days=days))
+        .values_list("label_id", "day", "count")
+    ):
+        (current if day >= window_start else previous)[label_id] += count
+
+    label_ids = sorted(set(current) | set(previous), key=lambda i: (-current[i], -previous[i], i))
+    return [
+        {"label": name, "count": current[label_id], "previous_count": previous[label_id]}
+        for label_id, name in zip(label_ids, label_names(label_ids))
+    ]
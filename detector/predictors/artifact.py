@@ -0,0 +1,116 @@
+import json
+
+import torch
+
+from .preprocessing import DEFAULT_PREPROCESSING
+
+ARTIFACT_FORMAT = "farmintel.classifier"
+ARTIFACT_VERSION = 1
+DEFAULT_ARCH = "efficientnet_b0"
+
+# Key the metadata JSON is stored under inside exported TorchScript/ONNX files
+METADATA_KEY = "farmintel"
+
+# Checkpoints written by the old model_utils path (dict with class_to_idx)
+# were evaluated with a shorter-side resize followed by a center crop.
+LEGACY_CHECKPOINT_PREPROCESSING = {
+    **DEFAULT_PREPROCESSING,
+    "resize": "center_crop",
+    "crop_ratio": 1.14,
+}
+
+
+class ModelArtifact:
+    """
+    A classifier checkpoint: timm architecture, weights, labels and the
+    preprocessing the weights expect, saved together in one file.
+
+    Exported TorchScript/ONNX graphs carry the same metadata (without the
+    weights), so every backend serves from a self-describing file.
+    """
+
+    def __init__(self, arch, labels, preprocessing, state_dict=None):
+        self.arch = arch
+        self.labels = list(labels)
+        self.preprocessing = dict(preprocessing)
+        self.state_dict = state_dict
+
+    @property
+    def num_classes(self):
+        return len(self.labels)
+
+    @property
+    def metadata(self):
+        return {
+            "format": ARTIFACT_FORMAT,
+            "version": ARTIFACT_VERSION,
+            "arch": self.arch,
+            "labels": self.labels,
+            "preprocessing": self.preprocessing,
+        }
+
+    def build_model(self):
+        import timm
+
+        model = timm.create_model(self.arch, pretrained=False, num_classes=self.num_classes)
+        model.load_state_dict(self.state_dict)
+        model.eval()
+        return model
+
+    def save(self, path):
+        torch.save({**self.metadata, "model_state": self.state_dict}, path)
+        return path
+
+
+def read_labels(label_path):
+    with open(label_path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def load_artifact(path, label_path=None):
+    """
+    Load a model artifact. Older checkpoints are converted on the fly:
+
+    - a bare state dict (train_disease.py) needs `label_path` and was served
+      with a plain 224x224 resize;
+    - a model_utils checkpoint ({"model_state", "class_to_idx"}) takes its
+      labels from class_to_idx and used resize + center crop.
+    """
+    checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+
+    if checkpoint.get("format") == ARTIFACT_FORMAT:
+        if checkpoint.get("version") != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported artifact version {checkpoint.get('version')} in {path}")
+        return ModelArtifact(
+            checkpoint["arch"],
+            checkpoint["labels"],
+            checkpoint["preprocessing"],
+            checkpoint["model_state"],
+        )
+
+    if "model_state" in checkpoint:
+        class_to_idx = checkpoint.get("class_to_idx")
+        if class_to_idx:
+            labels = [name for name, _ in sorted(class_to_idx.items(), key=lambda item: item[1])]
+        elif label_path:
+            labels = read_labels(label_path)
+        else:
+            raise ValueError(f"{path} has no class_to_idx; pass the labels file.")
+        return ModelArtifact(DEFAULT_ARCH, labels, LEGACY_CHECKPOINT_PREPROCESSING, checkpoint["model_state"])
+
+    if label_path is None:
+        raise ValueError(f"{path} is a bare state dict; pass the labels file.")
+    return ModelArtifact(DEFAULT_ARCH, read_labels(label_path), DEFAULT_PREPROCESSING, checkpoint)
+
+
+def encode_metadata(metadata):
+    return json.dumps(metadata, sort_keys=True)
+
+
+def decode_metadata(raw):
+    if not raw:
+        return None
+    metadata = json.loads(raw)
+    if metadata.get("format") != ARTIFACT_FORMAT:
+        return None
+    return metadata
@@ -0,0 +1,125 @@
+import torch
+
+from utils.onnx_session import OnnxSession
+
+from .artifact import DEFAULT_ARCH, METADATA_KEY, decode_metadata, encode_metadata, load_artifact
+from .preprocessing import IMG_SIZE
+
+MODEL_NAME = DEFAULT_ARCH
+
+
+class TorchBackend:
+    """Eager PyTorch execution of the timm model in a ModelArtifact."""
+    name = "torch"
+
+    def __init__(self, artifact):
+        self.model = artifact.build_model()
+        self.metadata = artifact.metadata
+
+    def __call__(self, batch):
+        with torch.no_grad():
+            return self.model(batch)
+
+
+class TorchScriptBackend:
+    """Traced TorchScript graph produced by `manage.py export_disease_model`."""
+    name = "torchscript"
+
+    def __init__(self, artifact_path):
+        extra_files = {"metadata.json": ""}
+        self.model = torch.jit.load(artifact_path, map_location="cpu", _extra_files=extra_files)
+        self.model.eval()
+        self.metadata = decode_metadata(extra_files["metadata.json"])
+
+    def __call__(self, batch):
+        with torch.no_grad():
+            return self.model(batch)
+
+
+class OnnxRuntimeBackend:
+    """ONNX Runtime on the CPU execution provider."""
+    name = "onnx"
+
+    def __init__(self, artifact_path, intra_op_threads=0):
+        try:
+            self.runtime = OnnxSession(artifact_path, intra_op_threads=intra_op_threads)
+        except RuntimeError as e:
+            raise RuntimeError("DETECTOR_BACKEND='onnx' requires the onnxruntime package.") from e
+
+        self.artifact_path = artifact_path
+        custom = self.runtime.custom_metadata  # also fails fast on a bad file
+        self.metadata = decode_metadata(custom.get(METADATA_KEY))
+
+    @property
+    def session(self):
+        return self.runtime.session
+
+    def __call__(self, batch):
+        session = self.session
+        input_name = session.get_inputs()[0].name
+        logits = session.run(None, {input_name: batch.numpy()})[0]
+        return torch.from_numpy(logits)
+
+
+def load_backend(name, model_path, label_path=None, torchscript_path=None, onnx_path=None,
+                 onnx_threads=0, precision="fp32", onnx_int8_path=None):
+    """
+    Build the backend selected by the DETECTOR_BACKEND/DETECTOR_PRECISION
+    settings. `model_path` is the checkpoint artifact; it is only read for
+    the eager torch backend.
+    """
+    if precision == "int8":
+        # Static INT8 is produced by `manage.py quantize_disease_model` and
+        # only ships as an ONNX graph.
+        if name != "onnx":
+            raise ValueError("DETECTOR_PRECISION='int8' requires DETECTOR_BACKEND='onnx'.")
+        return OnnxRuntimeBackend(onnx_int8_path, intra_op_threads=onnx_threads)
+    if precision != "fp32":
+        raise ValueError(f"Unknown detector precision: {precision!r}")
+
+    if name == "torch":
+        return TorchBackend(load_artifact(model_path, label_path))
+    if name == "torchscript":
+        return TorchScriptBackend(torchscript_path)
+    if name == "onnx":
+        return OnnxRuntimeBackend(onnx_path, intra_op_threads=onnx_threads)
+    raise ValueError(f"Unknown detector backend: {name!r}")
+
+
+def export_torchscript(model, output_path, metadata=None):
+    example = torch.randn(1, 3, IMG_SIZE, IMG_SIZE)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    extra_files = {"metadata.json": encode_metadata(metadata)} if metadata else {}
+    traced.save(output_path, _extra_files=extra_files)
+    return output_path
+
+
+def stamp_onnx_metadata(path, metadata):
+    """Store artifact metadata (labels, preprocessing) in an ONNX file's metadata_props."""
+    import onnx
+
+    model = onnx.load(path)
+    for prop in list(model.metadata_props):
+        if prop.key == METADATA_KEY:
+            model.metadata_props.remove(prop)
+    model.metadata_props.add(key=METADATA_KEY, value=encode_metadata(metadata))
+    onnx.save(model, path)
+    return path
+
+
+def export_onnx(model, output_path, opset=17, metadata=None):
+    example = torch.randn(1, 3, IMG_SIZE, IMG_SIZE)
+    torch.onnx.export(
+        model,
+        example,
+        output_path,
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+        dynamo=False,
+    )
+    if metadata:
+        stamp_onnx_metadata(output_path, metadata)
+    return output_path
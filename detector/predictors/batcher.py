@@ -0,0 +1,94 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests for a few milliseconds and runs
+    them through the model as a single batched forward pass.
+
+    `predict_batch` receives a list of items and must return one result per
+    item, in the same order.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=16, max_wait_ms=5):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+
+    def submit(self, item):
+        """Queue an item for the next batch and return a Future for its result."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        """Blocking helper: submit an item and wait for its result."""
+        return self.submit(item).result(timeout=timeout)
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so a batcher created in a
+        # pre-forking master has to start its own worker in each child.
+        pid = os.getpid()
+        if self._pid == pid and self._worker is not None and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == pid and self._worker is not None and self._worker.is_alive():
+                return
+            if self._pid != pid:
+                self._queue = queue.Queue()
+            self._pid = pid
+            self._worker = threading.Thread(
+                target=self._run,
+                name="detector-micro-batcher",
+                daemon=True,
+            )
+            self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        # Drain anything that is already waiting without extending the deadline
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+
+            try:
+                results = self.predict_batch(items)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
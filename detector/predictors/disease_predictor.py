@@ -1,58 +1,149 @@
+import io
+
 import torch
-from torchvision import transforms
-from PIL import Image
+from django.conf import settings
+
+from utils.model_registry import registry
+
+from .artifact import load_artifact
+from .backends import TorchBackend, load_backend
+from .batcher import MicroBatcher
+from .exceptions import UncertaintyUnavailable
+from .preprocessing import build_preprocess
+from .uncertainty import mc_dropout_probs
+
 
 class LeafDiseaseModel:
-    def __init__(self, model_path, label_path):
-        # Load model architecture (match training)
-        import timm
-        self.labels = []
+    """
+    Disease classifier behind every inference path: single images, the
+    request micro-batcher, bulk batches and MC dropout uncertainty.
+
+    `model_path` is a model artifact (see artifact.py); `label_path` is only
+    needed for older bare state-dict checkpoints.
+    """
 
-        with open(label_path, "r") as f:
-            self.labels = [line.strip() for line in f.readlines()]
+    def __init__(self, model_path, label_path=None, backend="torch", torchscript_path=None, onnx_path=None,
+                 precision="fp32", onnx_int8_path=None, max_batch_size=16, max_wait_ms=5):
+        # Eager torch, TorchScript or ONNX Runtime (see backends.py)
+        self.backend = load_backend(
+            backend,
+            model_path=model_path,
+            label_path=label_path,
+            torchscript_path=torchscript_path,
+            onnx_path=onnx_path,
+            precision=precision,
+            onnx_int8_path=onnx_int8_path,
+        )
 
-        num_classes = len(self.labels)
+        # Labels and preprocessing travel with the served file; graphs
+        # exported before metadata was embedded fall back to the checkpoint.
+        metadata = self.backend.metadata or load_artifact(model_path, label_path).metadata
+        self.labels = metadata["labels"]
+        self.preprocessing = metadata["preprocessing"]
+        self.preprocess = build_preprocess(self.preprocessing)
 
-        self.model = timm.create_model(
-            "efficientnet_b0",
-            pretrained=False,
-            num_classes=num_classes
+        # Concurrent requests in this worker share batched forward passes
+        self.batcher = MicroBatcher(
+            self.predict_tensors,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
         )
-        self.model.load_state_dict(torch.load(model_path, map_location="cpu"))
-        self.model.eval()
-
-        self.preprocess = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                [0.485, 0.456, 0.406],
-                [0.229, 0.224, 0.225],
-            ),
-        ])
+
+    def preprocess_image(self, img_path):
+        """Decode an upload (path or file object) into a normalized 3 x H x W tensor."""
+        return self.preprocess(img_path)
+
+    def predict_tensors(self, items):
+        """
+        Run one forward pass over a list of (tensor, top_k) items and
+        return a list of top-k results, one per item.
+        """
+        batch = torch.stack([tensor for tensor, _ in items])
+
+        out = self.backend(batch)
+        probs = torch.softmax(out, dim=1)
+
+        max_k = max(top_k for _, top_k in items)
+        top_probs, top_idxs = probs.topk(max_k)
+
+        return [
+            self._format(top_probs[i, :top_k], top_idxs[i, :top_k])
+            for i, (_, top_k) in enumerate(items)
+        ]
+
+    def predict_batch(self, img_paths, top_k=3):
+        items = [(self.preprocess_image(p), top_k) for p in img_paths]
+        return self.predict_tensors(items)
 
     def predict(self, img_path, top_k=3):
-        img = Image.open(img_path).convert("RGB")
-        tensor = self.preprocess(img).unsqueeze(0)
+        return self.predict_batch([img_path], top_k=top_k)[0]
+
+    def predict_batched(self, img_path, top_k=3):
+        """Preprocess in the calling thread, then join the shared micro-batch."""
+        tensor = self.preprocess_image(img_path)
+        return self.batcher.predict((tensor, top_k))
 
-        with torch.no_grad():
-            out = self.model(tensor)
-            probs = torch.softmax(out, dim=1)
+    def predict_with_uncertainty(self, img_path, top_k=3, runs=20, drop_rate=0.2):
+        """
+        Monte Carlo dropout prediction: mean probability plus its standard
+        deviation across `runs` dropout samples, computed in one batched pass.
+        """
+        if not isinstance(self.backend, TorchBackend):
+            raise UncertaintyUnavailable(
+                f"Uncertainty estimates need the eager torch backend (current: {self.backend.name})."
+            )
 
-        top_probs, top_idxs = probs.topk(top_k)
+        tensor = self.preprocess_image(img_path).unsqueeze(0)
+        mean, std = mc_dropout_probs(self.backend.model, tensor, runs, drop_rate=drop_rate)
+        top_probs, top_idxs = mean.topk(top_k)
+
+        results = self._format(top_probs, top_idxs)
+        for result, idx in zip(results, top_idxs):
+            result["uncertainty"] = float(std[idx])
+        return results
 
-        results = [
+    def _format(self, top_probs, top_idxs):
+        return [
             {
                 "label": self.labels[idx],
                 "confidence": float(prob)
             }
-            for prob, idx in zip(top_probs[0], top_idxs[0])
+            for prob, idx in zip(top_probs, top_idxs)
         ]
 
-        return results
 
+def load_default_model():
+    """Registry loader for the "disease" model (see DetectorConfig.ready)."""
+    return LeafDiseaseModel(
+        model_path=getattr(settings, "DETECTOR_MODEL_PATH", "detector/model/disease_model/best_model.pth"),
+        label_path=getattr(settings, "DETECTOR_LABELS_PATH", None),
+        backend=getattr(settings, "DETECTOR_BACKEND", "torch"),
+        torchscript_path=getattr(settings, "DETECTOR_TORCHSCRIPT_PATH", None),
+        onnx_path=getattr(settings, "DETECTOR_ONNX_PATH", None),
+        precision=getattr(settings, "DETECTOR_PRECISION", "fp32"),
+        onnx_int8_path=getattr(settings, "DETECTOR_ONNX_INT8_PATH", None),
+        max_batch_size=getattr(settings, "DETECTOR_BATCH_MAX_SIZE", 16),
+        max_wait_ms=getattr(settings, "DETECTOR_BATCH_MAX_WAIT_MS", 5),
+    )
+
+
+def predict_uploads(images, top_k=3):
+    """Inference task "disease": raw upload bytes -> top-k predictions per image."""
+    model = registry.get("disease")
+    if len(images) == 1:
+        # A lone request still shares forward passes with concurrent threads
+        return [model.predict_batched(io.BytesIO(images[0]), top_k=top_k)]
+    return model.predict_batch([io.BytesIO(data) for data in images], top_k=top_k)
 
-# Load ONCE globally (crucial)
-model = LeafDiseaseModel(
-    model_path="detector/model/disease_model/best_model.pth",
-    label_path="detector/model/disease_model/labels.txt"
-)
+
+def predict_uploads_with_uncertainty(images):
+    """Inference task "disease-uncertainty": MC dropout predictions per image."""
+    model = registry.get("disease")
+    return [
+        model.predict_with_uncertainty(
+            io.BytesIO(data),
+            runs=settings.DETECTOR_MC_DROPOUT_RUNS,
+            drop_rate=settings.DETECTOR_MC_DROPOUT_RATE,
+        )
+        for data in images
+    ]
@@ -0,0 +1,5 @@
+# Kept free of torch imports so views can catch these without loading the model stack
+
+
+class UncertaintyUnavailable(Exception):
+    """The configured backend cannot produce Monte Carlo dropout estimates."""
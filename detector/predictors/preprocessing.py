@@ -0,0 +1,102 @@
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import transforms
+
+IMG_SIZE = 224
+MEAN = [0.485, 0.456, 0.406]
+STD = [0.229, 0.224, 0.225]
+
+# Preprocessing metadata stored with each model artifact (see artifact.py).
+# "squash" resizes straight to size x size; "center_crop" resizes the shorter
+# side to size * crop_ratio and crops the center size x size.
+DEFAULT_PREPROCESSING = {
+    "resize": "squash",
+    "size": IMG_SIZE,
+    "mean": MEAN,
+    "std": STD,
+}
+
+
+def build_transform(preprocessing=None):
+    """
+    Reference torchvision transform. Serving uses `build_preprocess`, which
+    produces the same tensor (up to draft-decode differences) much faster.
+    """
+    cfg = preprocessing or DEFAULT_PREPROCESSING
+    size = cfg["size"]
+    if cfg["resize"] == "center_crop":
+        resize = [transforms.Resize(int(size * cfg["crop_ratio"])), transforms.CenterCrop(size)]
+    else:
+        resize = [transforms.Resize((size, size))]
+    return transforms.Compose([
+        *resize,
+        transforms.ToTensor(),
+        transforms.Normalize(cfg["mean"], cfg["std"]),
+    ])
+
+
+def load_image(src, size=IMG_SIZE, resize="squash", crop_ratio=None):
+    """
+    Open an image (path or file object) as RGB at `size` x `size`.
+
+    For JPEGs the decoder is asked for the smallest DCT scale (1/2, 1/4, 1/8)
+    that is still large enough for the resize, so a 12MP phone photo is
+    never fully decoded just to be shrunk to 224px.
+    """
+    img = Image.open(src)
+
+    if resize == "center_crop":
+        short = int(size * crop_ratio)
+        img.draft("RGB", (short, short))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        # Same geometry as transforms.Resize(int) + transforms.CenterCrop
+        w, h = img.size
+        if w <= h:
+            new_w, new_h = short, int(short * h / w)
+        else:
+            new_w, new_h = int(short * w / h), short
+        img = img.resize((new_w, new_h), Image.Resampling.BILINEAR)
+        left = int(round((new_w - size) / 2.0))
+        top = int(round((new_h - size) / 2.0))
+        return img.crop((left, top, left + size, top + size))
+
+    img.draft("RGB", (size, size))
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img.resize((size, size), Image.Resampling.BILINEAR)
+
+
+def _normalization(mean, std):
+    # Normalize((x / 255 - mean) / std) folded into one multiply-subtract
+    scale = torch.tensor([1.0 / (255.0 * s) for s in std]).view(3, 1, 1)
+    shift = torch.tensor([m / s for m, s in zip(mean, std)]).view(3, 1, 1)
+    return scale, shift
+
+
+_SCALE, _SHIFT = _normalization(MEAN, STD)
+
+
+def to_tensor(img, scale=_SCALE, shift=_SHIFT):
+    """Normalized 3 x H x W float tensor from an RGB PIL image."""
+    # One copy (uint8 HWC -> float32 CHW); normalization then runs in place.
+    # The tensor is handed to the micro-batcher, so it must not be shared.
+    chw = np.ascontiguousarray(np.asarray(img).transpose(2, 0, 1), dtype=np.float32)
+    return torch.from_numpy(chw).mul_(scale).sub_(shift)
+
+
+def build_preprocess(preprocessing=None):
+    """Return a `src -> tensor` function for an artifact's preprocessing metadata."""
+    cfg = preprocessing or DEFAULT_PREPROCESSING
+    scale, shift = _normalization(cfg["mean"], cfg["std"])
+    size, resize, crop_ratio = cfg["size"], cfg["resize"], cfg.get("crop_ratio")
+
+    def preprocess(src):
+        return to_tensor(load_image(src, size, resize, crop_ratio), scale, shift)
+
+    return preprocess
+
+
+preprocess = build_preprocess()
@@ -0,0 +1,114 @@
+import os
+import random
+import time
+
+import torch
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def sample_dataset(root, labels, per_class, seed=0, exclude=None):
+    """
+    Pick up to `per_class` (path, label_index) pairs from an ImageFolder-style
+    directory, skipping any path in `exclude`.
+    """
+    rng = random.Random(seed)
+    exclude = exclude or set()
+    samples = []
+
+    for idx, label in enumerate(labels):
+        folder = os.path.join(root, label)
+        if not os.path.isdir(folder):
+            continue
+        files = sorted(
+            os.path.join(folder, name)
+            for name in os.listdir(folder)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        files = [f for f in files if f not in exclude]
+        rng.shuffle(files)
+        samples.extend((path, idx) for path in files[:per_class])
+
+    return samples
+
+
+def _load_tensor(path, preprocess):
+    return preprocess(path)
+
+
+def calibration_reader(samples, preprocess, input_name="input"):
+    """ONNX Runtime calibration reader that feeds preprocessed images one at a time."""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._iter = iter(samples)
+
+        def get_next(self):
+            item = next(self._iter, None)
+            if item is None:
+                return None
+            tensor = _load_tensor(item[0], preprocess).unsqueeze(0)
+            return {input_name: tensor.numpy()}
+
+    return _Reader()
+
+
+def quantize_onnx_model(fp32_path, int8_path, samples, preprocess, metadata=None):
+    """
+    Post-training static INT8 quantization of the exported ONNX graph.
+
+    Activation ranges are calibrated on `samples`; weights are quantized
+    per-channel. `metadata` (labels, preprocessing) is carried over to the
+    INT8 file.
+    """
+    try:
+        from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+    except ImportError as e:
+        raise RuntimeError("INT8 quantization requires the onnx and onnxruntime packages.") from e
+
+    prepared_path = f"{int8_path}.pre.onnx"
+    quant_pre_process(fp32_path, prepared_path)
+    try:
+        quantize_static(
+            prepared_path,
+            int8_path,
+            calibration_reader(samples, preprocess),
+            quant_format=QuantFormat.QOperator,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+    finally:
+        os.remove(prepared_path)
+
+    if metadata:
+        from .backends import stamp_onnx_metadata
+
+        stamp_onnx_metadata(int8_path, metadata)
+    return int8_path
+
+
+def evaluate(backend, samples, preprocess, batch_size=16):
+    """Return (top-1 accuracy, median ms per image, predicted indices) for a backend."""
+    correct = 0
+    predictions = []
+    timings = []
+
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        batch = torch.stack([_load_tensor(path, preprocess) for path, _ in chunk])
+
+        began = time.perf_counter()
+        logits = backend(batch)
+        timings.append((time.perf_counter() - began) / len(chunk))
+
+        preds = logits.argmax(dim=1).tolist()
+        predictions.extend(preds)
+        correct += sum(int(p == label) for p, (_, label) in zip(preds, chunk))
+
+    timings.sort()
+    median_ms = timings[len(timings) // 2] * 1000 if timings else 0.0
+    accuracy = correct / len(samples) if samples else 0.0
+    return accuracy, median_ms, predictions
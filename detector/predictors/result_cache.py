@@ -0,0 +1,189 @@
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+HASH_BITS = 64
+
+
+def perceptual_hash(data):
+    """
+    64-bit difference hash (dHash) of an encoded image.
+
+    Re-encoded, resized or lightly recompressed copies of the same photo end
+    up within a few bits of each other.
+    """
+    img = Image.open(io.BytesIO(data))
+    img.draft("L", (64, 64))  # JPEG: decode at reduced scale, much cheaper
+    img = img.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = img.tobytes()
+
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+class CacheKey:
+    __slots__ = ("digest", "phash")
+
+    def __init__(self, digest, phash):
+        self.digest = digest
+        self.phash = phash
+
+
+class PredictionCache:
+    """
+    In-process LRU/TTL cache of model predictions for uploaded images.
+
+    Lookups try the exact SHA-256 of the upload first, then (when enabled)
+    any stored image whose perceptual hash is within `max_distance` bits.
+    Near-duplicate lookups use a banded index: if two 64-bit hashes differ in
+    at most d bits, at least one of d + 1 disjoint bands matches exactly.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, max_distance=4):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.max_distance = max_distance
+
+        self._entries = OrderedDict()  # digest -> (phash, predictions, expires_at)
+        self._bands = {}               # (band, band value) -> set of digests
+        self._lock = threading.Lock()
+
+        band_count = max_distance + 1 if max_distance >= 0 else 0
+        self._band_masks = []
+        if band_count:
+            width, extra = divmod(HASH_BITS, band_count)
+            shift = 0
+            for i in range(band_count):
+                bits = width + (1 if i < extra else 0)
+                self._band_masks.append((shift, (1 << bits) - 1))
+                shift += bits
+
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def key_for(self, data):
+        """Cache key for an upload; None when the cache is disabled (nothing is hashed)."""
+        if not self.enabled:
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        phash = None
+        if self.max_distance >= 0:
+            try:
+                phash = perceptual_hash(data)
+            except Exception:
+                # Undecodable uploads can still be cached by exact hash
+                phash = None
+        return CacheKey(digest, phash)
+
+    def get(self, key):
+        if key is None:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key.digest)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key.digest)
+                self.exact_hits += 1
+                return entry[1]
+
+            match = self._nearest(key.phash, now)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self.perceptual_hits += 1
+                return self._entries[match][1]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, predictions):
+        if key is None or not self.enabled:
+            return
+
+        with self._lock:
+            self._remove(key.digest)
+            self._entries[key.digest] = (key.phash, predictions, time.monotonic() + self.ttl)
+            if key.phash is not None:
+                for band in self._band_keys(key.phash):
+                    self._bands.setdefault(band, set()).add(key.digest)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.perceptual_hits + self.misses
+            hits = self.exact_hits + self.perceptual_hits
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "perceptual_hits": self.perceptual_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+
+    def _band_keys(self, phash):
+        return [(i, (phash >> shift) & mask) for i, (shift, mask) in enumerate(self._band_masks)]
+
+    def _nearest(self, phash, now):
+        if phash is None or not self._band_masks:
+            return None
+
+        best, best_distance = None, self.max_distance + 1
+        candidates = set()
+        for band in self._band_keys(phash):
+            candidates |= self._bands.get(band, set())
+
+        for digest in candidates:
+            stored_phash, _, expires_at = self._entries[digest]
+            if expires_at <= now:
+                continue
+            distance = (stored_phash ^ phash).bit_count()
+            if distance < best_distance:
+                best, best_distance = digest, distance
+        return best
+
+    def _remove(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is None or entry[0] is None:
+            return
+        for band in self._band_keys(entry[0]):
+            digests = self._bands.get(band)
+            if digests is not None:
+                digests.discard(digest)
+                if not digests:
+                    del self._bands[band]
+
+
+def cache_from_settings():
+    from django.conf import settings
+
+    return PredictionCache(
+        max_entries=getattr(settings, "DETECTOR_RESULT_CACHE_SIZE", 1024),
+        ttl_seconds=getattr(settings, "DETECTOR_RESULT_CACHE_TTL", 3600),
+        max_distance=getattr(settings, "DETECTOR_PHASH_MAX_DISTANCE", 4),
+    )
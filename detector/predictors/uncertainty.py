@@ -0,0 +1,46 @@
+import torch
+import torch.nn.functional as F
+
+
+def enable_mc_dropout(model):
+    """Eval mode everywhere except dropout layers (BatchNorm keeps running stats)."""
+    model.eval()
+    for m in model.modules():
+        if isinstance(m, torch.nn.Dropout):
+            m.train()
+    return model
+
+
+def mc_dropout_probs(model, x, runs, drop_rate=None):
+    """
+    Monte Carlo dropout over `runs` stochastic passes, computed as one batch.
+
+    Returns (mean_probs, std_probs), each `classes` long, for a single
+    1 x C x H x W input.
+
+    timm models only apply dropout in the classifier head, so the backbone
+    output is identical across runs: it is computed once and the pooled
+    features are replicated N times through dropout + classifier, with
+    `drop_rate` (the model's own drop_rate when None). Other models get the
+    input replicated into an N-sized batch with only their Dropout layers
+    active, at their configured rates.
+    """
+    with torch.no_grad():
+        if hasattr(model, "forward_head") and hasattr(model, "get_classifier"):
+            p = getattr(model, "drop_rate", 0.0) if drop_rate is None else drop_rate
+            was_training = model.training
+            model.eval()
+            features = model.forward_head(model.forward_features(x), pre_logits=True)
+            model.train(was_training)
+
+            features = features.expand(runs, -1)
+            logits = model.get_classifier()(F.dropout(features, p=p, training=True))
+        else:
+            enable_mc_dropout(model)
+            try:
+                logits = model(x.expand(runs, -1, -1, -1))
+            finally:
+                model.eval()
+
+        probs = F.softmax(logits, dim=1)
+    return probs.mean(dim=0), probs.std(dim=0, unbiased=False)
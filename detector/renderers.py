@@ -0,0 +1,19 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept `Accept: text/event-stream` (sent by every
+    EventSource). The events themselves are written by a StreamingHttpResponse;
+    this only renders error responses (404, 401) raised before streaming.
+    """
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return f"event: error\ndata: {json.dumps(data)}\n\n".encode()
@@ -1,5 +1,45 @@
 # detector/serializers.py
 from rest_framework import serializers
 
+from .history import decode_predictions
+from .models import DiseaseDetection
+from .services import CONFIDENCE_THRESHOLD
+
 class ImageUploadSerializer(serializers.Serializer):
     image = serializers.ImageField()
+    # Opt-in Monte Carlo dropout estimate (slower, eager torch backend only)
+    uncertainty = serializers.BooleanField(required=False, default=False)
+
+
+class BatchUploadSerializer(serializers.Serializer):
+    images = serializers.ListField(child=serializers.FileField(), required=False, allow_empty=False)
+    archive = serializers.FileField(required=False)
+
+    def validate(self, attrs):
+        if bool(attrs.get("images")) == bool(attrs.get("archive")):
+            raise serializers.ValidationError("Provide either `images` (one or more files) or a zip `archive`.")
+        return attrs
+
+
+class DiseaseDetectionSerializer(serializers.ModelSerializer):
+    status = serializers.SerializerMethodField()
+    prediction = serializers.SerializerMethodField()
+    alternatives = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DiseaseDetection
+        fields = ["id", "status", "prediction", "alternatives", "created_at"]
+
+    def _predictions(self, obj):
+        if not hasattr(obj, "_decoded"):
+            obj._decoded = decode_predictions(obj.top_labels, obj.top_probs)
+        return obj._decoded
+
+    def get_status(self, obj):
+        return "ok" if self._predictions(obj)[0]["confidence"] >= CONFIDENCE_THRESHOLD else "unsure"
+
+    def get_prediction(self, obj):
+        return self._predictions(obj)[0]
+
+    def get_alternatives(self, obj):
+        return self._predictions(obj)[1:]
@@ -1,57 +1,283 @@
-import google.generativeai as genai
+from collections import OrderedDict
+from datetime import timedelta
 from decouple import config
+from django.db.models import F, TextField, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
 import logging
+import threading
+import time
+
+from utils import background
 
 logger = logging.getLogger(__name__)
 
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# Bump whenever the prompt changes so stale plans are regenerated
+PROMPT_VERSION = 1
+
+# An unfinished job older than this is assumed lost (e.g. worker restarted)
+JOB_STALE_AFTER = timedelta(minutes=5)
+
+# Streamed text is appended to the job row at most this often (seconds)
+# or once this many characters are pending, not on every chunk
+JOB_FLUSH_INTERVAL = 0.5
+JOB_FLUSH_CHARS = 1024
+
+MISSING_KEY_MESSAGE = "AI treatment plan is unavailable because the API key is missing. Please contact the administrator."
+
+
+# Below this the detect endpoint answers "unsure" and lists candidates
+CONFIDENCE_THRESHOLD = 0.60
+
+
+def confidence_bucket(confidence):
+    """Map a model confidence onto the buckets plans are cached under."""
+    return "high" if confidence >= 0.85 else "moderate"
+
+
+class TreatmentUnavailable(Exception):
+    """The LLM cannot be used (e.g. no API key configured)."""
+
+
+class _PlanLRU:
+    """Small in-process LRU in front of the TreatmentPlan table."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 class TreatmentService:
+    _cache = _PlanLRU()
+
+    @staticmethod
+    def get_cached_plan(disease_name, confidence):
+        """
+        Returns the stored plan for a disease from the in-process LRU or the
+        TreatmentPlan table, or None if it has not been generated yet.
+        """
+        from .models import TreatmentPlan
+
+        bucket = confidence_bucket(confidence)
+        key = (disease_name, bucket, PROMPT_VERSION)
+
+        cached = TreatmentService._cache.get(key)
+        if cached is not None:
+            return cached
+
+        stored = TreatmentPlan.objects.filter(
+            label=disease_name,
+            confidence_bucket=bucket,
+            prompt_version=PROMPT_VERSION,
+        ).first()
+        if stored is not None:
+            result = TreatmentService._success(stored.plan, stored.model_name)
+            TreatmentService._cache.set(key, result)
+            return result
+
+        return None
+
     @staticmethod
     def get_treatment_plan(disease_name, confidence):
         """
-        Generates a treatment plan using Google's Gemini AI.
+        Returns the treatment plan for a disease, from cache if possible and
+        otherwise by calling Gemini synchronously.
         """
-        api_key = config("GEMINI_API_KEY", default=None)
-        
-        if not api_key:
-            logger.warning("GEMINI_API_KEY is missing. Skipping AI treatment plan.")
-            return {
-                "status": "warning",
-                "message": "AI treatment plan is unavailable because the API key is missing. Please contact the administrator."
-            }
+        cached = TreatmentService.get_cached_plan(disease_name, confidence)
+        if cached is not None:
+            return cached
+
+        bucket = confidence_bucket(confidence)
+        result = TreatmentService.generate_treatment_plan(disease_name, bucket)
+        if result.get("status") == "success":
+            TreatmentService.save_plan(disease_name, bucket, result["treatment_plan"])
+        return result
+
+    @staticmethod
+    def start_treatment_job(disease_name, confidence, user=None):
+        """
+        Returns (cached_plan, None) when the plan is already known, otherwise
+        (None, job) where `job` generates the plan in the background.
+
+        Concurrent detections of the same disease share one in-flight job.
+        """
+        from .models import TreatmentJob
+
+        cached = TreatmentService.get_cached_plan(disease_name, confidence)
+        if cached is not None:
+            return cached, None
+
+        bucket = confidence_bucket(confidence)
+        in_flight = TreatmentJob.objects.filter(
+            label=disease_name,
+            confidence_bucket=bucket,
+            prompt_version=PROMPT_VERSION,
+            status__in=["pending", "running"],
+            updated_at__gte=timezone.now() - JOB_STALE_AFTER,
+        ).order_by("-created_at").first()
+        if in_flight is not None:
+            return None, in_flight
+
+        job = TreatmentJob.objects.create(
+            user=user,
+            label=disease_name,
+            confidence_bucket=bucket,
+            prompt_version=PROMPT_VERSION,
+        )
+        background.submit(TreatmentService.run_treatment_job, job.id)
+        return None, job
+
+    @staticmethod
+    def run_treatment_job(job_id):
+        """Background task: stream the plan from Gemini into the job row."""
+        from .models import TreatmentJob
+
+        job = TreatmentJob.objects.get(id=job_id)
+        TreatmentJob.objects.filter(id=job_id).update(status="running", plan="", updated_at=timezone.now())
+
+        chunks, pending = [], []
+        last_flush = time.monotonic()
+
+        def flush():
+            # Append only the new text, so total writes grow linearly with the plan
+            if pending:
+                text = Concat(F("plan"), Value("".join(pending)), output_field=TextField())
+                TreatmentJob.objects.filter(id=job_id).update(plan=text, updated_at=timezone.now())
+                pending.clear()
 
         try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            
-            prompt = f"""
-            The user has a plant with a detected disease: "{disease_name}" (Confidence: {confidence:.1%}).
-            
+            for chunk in TreatmentService.stream_treatment_plan(job.label, job.confidence_bucket):
+                chunks.append(chunk)
+                pending.append(chunk)
+                # Persist partial text so poll/stream endpoints in any worker see it
+                if time.monotonic() - last_flush >= JOB_FLUSH_INTERVAL or sum(map(len, pending)) >= JOB_FLUSH_CHARS:
+                    flush()
+                    last_flush = time.monotonic()
+            flush()
+        except Exception as e:
+            logger.error(f"Error generating treatment plan: {str(e)}")
+            message = str(e) if isinstance(e, TreatmentUnavailable) else "Failed to generate treatment plan due to an internal error."
+            TreatmentJob.objects.filter(id=job_id).update(
+                status="failed", error=message[:255], updated_at=timezone.now()
+            )
+            return
+
+        plan = "".join(chunks)
+        if not plan.strip():
+            TreatmentJob.objects.filter(id=job_id).update(
+                status="failed", error="AI returned an empty response.", updated_at=timezone.now()
+            )
+            return
+
+        TreatmentService.save_plan(job.label, job.confidence_bucket, plan)
+        TreatmentJob.objects.filter(id=job_id).update(status="done", updated_at=timezone.now())
+
+    @staticmethod
+    def save_plan(disease_name, bucket, plan):
+        from .models import TreatmentPlan
+
+        TreatmentPlan.objects.update_or_create(
+            label=disease_name,
+            confidence_bucket=bucket,
+            prompt_version=PROMPT_VERSION,
+            defaults={"plan": plan, "model_name": GEMINI_MODEL},
+        )
+
+    @staticmethod
+    def build_prompt(disease_name, bucket):
+        certainty = "high" if bucket == "high" else "moderate (60-85%)"
+        return f"""
+            The user has a plant with a detected disease: "{disease_name}" (Detection confidence: {certainty}).
+
             Please provide a detailed and practical treatment plan. Structure your response as follows:
             1. **Immediate Actions**: What should the farmer do right now?
             2. **Chemical Control**: Recommended fungicides or pesticides (mention active ingredients).
             3. **Organic/Natural Control**: Non-chemical alternatives.
             4. **Prevention**: How to stop this from happening again.
-            
+
             Keep the advice concise, actionable, and easy to understand for a farmer.
             """
-            
-            response = model.generate_content(prompt)
-            
+
+    @staticmethod
+    def gemini_model():
+        """Build the Gemini client. Tests replace this with a local fake."""
+        api_key = config("GEMINI_API_KEY", default=None)
+        if not api_key:
+            raise TreatmentUnavailable(MISSING_KEY_MESSAGE)
+
+        # Imported lazily: the SDK is heavy and only needed on this path
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(GEMINI_MODEL)
+
+    @staticmethod
+    def stream_treatment_plan(disease_name, bucket):
+        """Yield the plan text chunk by chunk as Gemini streams it."""
+        model = TreatmentService.gemini_model()
+        response = model.generate_content(
+            TreatmentService.build_prompt(disease_name, bucket),
+            stream=True,
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    @staticmethod
+    def generate_treatment_plan(disease_name, bucket):
+        """
+        Generates a treatment plan using Google's Gemini AI.
+        """
+        try:
+            model = TreatmentService.gemini_model()
+            response = model.generate_content(TreatmentService.build_prompt(disease_name, bucket))
+
             if response.text:
-                return {
-                    "status": "success",
-                    "treatment_plan": response.text,
-                    "model": "Gemini Pro"
-                }
+                return TreatmentService._success(response.text, GEMINI_MODEL)
             else:
                 return {
                     "status": "error",
                     "message": "AI returned an empty response."
                 }
-            
+
+        except TreatmentUnavailable as e:
+            logger.warning("GEMINI_API_KEY is missing. Skipping AI treatment plan.")
+            return {
+                "status": "warning",
+                "message": str(e)
+            }
         except Exception as e:
             logger.error(f"Error generating treatment plan: {str(e)}")
             return {
                 "status": "error",
                 "message": "Failed to generate treatment plan due to an internal error."
             }
+
+    @staticmethod
+    def _success(plan, model_name):
+        return {
+            "status": "success",
+            "treatment_plan": plan,
+            "model": model_name
+        }
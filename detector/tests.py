@@ -1,3 +1,727 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
 
-# Create your tests here.
+import torch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from PIL import Image
+
+from .predictors.uncertainty import mc_dropout_probs
+from .predictors import backends, preprocessing
+from .predictors.artifact import ModelArtifact, load_artifact
+from .predictors.batcher import MicroBatcher
+from .predictors.result_cache import PredictionCache
+from organizations.models import ApiKey, B2BOrganization
+from utils import inference
+from utils.inference import InferenceBusy, InferenceClient
+from utils.inference_server import InferenceServer
+from utils.model_registry import registry
+from . import history, outbreaks
+from .models import BatchDetectionJob, DiseaseDetection, DiseaseOutbreakCounter, TreatmentJob, TreatmentPlan
+from .services import PROMPT_VERSION, TreatmentService
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_requests_share_a_batch(self):
+        batch_sizes = []
+
+        def predict_batch(items):
+            batch_sizes.append(len(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=50)
+        results = {}
+
+        def call(i):
+            results[i] = batcher.predict(i, timeout=5)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, {i: i * 2 for i in range(8)})
+        self.assertLess(len(batch_sizes), 8)
+        self.assertTrue(all(size <= 8 for size in batch_sizes))
+
+    def test_errors_are_raised_in_every_caller(self):
+        def predict_batch(items):
+            raise RuntimeError("model failed")
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait_ms=1)
+        with self.assertRaises(RuntimeError):
+            batcher.predict(1, timeout=5)
+
+
+class BackendParityTests(SimpleTestCase):
+    """Exported graphs must agree with eager PyTorch on top-k results."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import timm
+
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.labels = [f"class_{i}" for i in range(15)]
+        torch.manual_seed(0)
+        model = timm.create_model(backends.MODEL_NAME, pretrained=False, num_classes=15)
+        cls.artifact = ModelArtifact(
+            backends.MODEL_NAME, cls.labels, preprocessing.DEFAULT_PREPROCESSING, model.state_dict()
+        )
+
+        cls.eager = backends.TorchBackend(cls.artifact)
+        cls.batch = torch.randn(4, 3, backends.IMG_SIZE, backends.IMG_SIZE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def assertSameTopK(self, logits, k=3):
+        expected = self.eager(self.batch).softmax(dim=1).topk(k)
+        actual = logits.softmax(dim=1).topk(k)
+        self.assertTrue(torch.equal(actual.indices, expected.indices))
+        self.assertTrue(torch.allclose(actual.values, expected.values, atol=1e-4))
+
+    def test_torchscript_matches_eager(self):
+        path = os.path.join(self.tmpdir.name, "model.ts")
+        backends.export_torchscript(self.eager.model, path, metadata=self.artifact.metadata)
+        backend = backends.TorchScriptBackend(path)
+        self.assertSameTopK(backend(self.batch))
+        self.assertEqual(backend.metadata["labels"], self.labels)
+
+    def test_onnx_matches_eager(self):
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError:
+            raise unittest.SkipTest("onnxruntime is not installed")
+
+        path = os.path.join(self.tmpdir.name, "model.onnx")
+        backends.export_onnx(self.eager.model, path, metadata=self.artifact.metadata)
+        backend = backends.OnnxRuntimeBackend(path)
+        self.assertSameTopK(backend(self.batch))
+        self.assertEqual(backend.metadata["preprocessing"], preprocessing.DEFAULT_PREPROCESSING)
+
+    def test_int8_quantization_keeps_fp32_predictions(self):
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError:
+            raise unittest.SkipTest("onnxruntime is not installed")
+        from .predictors.quantization import evaluate, quantize_onnx_model, sample_dataset
+
+        # ImageFolder-style split: a few noisy, differently tinted images per class
+        root = os.path.join(self.tmpdir.name, "val")
+        rng = torch.Generator().manual_seed(0)
+        for idx, label in enumerate(self.labels[:4]):
+            os.makedirs(os.path.join(root, label))
+            for i in range(6):
+                tint = torch.tensor([idx * 60, 255 - idx * 60, 40 * i]).view(3, 1, 1)
+                pixels = (tint + torch.randint(0, 60, (3, 64, 64), generator=rng)).clamp(0, 255)
+                Image.fromarray(pixels.permute(1, 2, 0).byte().numpy()).save(os.path.join(root, label, f"{i}.png"))
+
+        calibration = sample_dataset(root, self.labels, per_class=3)
+        held_out = sample_dataset(root, self.labels, per_class=3, seed=1, exclude={p for p, _ in calibration})
+        self.assertEqual((len(calibration), len(held_out)), (12, 12))
+
+        fp32_path = os.path.join(self.tmpdir.name, "model_fp32.onnx")
+        int8_path = os.path.join(self.tmpdir.name, "model_int8.onnx")
+        backends.export_onnx(self.eager.model, fp32_path, metadata=self.artifact.metadata)
+        quantize_onnx_model(fp32_path, int8_path, calibration, preprocessing.preprocess, self.artifact.metadata)
+
+        int8 = backends.load_backend("onnx", None, precision="int8", onnx_int8_path=int8_path)
+        self.assertEqual(int8.metadata["labels"], self.labels)
+        self.assertEqual(int8(self.batch).shape, (4, len(self.labels)))
+
+        fp32 = backends.load_backend("onnx", None, onnx_path=fp32_path)
+        _, _, fp32_preds = evaluate(fp32, held_out, preprocessing.preprocess)
+        _, _, int8_preds = evaluate(int8, held_out, preprocessing.preprocess)
+        agreement = sum(a == b for a, b in zip(fp32_preds, int8_preds)) / len(held_out)
+        self.assertGreaterEqual(agreement, 0.75)
+
+        with self.assertRaises(ValueError):
+            backends.load_backend("torch", None, precision="int8", onnx_int8_path=int8_path)
+
+    def test_legacy_checkpoints_load_as_artifacts(self):
+        state = self.artifact.state_dict
+        labels_path = os.path.join(self.tmpdir.name, "labels.txt")
+        with open(labels_path, "w") as f:
+            f.write("\n".join(self.labels) + "\n")
+
+        bare = os.path.join(self.tmpdir.name, "best_model.pth")
+        torch.save(state, bare)
+        artifact = load_artifact(bare, labels_path)
+        self.assertEqual(artifact.labels, self.labels)
+        self.assertEqual(artifact.preprocessing["resize"], "squash")
+
+        old = os.path.join(self.tmpdir.name, "checkpoint.pth")
+        torch.save({"model_state": state, "class_to_idx": {name: i for i, name in enumerate(self.labels)}}, old)
+        artifact = load_artifact(old)
+        self.assertEqual(artifact.labels, self.labels)
+        self.assertEqual(artifact.preprocessing["resize"], "center_crop")
+
+        path = artifact.save(os.path.join(self.tmpdir.name, "model.pt"))
+        reloaded = load_artifact(path)
+        self.assertEqual(reloaded.metadata, artifact.metadata)
+        self.assertSameTopK(backends.TorchBackend(reloaded)(self.batch))
+
+
+SAMPLE_IMAGES = sorted(
+    os.path.join("crop_images", name) for name in os.listdir("crop_images")
+)
+
+
+def _reencode(path, scale=1.0, quality=90):
+    img = Image.open(path).convert("RGB")
+    if scale != 1.0:
+        img = img.resize((int(img.width * scale), int(img.height * scale)))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+class PreprocessingParityTests(SimpleTestCase):
+    def test_normalization_matches_torchvision(self):
+        img = Image.open(SAMPLE_IMAGES[0]).convert("RGB").resize((preprocessing.IMG_SIZE,) * 2)
+        expected = preprocessing.build_transform()(img)
+        self.assertTrue(torch.allclose(preprocessing.to_tensor(img), expected, atol=1e-5))
+
+    def test_center_crop_matches_torchvision_geometry(self):
+        cfg = {**preprocessing.DEFAULT_PREPROCESSING, "resize": "center_crop", "crop_ratio": 1.14}
+        img = Image.open(SAMPLE_IMAGES[1]).convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")  # lossless: no draft decode
+        expected = preprocessing.build_transform(cfg)(img)
+        actual = preprocessing.build_preprocess(cfg)(io.BytesIO(buf.getvalue()))
+        self.assertTrue(torch.allclose(actual, expected, atol=1e-5))
+
+    def test_draft_decode_stays_close_to_reference(self):
+        for data in (_reencode(SAMPLE_IMAGES[0]), _reencode(SAMPLE_IMAGES[0], scale=4.0)):
+            expected = preprocessing.build_transform()(Image.open(io.BytesIO(data)).convert("RGB"))
+            actual = preprocessing.preprocess(io.BytesIO(data))
+            self.assertEqual(actual.shape, expected.shape)
+            self.assertEqual(actual.dtype, torch.float32)
+            self.assertLess((actual - expected).abs().mean().item(), 0.05)
+
+
+class MCDropoutTests(SimpleTestCase):
+    def test_single_pass_mc_dropout_leaves_batchnorm_untouched(self):
+        import timm
+
+        torch.manual_seed(0)
+        model = timm.create_model(backends.MODEL_NAME, pretrained=False, num_classes=15).eval()
+        bn = next(m for m in model.modules() if isinstance(m, torch.nn.BatchNorm2d))
+        running_mean = bn.running_mean.clone()
+
+        mean, std = mc_dropout_probs(model, torch.randn(1, 3, 224, 224), runs=16, drop_rate=0.3)
+
+        self.assertEqual(mean.shape, (15,))
+        self.assertAlmostEqual(mean.sum().item(), 1.0, places=4)
+        self.assertGreater(std.max().item(), 0)
+        self.assertFalse(model.training)
+        self.assertTrue(torch.equal(bn.running_mean, running_mean))
+
+    def test_drop_rate_argument_overrides_the_model(self):
+        import timm
+
+        torch.manual_seed(0)
+        model = timm.create_model(backends.MODEL_NAME, pretrained=False, num_classes=15, drop_rate=0.5).eval()
+        x = torch.randn(1, 3, 224, 224)
+
+        _, std = mc_dropout_probs(model, x, runs=8, drop_rate=0.0)
+        self.assertEqual(std.max().item(), 0)
+        _, std = mc_dropout_probs(model, x, runs=8)
+        self.assertGreater(std.max().item(), 0)
+
+
+class PredictionCacheTests(SimpleTestCase):
+    predictions = [{"label": "Tomato_healthy", "confidence": 0.93}]
+
+    def test_exact_and_near_duplicate_hits(self):
+        cache = PredictionCache(max_entries=8, ttl_seconds=60, max_distance=4)
+        original = _reencode(SAMPLE_IMAGES[0])
+        cache.set(cache.key_for(original), self.predictions)
+
+        self.assertEqual(cache.get(cache.key_for(original)), self.predictions)
+
+        # Same photo re-uploaded at a different size and JPEG quality
+        recompressed = _reencode(SAMPLE_IMAGES[0], scale=0.5, quality=60)
+        self.assertEqual(cache.get(cache.key_for(recompressed)), self.predictions)
+
+        different = _reencode(SAMPLE_IMAGES[1])
+        self.assertIsNone(cache.get(cache.key_for(different)))
+
+        stats = cache.stats()
+        self.assertEqual((stats["exact_hits"], stats["perceptual_hits"], stats["misses"]), (1, 1, 1))
+
+    def test_lru_and_ttl_eviction(self):
+        cache = PredictionCache(max_entries=1, ttl_seconds=60, max_distance=-1)
+        first, second = cache.key_for(b"first"), cache.key_for(b"second")
+        cache.set(first, self.predictions)
+        cache.set(second, self.predictions)
+        self.assertIsNone(cache.get(first))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+        cache.ttl = 0
+        cache.set(first, self.predictions)
+        time.sleep(0.01)
+        self.assertIsNone(cache.get(first))
+
+    @patch("detector.predictors.result_cache.perceptual_hash")
+    def test_disabled_cache_does_no_work(self, phash):
+        cache = PredictionCache(max_entries=0)
+        key = cache.key_for(_reencode(SAMPLE_IMAGES[0]))
+        cache.set(key, self.predictions)
+
+        self.assertIsNone(cache.get(key))
+        phash.assert_not_called()
+        self.assertEqual((cache.stats()["entries"], cache.stats()["misses"]), (0, 0))
+
+
+class TreatmentPlanCacheTests(TestCase):
+    def setUp(self):
+        TreatmentService._cache.clear()
+
+    @patch.object(TreatmentService, "generate_treatment_plan")
+    def test_plan_is_generated_once_per_label_and_bucket(self, generate):
+        generate.return_value = {"status": "success", "treatment_plan": "Remove infected leaves.", "model": "fake"}
+
+        first = TreatmentService.get_treatment_plan("Tomato_Early_blight", 0.91)
+        second = TreatmentService.get_treatment_plan("Tomato_Early_blight", 0.97)
+
+        self.assertEqual(first["treatment_plan"], "Remove infected leaves.")
+        self.assertEqual(second["treatment_plan"], "Remove infected leaves.")
+        generate.assert_called_once_with("Tomato_Early_blight", "high")
+        self.assertTrue(TreatmentPlan.objects.filter(
+            label="Tomato_Early_blight", confidence_bucket="high", prompt_version=PROMPT_VERSION
+        ).exists())
+
+        # A fresh worker (empty LRU) reads the stored plan instead of calling the LLM
+        TreatmentService._cache.clear()
+        TreatmentService.get_treatment_plan("Tomato_Early_blight", 0.9)
+        generate.assert_called_once()
+
+    @patch.object(TreatmentService, "generate_treatment_plan")
+    def test_failures_are_not_cached(self, generate):
+        generate.return_value = {"status": "error", "message": "boom"}
+
+        TreatmentService.get_treatment_plan("Potato___Late_blight", 0.7)
+        TreatmentService.get_treatment_plan("Potato___Late_blight", 0.7)
+
+        self.assertEqual(generate.call_count, 2)
+        self.assertFalse(TreatmentPlan.objects.exists())
+
+
+class FakeGeminiModel:
+    """Local stand-in for genai.GenerativeModel."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        if stream:
+            return iter([SimpleNamespace(text=chunk) for chunk in self.chunks])
+        return SimpleNamespace(text="".join(self.chunks))
+
+
+class ConfidentModel:
+    def predict_batched(self, image, top_k=3):
+        return [
+            {"label": "Tomato_Late_blight", "confidence": 0.92},
+            {"label": "Potato___Late_blight", "confidence": 0.05},
+        ]
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class TreatmentJobTests(TestCase):
+    def setUp(self):
+        TreatmentService._cache.clear()
+        history.clear_label_cache()
+        self.user = get_user_model().objects.create_user(email="farmer@example.com", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.gemini = FakeGeminiModel(["1. Remove infected plants. ", "2. Apply copper fungicide."])
+
+    def _detect(self):
+        with open(SAMPLE_IMAGES[0], "rb") as f:
+            image = SimpleUploadedFile("leaf.jpg", f.read(), content_type="image/jpeg")
+        with patch.object(registry, "get", return_value=ConfidentModel()):
+            return self.client.post("/detector/detect", {"image": image}, format="multipart")
+
+    def _stream(self, job_id, **headers):
+        # What EventSource sends
+        response = self.client.get(f"/detector/treatment/{job_id}/stream", HTTP_ACCEPT="text/event-stream", **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return b"".join(response.streaming_content).decode()
+
+    def test_detect_returns_job_then_plan_is_served_from_cache(self):
+        with patch.object(TreatmentService, "gemini_model", return_value=self.gemini):
+            response = self._detect()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["treatment"])
+        job_id = response.data["treatment_job"]["id"]
+
+        poll = self.client.get(f"/detector/treatment/{job_id}")
+        self.assertEqual(poll.data["status"], "done")
+        self.assertEqual(poll.data["treatment"], "".join(self.gemini.chunks))
+
+        body = self._stream(job_id)
+        self.assertIn("event: chunk", body)
+        self.assertIn("copper fungicide", body)
+        self.assertTrue(body.rstrip().endswith('data: {"status": "done"}'))
+
+        # A reconnecting EventSource resumes after the text it already has
+        sent = len(self.gemini.chunks[0])
+        resumed = self._stream(job_id, HTTP_LAST_EVENT_ID=str(sent))
+        self.assertIn(json.dumps({"text": self.gemini.chunks[1]}), resumed)
+        self.assertNotIn("Remove infected plants", resumed)
+
+        # The next detection of the same disease gets the plan inline
+        with patch.object(TreatmentService, "gemini_model", return_value=self.gemini):
+            response = self._detect()
+        self.assertEqual(response.data["treatment"], "".join(self.gemini.chunks))
+        self.assertIsNone(response.data["treatment_job"])
+        self.assertEqual(self.gemini.calls, 1)
+
+    def test_failed_generation_is_reported_on_the_stream(self):
+        with patch.dict(os.environ, {"GEMINI_API_KEY": ""}):
+            response = self._detect()
+
+        job = TreatmentJob.objects.get(id=response.data["treatment_job"]["id"])
+        self.assertEqual(job.status, "failed")
+        self.assertIn("event: error", self._stream(job.id))
+        self.assertFalse(TreatmentPlan.objects.exists())
+
+    @patch("detector.services.JOB_FLUSH_INTERVAL", 3600)
+    @patch("detector.services.JOB_FLUSH_CHARS", 10)
+    def test_streamed_text_is_appended_in_batches(self):
+        job = TreatmentJob.objects.create(label="Tomato_Late_blight", confidence_bucket="high", prompt_version=1)
+        gemini = FakeGeminiModel(["x"] * 100)
+        with patch.object(TreatmentService, "gemini_model", return_value=gemini), \
+                CaptureQueriesContext(connection) as queries:
+            TreatmentService.run_treatment_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.plan), ("done", "x" * 100))
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        # "running", one append per 10 characters, "done"
+        self.assertEqual(len(updates), 1 + 10 + 1)
+
+    def test_stream_closes_with_a_retry_hint_while_pending(self):
+        job = TreatmentJob.objects.create(label="Tomato_Late_blight", confidence_bucket="high", prompt_version=1)
+        with patch("detector.views.STREAM_TIMEOUT", 0):
+            body = self._stream(job.id)
+        self.assertTrue(body.startswith("retry: "))
+        self.assertNotIn("event: error", body)
+
+
+class CountingModel:
+    """Batch-capable stand-in: labels each image by its width."""
+
+    def __init__(self):
+        self.batches = []
+
+    def preprocess_image(self, f):
+        return Image.open(f).size[0]
+
+    def predict_tensors(self, items):
+        self.batches.append(len(items))
+        return [[{"label": f"w{width}", "confidence": 1.0}] for width, _ in items]
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, DETECTOR_BATCH_SYNC_LIMIT=2, DETECTOR_BATCH_CHUNK_SIZE=2)
+class BatchDetectionTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(email="agro@example.com", password="password")
+        self.org = B2BOrganization.objects.create(name="Agro Co", created_by=owner)
+        ApiKey.objects.create(organization=self.org, key="test-key")
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_API_KEY="test-key")
+        self.model = CountingModel()
+
+    def _png(self, width):
+        buf = io.BytesIO()
+        Image.new("RGB", (width, 4)).save(buf, format="PNG")
+        return buf.getvalue()
+
+    def _post(self, data):
+        with patch.object(registry, "get", return_value=self.model):
+            return self.client.post("/detector/batch", data, format="multipart")
+
+    def test_small_batch_is_answered_inline(self):
+        images = [SimpleUploadedFile(f"{w}.png", self._png(w)) for w in (5, 6)]
+        response = self._post({"images": images})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r["predictions"][0]["label"] for r in response.data["results"]], ["w5", "w6"]
+        )
+
+    def test_large_archive_becomes_a_job(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            for w in (5, 6, 7):
+                zf.writestr(f"leaves/{w}.png", self._png(w))
+            zf.writestr("leaves/broken.jpg", b"not an image")
+            zf.writestr("README.txt", b"ignored")
+        archive = SimpleUploadedFile("leaves.zip", buf.getvalue(), content_type="application/zip")
+
+        response = self._post({"archive": archive})
+        self.assertEqual(response.status_code, 202)
+
+        poll = self.client.get(f"/detector/batch/{response.data['job_id']}")
+        self.assertEqual(poll.data["status"], "done")
+        self.assertEqual(poll.data["processed"], 4)
+        results = {r["image"]: r for r in poll.data["results"]}
+        self.assertEqual(results["leaves/7.png"]["predictions"][0]["label"], "w7")
+        self.assertIn("error", results["leaves/broken.jpg"])
+        self.assertEqual(self.model.batches, [2, 1])
+
+    @override_settings(INFERENCE_SOCKET="/tmp/inference-test.sock")
+    def test_batches_go_to_the_inference_server_when_configured(self):
+        calls = []
+
+        class FakeClient:
+            def call(self, task, payload):
+                calls.append(task)
+                return [{"label": f"w{Image.open(io.BytesIO(payload)).size[0]}", "confidence": 1.0}]
+
+        images = [SimpleUploadedFile(f"{w}.png", self._png(w)) for w in (5, 6)]
+        with patch.object(inference, "get_client", return_value=FakeClient()), \
+                patch.object(registry, "get", side_effect=AssertionError("model loaded in the web worker")):
+            response = self.client.post("/detector/batch", {"images": images}, format="multipart")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["predictions"][0]["label"] for r in response.data["results"]], ["w5", "w6"])
+        self.assertEqual(calls, ["disease", "disease"])
+
+    def test_requires_an_api_key(self):
+        self.client.credentials()
+        user = get_user_model().objects.create_user(email="farmer@example.com", password="password")
+        self.client.force_authenticate(user=user)
+        response = self._post({"images": [SimpleUploadedFile("a.png", self._png(5))]})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(BatchDetectionJob.objects.exists())
+
+
+class DiseaseHistoryTests(TestCase):
+    def setUp(self):
+        history.clear_label_cache()
+        self.user = get_user_model().objects.create_user(email="farmer@example.com", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _record(self, label, confidence):
+        return history.record_detection(self.user, [
+            {"label": label, "confidence": confidence},
+            {"label": "Tomato_healthy", "confidence": round(1 - confidence, 2)},
+        ])
+
+    def test_predictions_round_trip_through_packed_arrays(self):
+        detection = self._record("Tomato_Late_blight", 0.92)
+        detection.refresh_from_db()
+
+        self.assertEqual(len(bytes(detection.top_labels)), 4)
+        self.assertEqual(len(bytes(detection.top_probs)), 4)
+        history.clear_label_cache()
+        decoded = history.decode_predictions(detection.top_labels, detection.top_probs)
+        self.assertEqual([p["label"] for p in decoded], ["Tomato_Late_blight", "Tomato_healthy"])
+        self.assertAlmostEqual(decoded[0]["confidence"], 0.92, places=2)
+
+    def test_history_is_keyset_paginated_and_filterable(self):
+        other = get_user_model().objects.create_user(email="other@example.com", password="password")
+        history.record_detection(other, [{"label": "Potato___Early_blight", "confidence": 0.9}])
+        for label, confidence in [("Tomato_Late_blight", 0.92), ("Potato___Early_blight", 0.4),
+                                  ("Tomato_Late_blight", 0.88)]:
+            self._record(label, confidence)
+
+        first = self.client.get("/detector/history", {"limit": 2})
+        self.assertEqual(len(first.data["results"]), 2)
+        self.assertIsNotNone(first.data["next"])
+        second = self.client.get(first.data["next"])
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertEqual(second.data["results"][0]["status"], "ok")
+
+        unsure = [r for r in first.data["results"] if r["status"] == "unsure"]
+        self.assertEqual(unsure[0]["prediction"]["label"], "Potato___Early_blight")
+
+        filtered = self.client.get("/detector/history", {"label": "Tomato_Late_blight"})
+        self.assertEqual(len(filtered.data["results"]), 2)
+        self.assertEqual(self.client.get("/detector/history", {"label": "Unknown"}).data["results"], [])
+        self.assertEqual(DiseaseDetection.objects.count(), 4)
+
+
+@patch.object(outbreaks, "SETTLE_TIME", timedelta(0))
+class OutbreakAggregationTests(TestCase):
+    def setUp(self):
+        history.clear_label_cache()
+        cache.clear()
+        User = get_user_model()
+        self.oyo = User.objects.create_user(email="a@example.com", password="pw", country="Nigeria", state=" Oyo ")
+        self.oyo2 = User.objects.create_user(email="b@example.com", password="pw", country="nigeria", state="oyo")
+        self.kano = User.objects.create_user(email="c@example.com", password="pw", country="Nigeria", state="Kano")
+        self.nowhere = User.objects.create_user(email="d@example.com", password="pw")
+
+    def _detect(self, user, label, days_ago=0):
+        detection = history.record_detection(user, [{"label": label, "confidence": 0.9}])
+        if days_ago:
+            DiseaseDetection.objects.filter(id=detection.id).update(
+                created_at=timezone.now() - timedelta(days=days_ago)
+            )
+
+    def test_counters_are_updated_incrementally(self):
+        self._detect(self.oyo, "Tomato_Late_blight")
+        self._detect(self.oyo2, "Tomato_Late_blight")
+        self._detect(self.kano, "Tomato_Late_blight")
+        self._detect(self.nowhere, "Tomato_Late_blight")
+        self.assertEqual(outbreaks.aggregate_detections(), 4)
+
+        self._detect(self.oyo, "Tomato_Late_blight")
+        self._detect(self.oyo, "Potato___Early_blight", days_ago=10)
+        self.assertEqual(outbreaks.aggregate_detections(chunk_size=1), 2)
+        self.assertEqual(outbreaks.aggregate_detections(), 0)
+
+        counters = {
+            (c.region, c.label.name): c.count
+            for c in DiseaseOutbreakCounter.objects.select_related("label")
+        }
+        self.assertEqual(counters, {
+            ("nigeria/oyo", "Tomato_Late_blight"): 3,
+            ("nigeria/kano", "Tomato_Late_blight"): 1,
+            ("nigeria/oyo", "Potato___Early_blight"): 1,
+        })
+
+    def test_trends_endpoint_defaults_to_the_users_region(self):
+        self._detect(self.oyo, "Tomato_Late_blight")
+        self._detect(self.oyo2, "Potato___Early_blight", days_ago=9)
+        outbreaks.aggregate_detections()
+
+        client = APIClient()
+        client.force_authenticate(user=self.oyo)
+        response = client.get("/detector/outbreaks", {"days": 7})
+        self.assertEqual(response.data["region"], "nigeria/oyo")
+        self.assertEqual(response.data["labels"], [
+            {"label": "Tomato_Late_blight", "count": 1, "previous_count": 0},
+            {"label": "Potato___Early_blight", "count": 0, "previous_count": 1},
+        ])
+
+        # Served from cache until the TTL expires
+        self._detect(self.oyo, "Tomato_Late_blight")
+        outbreaks.aggregate_detections()
+        with self.assertNumQueries(0):
+            cached = client.get("/detector/outbreaks", {"days": 7, "region": "Nigeria/Oyo"})
+        self.assertEqual(cached.data["labels"][0]["count"], 1)
+
+        client.force_authenticate(user=self.nowhere)
+        self.assertEqual(client.get("/detector/outbreaks").status_code, 400)
+
+
+def _double(payloads):
+    return [payload * 2 for payload in payloads]
+
+
+def _slow_pid(payloads):
+    time.sleep(0.3)
+    return [os.getpid()] * len(payloads)
+
+
+def _reject_negative(payloads):
+    if any(payload < 0 for payload in payloads):
+        raise ValueError("negative")
+    return payloads
+
+
+class InferenceServiceTests(SimpleTestCase):
+    def setUp(self):
+        inference.register_task("test-double", "detector.tests._double", max_batch=4)
+        inference.register_task("test-slow", "detector.tests._slow_pid")
+        inference.register_task("test-reject", "detector.tests._reject_negative", max_batch=4)
+
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "inference.sock")
+        self.server = InferenceServer(path, workers=1, max_queue=2, preload=False)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            time.sleep(0.05)
+        self.client = InferenceClient(path, timeout=10)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join(10)
+        self.tmp.cleanup()
+
+    def _call_concurrently(self, task, count):
+        outcomes = [None] * count
+
+        def call(i):
+            try:
+                outcomes[i] = self.client.call(task, i)
+            except Exception as e:
+                outcomes[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+            time.sleep(0.02)
+        for t in threads:
+            t.join()
+        return outcomes
+
+    def test_requests_run_in_a_worker_process(self):
+        self.assertEqual(self.client.call("test-double", 21), 42)
+        self.assertNotEqual(self.client.call("test-slow", None), os.getpid())
+        with self.assertRaises(ValueError):
+            self.client.call("test-reject", -1)
+
+        tasks = self.client.stats()["tasks"]
+        self.assertEqual(tasks["test-double"]["completed"], 1)
+        self.assertEqual(tasks["test-reject"]["failed"], 1)
+
+    def test_a_failing_item_does_not_fail_its_batch(self):
+        outcomes = inference.execute("test-reject", [1, -1, 2])
+        self.assertEqual([status for status, _ in outcomes], ["ok", "error", "ok"])
+        self.assertIsInstance(outcomes[1][1], ValueError)
+
+    def test_full_queue_is_rejected_fast(self):
+        outcomes = self._call_concurrently("test-slow", 6)
+
+        busy = [o for o in outcomes if isinstance(o, InferenceBusy)]
+        self.assertTrue(busy)
+        self.assertTrue(all(isinstance(o, int) for o in outcomes if o not in busy))
+        self.assertEqual(self.client.stats()["tasks"]["test-slow"]["rejected"], len(busy))
+
+    def test_restart_replaces_workers_without_dropping_requests(self):
+        old_pid = self.client.call("test-slow", None)
+
+        restart = threading.Timer(0.1, self.server.restart)
+        restart.start()
+        outcomes = self._call_concurrently("test-slow", 2)
+        restart.join()
+
+        self.assertTrue(all(isinstance(o, int) for o in outcomes))
+        self.assertNotEqual(self.client.call("test-slow", None), old_pid)
+        stats = self.client.stats()
+        self.assertEqual(stats["generation"], 2)
+        self.assertEqual([w["generation"] for w in stats["workers"]], [2])
@@ -1,6 +1,24 @@
 from django.urls import path
-from .views import DiseaseDetectView
+from .views import (
+    BatchDetectionJobView,
+    BatchDiseaseDetectView,
+    DiseaseDetectView,
+    DiseaseHistoryView,
+    InferenceStatsView,
+    OutbreakTrendsView,
+    PredictionCacheStatsView,
+    TreatmentJobStreamView,
+    TreatmentJobView,
+)
 
 urlpatterns = [
-    path("detect", DiseaseDetectView.as_view(), name="detect-disease")
+    path("detect", DiseaseDetectView.as_view(), name="detect-disease"),
+    path("history", DiseaseHistoryView.as_view(), name="disease-history"),
+    path("outbreaks", OutbreakTrendsView.as_view(), name="disease-outbreaks"),
+    path("batch", BatchDiseaseDetectView.as_view(), name="batch-detect"),
+    path("batch/<uuid:job_id>", BatchDetectionJobView.as_view(), name="batch-detect-job"),
+    path("cache-stats", PredictionCacheStatsView.as_view(), name="detect-cache-stats"),
+    path("inference-stats", InferenceStatsView.as_view(), name="inference-stats"),
+    path("treatment/<uuid:job_id>", TreatmentJobView.as_view(), name="treatment-job"),
+    path("treatment/<uuid:job_id>/stream", TreatmentJobStreamView.as_view(), name="treatment-job-stream"),
 ]
@@ -1,12 +1,63 @@
-from django.shortcuts import render
+import json
+import os
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils import timezone
 
 # detector/views.py
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
-from .serializers import ImageUploadSerializer
-from .predictors.disease_predictor import model
-from .services import TreatmentService
+from rest_framework import generics, status
+from rest_framework.pagination import CursorPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.permissions import IsAdminUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from organizations.auth import ApiKeyAuthentication
+from organizations.permissions import IsApiKeyClient
+from utils import background, inference
+from utils.inference import InferenceBusy, InferenceUnavailable
+from utils.views import inference_unavailable_response
+from pest_detection.tips import tip_index
+from .batch import batch_model, process_batch_job, run_batch, spool_uploads
+from .history import label_ids, record_detection
+from .outbreaks import region_key, regional_trends
+from .serializers import BatchUploadSerializer, DiseaseDetectionSerializer, ImageUploadSerializer
+from .models import BatchDetectionJob, DiseaseDetection, TreatmentJob
+from .services import CONFIDENCE_THRESHOLD, TreatmentService
+from .predictors.exceptions import UncertaintyUnavailable
+from .renderers import EventStreamRenderer
+from .predictors.result_cache import cache_from_settings
+
+# Repeat uploads of the same (or a near-identical) photo skip the classifier
+prediction_cache = cache_from_settings()
+
+STREAM_POLL_INTERVAL = 0.25
+# A stream holds a worker; after this long it closes and the client reconnects
+STREAM_TIMEOUT = 20
+STREAM_RETRY_MS = 1000
+
+
+def treatment_job_payload(job, request):
+    return {
+        "id": str(job.id),
+        "status": job.status,
+        "poll_url": request.build_absolute_uri(reverse("treatment-job", args=[job.id])),
+        "stream_url": request.build_absolute_uri(reverse("treatment-job-stream", args=[job.id])),
+    }
+
+
+def get_treatment_job(request, job_id):
+    # Jobs are shared between users who detect the same disease at the same
+    # time (plans are not user specific), so any authenticated user holding
+    # the id may read it.
+    return get_object_or_404(TreatmentJob, id=job_id)
+
 
 class DiseaseDetectView(APIView):
 
@@ -15,35 +66,267 @@ class DiseaseDetectView(APIView):
 
         if serializer.is_valid():
             image = serializer.validated_data["image"]
+            data = image.read()
 
-            predictions = model.predict(image)
+            try:
+                if serializer.validated_data["uncertainty"]:
+                    predictions = inference.run("disease-uncertainty", data)
+                else:
+                    cache_key = prediction_cache.key_for(data)
+                    predictions = prediction_cache.get(cache_key)
+                    if predictions is None:
+                        predictions = inference.run("disease", data)
+                        prediction_cache.set(cache_key, predictions)
+            except UncertaintyUnavailable as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except (InferenceBusy, InferenceUnavailable) as e:
+                return inference_unavailable_response(e)
 
             best = predictions[0]
+            detection = record_detection(request.user, predictions)
 
             # confidence threshold
-            if best["confidence"] < 0.60:
+            if best["confidence"] < CONFIDENCE_THRESHOLD:
                 return Response({
                     "status": "unsure",
+                    "detection_id": detection.id,
                     "message": "The model is not fully certain. Here are possible matches:",
                     "candidates": predictions
                 }, status=status.HTTP_200_OK)
 
-            # Fetch AI Treatment Plan
-            treatment = TreatmentService.get_treatment_plan(best["label"], best["confidence"])
-            treatment_text = None
-            if isinstance(treatment, dict):
-                if treatment.get("status") == "success":
-                    treatment_text = treatment.get("treatment_plan")
-                else:
-                    treatment_text = treatment.get("message")
-            else:
-                treatment_text = str(treatment)
+            # Cached plans are returned inline; otherwise the plan is generated
+            # in the background and the client polls or streams the job.
+            cached, job = TreatmentService.start_treatment_job(
+                best["label"], best["confidence"], user=request.user
+            )
 
             return Response({
                 "status": "ok",
+                "detection_id": detection.id,
                 "prediction": best,
-                "treatment": treatment_text,
+                # e.g. spider mite damage: the pest advice applies as well
+                "tips": tip_index.tips_for([best["label"]]),
+                "treatment": cached["treatment_plan"] if cached else None,
+                "treatment_job": treatment_job_payload(job, request) if job else None,
                 "alternatives": predictions[1:]
             })
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class DetectionHistoryPagination(CursorPagination):
+    # Keyset pagination on created_at: each page is an index range scan on
+    # (user, created_at) no matter how deep the client scrolls.
+    ordering = "-created_at"
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+
+class DiseaseHistoryView(generics.ListAPIView):
+    """The current user's past scans, newest first. Optional ?label= filter."""
+    serializer_class = DiseaseDetectionSerializer
+    pagination_class = DetectionHistoryPagination
+
+    def get_queryset(self):
+        queryset = DiseaseDetection.objects.filter(user=self.request.user)
+
+        label = self.request.query_params.get("label")
+        if label:
+            queryset = queryset.filter(label_id=label_ids([label], create=False)[0])
+        return queryset
+
+
+class OutbreakTrendsView(APIView):
+    """
+    Diseases trending in a region: detections per label over the last
+    `days` days next to the `days` before. Defaults to the user's region.
+    """
+
+    def get(self, request):
+        if request.query_params.get("region"):
+            country, _, state = request.query_params["region"].partition("/")
+            region = region_key(country, state)
+        else:
+            region = region_key(request.user.country, request.user.state)
+        if not region:
+            return Response({
+                "error": "Set your country and state on your profile or pass ?region=country/state."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            days = min(max(int(request.query_params.get("days", 7)), 1), 90)
+        except ValueError:
+            return Response({"error": "days must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        today = timezone.localdate()
+        cache_key = f"disease-outbreaks:{region}:{days}:{today.isoformat()}"
+        payload = cache.get(cache_key)
+        if payload is None:
+            payload = {
+                "region": region,
+                "days": days,
+                "as_of": today,
+                "labels": regional_trends(region, days),
+            }
+            cache.set(cache_key, payload, settings.DETECTOR_OUTBREAK_CACHE_TTL)
+
+        return Response(payload)
+
+
+class PredictionCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(prediction_cache.stats())
+
+
+class InferenceStatsView(APIView):
+    """Queue depth, throughput and latency per task on the shared inference server."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        if not settings.INFERENCE_SOCKET:
+            return Response({"mode": "in-process"})
+        try:
+            return Response({"mode": "server", **inference.get_client().stats()})
+        except InferenceUnavailable as e:
+            return Response({"mode": "server", "error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class TreatmentJobView(APIView):
+    """Poll a background treatment-plan job."""
+
+    def get(self, request, job_id):
+        job = get_treatment_job(request, job_id)
+        return Response({
+            "id": str(job.id),
+            "label": job.label,
+            "status": job.status,
+            "treatment": job.plan or None,
+            "error": job.error or None,
+        })
+
+
+class TreatmentJobStreamView(APIView):
+    """
+    Server-sent events relaying the plan text as the LLM produces it.
+
+    Emits `chunk` events with newly generated text, then a final `done` or
+    `error` event. The job row is tailed, so this works from any worker.
+
+    The response holds a sync worker while it is open, so it is closed after
+    STREAM_TIMEOUT seconds with a `retry:` hint. EventSource then reconnects
+    with Last-Event-ID (the length of text already sent) and resumes from
+    there. Deployments serving many concurrent streams should still run a
+    threaded (gthread) or async worker class.
+    """
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request, job_id):
+        job = get_treatment_job(request, job_id)
+        try:
+            sent = max(0, int(request.headers.get("Last-Event-ID", 0)))
+        except ValueError:
+            sent = 0
+        response = StreamingHttpResponse(self._events(job.id, sent), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def _events(self, job_id, sent=0):
+        deadline = time.monotonic() + STREAM_TIMEOUT
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+
+        while True:
+            job = TreatmentJob.objects.only("status", "plan", "error").get(id=job_id)
+
+            if len(job.plan) > sent:
+                yield self._event("chunk", {"text": job.plan[sent:]}, event_id=len(job.plan))
+                sent = len(job.plan)
+
+            if job.status == "done":
+                yield self._event("done", {"status": "done"})
+                return
+            if job.status == "failed":
+                yield self._event("error", {"message": job.error})
+                return
+            if time.monotonic() > deadline:
+                # Not an error: the client reconnects after `retry` and resumes
+                return
+
+            time.sleep(STREAM_POLL_INTERVAL)
+
+    @staticmethod
+    def _event(name, data, event_id=None):
+        prefix = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{prefix}event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class BatchDiseaseDetectView(APIView):
+    """
+    Bulk detection for organizations using an API key (X-API-Key header).
+
+    Accepts several `images` files or one zip `archive`. Small batches are
+    answered inline; larger ones return a job id to poll.
+    """
+    authentication_classes = [ApiKeyAuthentication, JWTAuthentication]
+    permission_classes = [IsApiKeyClient]
+
+    def post(self, request):
+        serializer = BatchUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            path, names = spool_uploads(
+                files=serializer.validated_data.get("images"),
+                archive=serializer.validated_data.get("archive"),
+            )
+        except zipfile.BadZipFile:
+            return Response({"archive": ["Not a valid zip file."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not names or len(names) > settings.DETECTOR_BATCH_MAX_IMAGES:
+            os.remove(path)
+            return Response({
+                "error": f"A batch must contain between 1 and {settings.DETECTOR_BATCH_MAX_IMAGES} images."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(names) <= settings.DETECTOR_BATCH_SYNC_LIMIT:
+            try:
+                results = run_batch(batch_model(), path, names, chunk_size=settings.DETECTOR_BATCH_CHUNK_SIZE)
+            except (InferenceBusy, InferenceUnavailable) as e:
+                return inference_unavailable_response(e)
+            finally:
+                os.remove(path)
+            return Response({"status": "done", "total": len(results), "results": results})
+
+        job = BatchDetectionJob.objects.create(
+            organization=request.auth.organization,
+            api_key=request.auth,
+            total=len(names),
+        )
+        background.submit(process_batch_job, job.id, path, names)
+
+        return Response({
+            "status": job.status,
+            "job_id": str(job.id),
+            "total": job.total,
+            "poll_url": request.build_absolute_uri(reverse("batch-detect-job", args=[job.id])),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class BatchDetectionJobView(APIView):
+    authentication_classes = [ApiKeyAuthentication, JWTAuthentication]
+    permission_classes = [IsApiKeyClient]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(BatchDetectionJob, id=job_id, organization=request.auth.organization)
+        return Response({
+            "job_id": str(job.id),
+            "status": job.status,
+            "total": job.total,
+            "processed": job.processed,
+            "results": job.results if job.status == "done" else None,
+            "error": job.error or None,
+        })
@@ -1,4 +1,5 @@
 from rest_framework.permissions import BasePermission
+from .models import ApiKey
 
 class HasActiveOrgLicense(BasePermission):
     def has_permission(self, request, view):
@@ -7,3 +8,10 @@ class HasActiveOrgLicense(BasePermission):
             return False
 
         return org.subscription and org.subscription.is_active()
+
+
+class IsApiKeyClient(BasePermission):
+    """Request was authenticated with an active organization API key."""
+
+    def has_permission(self, request, view):
+        return isinstance(request.auth, ApiKey)
@@ -3,9 +3,10 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.conf import settings
-import requests
 import uuid
 
+from utils import http_client
+
 from .models import B2BOrganization, ApiKey
 from billing.models import Plan, Subscription, Transaction
 from .serializers import OrgPlanSerializer, OrgSubscriptionSerializer
@@ -51,7 +52,7 @@ class InitializeOrgPaymentView(APIView):
             "metadata": tx.metadata
         }
 
-        res = requests.post(
+        res = http_client.post(
             "https://api.paystack.co/transaction/initialize",
             json=payload,
             headers=headers,
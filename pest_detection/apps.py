@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class PestDetectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pest_detection'
+
+    def ready(self):
+        from django.conf import settings
+
+        from utils import inference
+        from utils.model_registry import registry
+
+        # Loaded on first request (or by the pre-fork warmup in config/wsgi.py)
+        registry.register("pest", "pest_detection.inference.load_model")
+
+        # Served by the shared inference workers when INFERENCE_SOCKET is set
+        inference.register_task(
+            "pest",
+            "pest_detection.inference.detect_uploads",
+            max_batch=getattr(settings, "PEST_BATCH_SIZE", 8),
+        )
@@ -0,0 +1,78 @@
+"""
+CPU throughput of the YOLO pest model: one image per call vs. batched
+calls, and tiled inference on full-resolution field photos.
+
+Run from the project root:
+    python -m pest_detection.benchmarks.bench_inference [--weights ai_models/best.pt]
+"""
+import argparse
+import glob
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import torch
+from PIL import Image
+
+from pest_detection.inference import (
+    MODEL_PATH,
+    run_pest_detection_batch,
+    run_tiled_detection,
+    tile_windows,
+)
+
+PHOTO_SIZE = (4032, 3024)
+
+
+def field_photos(count):
+    sources = sorted(glob.glob("crop_images/*"))
+    photos = []
+    for i in range(count):
+        img = Image.open(sources[i % len(sources)]).convert("RGB")
+        photos.append(img.resize(PHOTO_SIZE, Image.Resampling.BILINEAR))
+    return photos
+
+
+def throughput(fn, images, repeats=1):
+    fn(images[:1])  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(images)
+    return len(images) * repeats / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=MODEL_PATH)
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    model = YOLO(args.weights)
+    photos = field_photos(args.images)
+    print(f"torch threads: {torch.get_num_threads()}, images: {len(photos)} x {PHOTO_SIZE[0]}x{PHOTO_SIZE[1]}")
+
+    print(f"\n{'mode':<24} {'img/s':>8}")
+    sequential = throughput(lambda imgs: [run_pest_detection_batch([i], model=model) for i in imgs], photos)
+    print(f"{'one image per call':<24} {sequential:>8.2f}")
+    for batch_size in (4, 8):
+        ips = throughput(lambda imgs: run_pest_detection_batch(imgs, batch_size=batch_size, model=model), photos)
+        print(f"{f'batched ({batch_size})':<24} {ips:>8.2f}")
+
+    tiles = len(tile_windows(*PHOTO_SIZE, args.tile_size, args.overlap)) + 1
+    tiled = throughput(
+        lambda imgs: [run_tiled_detection(i, args.tile_size, args.overlap, model=model) for i in imgs],
+        photos[:4],
+    )
+    print(f"{f'tiled ({tiles} passes/img)':<24} {tiled:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
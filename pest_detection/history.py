@@ -0,0 +1,54 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import PestDetection, PestStat
+
+
+def record_detection(user, detected_pests, confidence_scores, tips):
+    """
+    Save a detection and fold it into the user's PestStat rows in the same
+    transaction: one UPDATE per distinct pest, or an INSERT the first time
+    the user sees it.
+    """
+    totals = defaultdict(lambda: [0, 0.0])
+    for pest, score in zip(detected_pests, confidence_scores):
+        totals[pest][0] += 1
+        totals[pest][1] += score
+
+    with transaction.atomic():
+        detection = PestDetection.objects.create(
+            user=user,
+            detected_pests=detected_pests,
+            confidence_scores=confidence_scores,
+            tips=tips
+        )
+        for pest, (boxes, confidence_sum) in totals.items():
+            _add(user, pest, boxes, confidence_sum, detection.created_at)
+    return detection
+
+
+def _add(user, pest, boxes, confidence_sum, seen_at):
+    increments = {
+        "detections": F("detections") + 1,
+        "boxes": F("boxes") + boxes,
+        "confidence_sum": F("confidence_sum") + confidence_sum,
+        "last_seen": seen_at,
+    }
+    if PestStat.objects.filter(user=user, pest=pest).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            PestStat.objects.create(
+                user=user, pest=pest, detections=1, boxes=boxes,
+                confidence_sum=confidence_sum, last_seen=seen_at,
+            )
+    except IntegrityError:
+        # A concurrent request inserted the row first
+        PestStat.objects.filter(user=user, pest=pest).update(**increments)
+
+
+def users_who_saw(pest, since):
+    """Ids of users whose latest `pest` detection is at or after `since`."""
+    return PestStat.objects.filter(pest=pest, last_seen__gte=since).values_list("user_id", flat=True)
@@ -1,29 +1,185 @@
+import io
 import os
-from ultralytics import YOLO
+import numpy as np
 from django.conf import settings
+from PIL import Image
+from utils.model_registry import registry
 
 # Load your trained model
 MODEL_PATH = os.path.join(settings.BASE_DIR, "ai_models/best.pt")
 
-yolo_model = YOLO(MODEL_PATH)
 
-def run_pest_detection(image_path):
+def load_model():
     """
-    Runs YOLOv8 inference on an image and returns:
+    Registry loader for the "pest" model. PEST_BACKEND="onnx" serves the
+    graph from `manage.py export_pest_model` with ONNX Runtime; otherwise
+    ultralytics (only imported here) runs best.pt.
+    """
+    backend = getattr(settings, "PEST_BACKEND", "ultralytics")
+    if backend == "onnx":
+        from .onnx_runtime import OnnxYolo
+        return OnnxYolo(os.path.join(settings.BASE_DIR, settings.PEST_ONNX_PATH))
+    if backend != "ultralytics":
+        raise ValueError(f"Unknown pest backend: {backend!r}")
+
+    from ultralytics import YOLO
+    return YOLO(MODEL_PATH)
+
+
+def _numpy(values):
+    # ultralytics returns torch tensors, the ONNX runner numpy arrays
+    return values.cpu().numpy() if hasattr(values, "cpu") else np.asarray(values)
+
+
+def load_image(source):
+    """
+    Decode an upload for YOLO without touching storage. Accepts raw bytes,
+    a file object (e.g. an UploadedFile), a path or a PIL image.
+    """
+    if isinstance(source, Image.Image):
+        return source.convert("RGB")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    img = Image.open(source)
+    img.load()  # decode now, while the buffer is guaranteed to be open
+    return img.convert("RGB")
+
+
+def run_pest_detection(image, tiled=None):
+    """
+    Runs YOLOv8 inference on an image (bytes, file object, path or PIL
+    image) and returns:
     - detected pest classes
     - confidence scores
+
+    With `tiled` (default: the PEST_TILED_INFERENCE setting) the photo is
+    sliced into overlapping tiles so small insects survive the downscale.
+    """
+    if tiled is None:
+        tiled = getattr(settings, "PEST_TILED_INFERENCE", False)
+    if tiled:
+        return run_tiled_detection(image)
+    return run_pest_detection_batch([image])[0]
+
+
+def detect_uploads(images):
+    """Inference task "pest": raw upload bytes -> (detected_pests, confidence_scores) per image."""
+    if getattr(settings, "PEST_TILED_INFERENCE", False):
+        return [run_tiled_detection(image) for image in images]
+    return run_pest_detection_batch(images)
+
+
+def run_pest_detection_batch(images, batch_size=None, model=None):
+    """
+    Batched inference over many images. Returns one (detected_pests,
+    confidence_scores) pair per image, in input order.
     """
-    results = yolo_model(image_path)[0]  # first batch
+    yolo_model = model or registry.get("pest")
+    batch_size = batch_size or getattr(settings, "PEST_BATCH_SIZE", 8)
+
+    outputs = []
+    for start in range(0, len(images), batch_size):
+        chunk = [load_image(image) for image in images[start:start + batch_size]]
+        for results in yolo_model(chunk, verbose=False):
+            outputs.append(_summarize(results.names, results.boxes.cls.tolist(), results.boxes.conf.tolist()))
+    return outputs
+
 
+def _summarize(names, classes, scores):
     detected_pests = []
     confidence_scores = []
 
-    for box in results.boxes:
-        cls_id = int(box.cls)
-        pest_name = results.names[cls_id]
-        conf = float(box.conf)
+    for cls_id, conf in zip(classes, scores):
+        pest_name = names[int(cls_id)]
 
         detected_pests.append(pest_name)
-        confidence_scores.append(round(conf, 3))
+        confidence_scores.append(round(float(conf), 3))
 
     return detected_pests, confidence_scores
+
+
+def tile_windows(width, height, tile_size, overlap):
+    """(left, top, right, bottom) windows covering the image with `overlap` (0-1) between neighbours."""
+    step = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)  # last tile flush with the edge
+        return positions
+
+    return [
+        (left, top, min(left + tile_size, width), min(top + tile_size, height))
+        for top in starts(height)
+        for left in starts(width)
+    ]
+
+
+def merge_detections(boxes, scores, classes, threshold=0.5):
+    """
+    Class-aware, score-ordered suppression of duplicates across tiles:
+    boxes are visited from the highest score down, and each kept box
+    suppresses lower-scoring boxes of its class that overlap it. Overlap is
+    intersection over the smaller box, so the half of an insect cut by a
+    tile edge and the full box from the neighbouring tile count as one
+    detection; whichever scores higher is kept as is (boxes are not
+    combined). Returns the indices to keep, highest score first.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    order = np.argsort(-scores, kind="stable")
+    boxes, classes = boxes[order], classes[order]
+
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    iw = np.clip(np.minimum(x2[:, None], x2) - np.maximum(x1[:, None], x1), 0, None)
+    ih = np.clip(np.minimum(y2[:, None], y2) - np.maximum(y1[:, None], y1), 0, None)
+    ios = iw * ih / np.maximum(np.minimum(areas[:, None], areas), 1e-9)
+    suppresses = (ios > threshold) & (classes[:, None] == classes)
+
+    keep = np.ones(len(boxes), dtype=bool)
+    for i in range(len(boxes)):
+        if keep[i]:
+            keep[i + 1:] &= ~suppresses[i, i + 1:]
+    return order[keep]
+
+
+def run_tiled_detection(image, tile_size=None, overlap=None, merge_threshold=None, batch_size=None,
+                        include_full_image=True, model=None):
+    """
+    Sliced inference: run YOLO on overlapping `tile_size` crops (plus the
+    whole image, for large pests), map boxes back to image coordinates and
+    merge duplicates across tiles.
+    """
+    yolo_model = model or registry.get("pest")
+    tile_size = tile_size or getattr(settings, "PEST_TILE_SIZE", 640)
+    overlap = getattr(settings, "PEST_TILE_OVERLAP", 0.2) if overlap is None else overlap
+    merge_threshold = merge_threshold or getattr(settings, "PEST_TILE_MERGE_THRESHOLD", 0.5)
+    batch_size = batch_size or getattr(settings, "PEST_BATCH_SIZE", 8)
+
+    img = load_image(image)
+    windows = tile_windows(img.width, img.height, tile_size, overlap)
+    crops = [img.crop(window) for window in windows]
+    if include_full_image and len(windows) > 1:
+        windows.append((0, 0, img.width, img.height))
+        crops.append(img)
+
+    boxes, scores, classes, names = [], [], [], {}
+    for start in range(0, len(crops), batch_size):
+        results_batch = yolo_model(crops[start:start + batch_size], verbose=False)
+        for (left, top, _, _), results in zip(windows[start:start + batch_size], results_batch):
+            names = results.names
+            if len(results.boxes) == 0:
+                continue
+            boxes.append(_numpy(results.boxes.xyxy) + np.array([left, top, left, top], dtype=np.float32))
+            scores.append(_numpy(results.boxes.conf))
+            classes.append(_numpy(results.boxes.cls))
+
+    if not boxes:
+        return [], []
+
+    boxes, scores, classes = np.concatenate(boxes), np.concatenate(scores), np.concatenate(classes)
+    keep = merge_detections(boxes, scores, classes, merge_threshold)
+    return _summarize(names, classes[keep].tolist(), scores[keep].tolist())
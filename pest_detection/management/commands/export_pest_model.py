@@ -0,0 +1,91 @@
+import glob
+import os
+import statistics
+import time
+
+import torch
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from pest_detection.inference import MODEL_PATH
+from pest_detection.onnx_runtime import STRIDE, OnnxYolo, letterbox, match_detections
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the YOLOv8 pest weights to ONNX for PEST_BACKEND='onnx' and compare "
+        "boxes, classes and latency against ultralytics on sample images."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--weights", default=MODEL_PATH)
+        parser.add_argument("--output", default=os.path.join(settings.BASE_DIR, settings.PEST_ONNX_PATH))
+        parser.add_argument("--imgsz", type=int, default=640)
+        parser.add_argument("--opset", type=int, default=17)
+        parser.add_argument("--images", default="crop_images/*", help="Glob of images for the parity check.")
+        parser.add_argument("--runs", type=int, default=10, help="Timed runs per image and runtime.")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["weights"]):
+            raise CommandError(f"Weights not found: {options['weights']}")
+
+        from ultralytics import YOLO
+
+        # Dynamic batch/height/width so batched and tiled calls share one graph
+        exported = YOLO(options["weights"]).export(
+            format="onnx",
+            imgsz=options["imgsz"],
+            dynamic=True,
+            simplify=False,
+            opset=options["opset"],
+        )
+        if os.path.abspath(exported) != os.path.abspath(options["output"]):
+            os.replace(exported, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Exported ONNX -> {options['output']}"))
+
+        images = [Image.open(path).convert("RGB") for path in sorted(glob.glob(options["images"]))]
+        if not images:
+            self.stdout.write("No images for the parity check; skipping.")
+            return
+
+        eager = YOLO(options["weights"])
+        onnx = OnnxYolo(options["output"])
+
+        # Same input tensor through both graphs isolates export error from
+        # preprocessing differences (PIL vs OpenCV resize)
+        sample, _ = letterbox(images[0], onnx.imgsz, STRIDE)
+        with torch.no_grad():
+            reference = eager.model.eval()(torch.from_numpy(sample[None]))[0].numpy()
+        output = onnx.runtime.session.run(None, {onnx.input_name: sample[None]})[0]
+        self.stdout.write(f"Max |output diff| vs eager on the same input: {abs(output - reference).max():.2e}")
+
+        expected_total = matched = onnx_total = 0
+        for img in images:
+            expected = eager(img, imgsz=options["imgsz"], verbose=False)[0]
+            actual = onnx(img)[0]
+            expected_total += len(expected.boxes)
+            onnx_total += len(actual.boxes)
+            matched += match_detections(expected, actual)
+
+        self.stdout.write(
+            f"Parity on {len(images)} images: {matched}/{expected_total} ultralytics boxes matched "
+            f"(same class, IoU >= 0.9); ONNX found {onnx_total} boxes"
+        )
+
+        eager_ms = self._median_ms(lambda img: eager(img, imgsz=options["imgsz"], verbose=False), images, options["runs"])
+        onnx_ms = self._median_ms(onnx, images, options["runs"])
+        self.stdout.write(
+            f"Median latency per image: ultralytics {eager_ms:.1f} ms, onnxruntime {onnx_ms:.1f} ms "
+            f"({eager_ms / onnx_ms:.2f}x)"
+        )
+
+    def _median_ms(self, fn, images, runs):
+        fn(images[0])  # warm up
+        timings = []
+        for _ in range(runs):
+            for img in images:
+                start = time.perf_counter()
+                fn(img)
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
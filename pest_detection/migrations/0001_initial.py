@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PestDetection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(blank=True, upload_to='pest_detection/')),
+                ('detected_pests', models.JSONField(blank=True, default=list)),
+                ('confidence_scores', models.JSONField(blank=True, default=list)),
+                ('tips', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pest_detections', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at'], name='pest_det_user_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PestStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pest', models.CharField(max_length=100)),
+                ('detections', models.PositiveIntegerField(default=0)),
+                ('boxes', models.PositiveIntegerField(default=0)),
+                ('confidence_sum', models.FloatField(default=0)),
+                ('last_seen', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pest_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['pest', '-last_seen'], name='pest_stat_pest_seen_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'pest'), name='pest_stat_user_pest')],
+            },
+        ),
+    ]
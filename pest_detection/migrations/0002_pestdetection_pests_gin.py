@@ -0,0 +1,31 @@
+from django.db import migrations
+
+INDEX_NAME = "pest_det_pests_gin"
+
+
+def create_gin_index(apps, schema_editor):
+    # jsonb_path_ops GIN only exists on Postgres; other backends skip it
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("pest_detection", "PestDetection")._meta.db_table
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON {schema_editor.quote_name(table)} "
+        f"USING gin (detected_pests jsonb_path_ops)"
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pest_detection', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
@@ -7,11 +7,53 @@ class PestDetection(models.Model):
         on_delete=models.CASCADE,
         related_name="pest_detections"
     )
-    image = models.ImageField(upload_to="pest_detection/")
+    # Filled in by a background upload shortly after the detection is saved
+    image = models.ImageField(upload_to="pest_detection/", blank=True)
     detected_pests = models.JSONField(default=list, blank=True)
     confidence_scores = models.JSONField(default=list, blank=True)
     tips = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # The history endpoint pages through one user's rows newest first.
+        # On Postgres, migration 0002 adds a GIN index on detected_pests for
+        # containment queries (detected_pests__contains=["aphid"]).
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="pest_det_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"Pest Detection by {self.user.email} at {self.created_at}"
+
+
+class PestStat(models.Model):
+    """
+    Running per-user totals for one pest, updated with every detection
+    (see history.record_detection) so stats never reparse the JSON rows.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="pest_stats"
+    )
+    pest = models.CharField(max_length=100)
+    detections = models.PositiveIntegerField(default=0)  # scans the pest was found in
+    boxes = models.PositiveIntegerField(default=0)
+    confidence_sum = models.FloatField(default=0)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "pest"], name="pest_stat_user_pest"),
+        ]
+        indexes = [
+            # "Which users saw pest X this week": last_seen >= start of week
+            models.Index(fields=["pest", "-last_seen"], name="pest_stat_pest_seen_idx"),
+        ]
+
+    @property
+    def average_confidence(self):
+        return round(self.confidence_sum / self.boxes, 3) if self.boxes else None
+
+    def __str__(self):
+        return f"{self.user_id} {self.pest}: {self.detections}"
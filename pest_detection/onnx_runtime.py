@@ -0,0 +1,161 @@
+import ast
+
+import numpy as np
+from PIL import Image
+
+from utils.onnx_session import OnnxSession
+
+# Same defaults as ultralytics' predict()
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DET = 300
+PAD_VALUE = 114
+MAX_WH = 7680  # class offset so one NMS pass never mixes classes
+STRIDE = 32
+
+
+def letterbox(img, size, stride=None):
+    """
+    Resize keeping the aspect ratio and pad to `size` (h, w) with grey,
+    like ultralytics' LetterBox. With `stride` the padding only goes up to
+    the next multiple of it (auto=True), so a 4:3 photo runs at 640 x 480
+    instead of 640 x 640. Returns the 3 x H x W float32 input plus the
+    (gain, pad_x, pad_y) needed to map boxes back.
+    """
+    h, w = size
+    gain = min(h / img.height, w / img.width)
+    new_w, new_h = round(img.width * gain), round(img.height * gain)
+    if stride:
+        h, w = new_h + (-new_h) % stride, new_w + (-new_w) % stride
+    pad_x, pad_y = (w - new_w) / 2, (h - new_h) / 2
+    left, top = round(pad_x - 0.1), round(pad_y - 0.1)
+
+    if (new_w, new_h) != img.size:
+        img = img.resize((new_w, new_h), Image.Resampling.BILINEAR)
+    canvas = np.full((h, w, 3), PAD_VALUE, dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = np.asarray(img)
+
+    chw = canvas.transpose(2, 0, 1).astype(np.float32)
+    chw *= 1 / 255.0
+    return chw, (gain, left, top)
+
+
+def nms(boxes, scores, iou_threshold, max_det=MAX_DET):
+    """
+    Greedy NMS, vectorized per step: each kept box is compared against all
+    remaining candidates at once. Returns kept indices, best first.
+    """
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+
+    keep = []
+    while order.size and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def postprocess(pred, conf_threshold=CONF_THRESHOLD, iou_threshold=IOU_THRESHOLD, max_det=MAX_DET):
+    """
+    Decode one YOLOv8 output ((4 + classes) x anchors: cx, cy, w, h, class
+    scores) into xyxy boxes, scores and class ids in letterboxed pixels.
+    """
+    pred = pred.T  # anchors x (4 + classes)
+    class_scores = pred[:, 4:]
+    cls = class_scores.argmax(axis=1)
+    conf = class_scores[np.arange(len(cls)), cls]
+
+    mask = conf > conf_threshold
+    xywh, conf, cls = pred[mask, :4], conf[mask], cls[mask]
+
+    xyxy = np.empty_like(xywh)
+    xyxy[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    xyxy[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+    keep = nms(xyxy + (cls * MAX_WH)[:, None], conf, iou_threshold, max_det)
+    return xyxy[keep], conf[keep], cls[keep]
+
+
+class OnnxBoxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+class OnnxResults:
+    """The subset of ultralytics' Results used by pest_detection.inference."""
+
+    def __init__(self, names, boxes):
+        self.names = names
+        self.boxes = boxes
+
+
+class OnnxYolo:
+    """
+    YOLOv8 graph exported by `manage.py export_pest_model`, run with ONNX
+    Runtime on CPU. Called like an ultralytics model: `model(images)` with a
+    PIL image or a list of them returns one result per image.
+    """
+
+    def __init__(self, path, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD, max_det=MAX_DET, intra_op_threads=0):
+        self.runtime = OnnxSession(path, intra_op_threads=intra_op_threads)
+        self.conf, self.iou, self.max_det = conf, iou, max_det
+
+        session = self.runtime.session
+        metadata = self.runtime.custom_metadata
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+        imgsz = ast.literal_eval(metadata.get("imgsz", "[640, 640]"))
+        self.imgsz = (imgsz, imgsz) if isinstance(imgsz, int) else tuple(imgsz)
+        self.input_name = session.get_inputs()[0].name
+
+    def __call__(self, images, verbose=False):
+        if isinstance(images, Image.Image):
+            images = [images]
+        # Minimal padding is only possible when the whole batch shares a shape
+        stride = STRIDE if len({img.size for img in images}) == 1 else None
+        inputs, transforms = zip(*(letterbox(img.convert("RGB"), self.imgsz, stride) for img in images))
+        preds = self.runtime.session.run(None, {self.input_name: np.stack(inputs)})[0]
+
+        results = []
+        for img, pred, (gain, left, top) in zip(images, preds, transforms):
+            xyxy, conf, cls = postprocess(pred, self.conf, self.iou, self.max_det)
+            xyxy = (xyxy - np.array([left, top, left, top], dtype=np.float32)) / gain
+            xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, img.width)
+            xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, img.height)
+            results.append(OnnxResults(self.names, OnnxBoxes(xyxy, conf, cls.astype(np.float32))))
+        return results
+
+
+def match_detections(expected, actual, iou_threshold=0.9):
+    """
+    Pair up two results (same image) by class and IoU. Returns the number
+    of expected boxes that have a same-class counterpart above the
+    threshold. Used for the export parity check.
+    """
+    exp_boxes, exp_cls = np.asarray(expected.boxes.xyxy), np.asarray(expected.boxes.cls)
+    act_boxes, act_cls = np.asarray(actual.boxes.xyxy), np.asarray(actual.boxes.cls)
+    used = np.zeros(len(act_boxes), dtype=bool)
+
+    matched = 0
+    for box, cls in zip(exp_boxes, exp_cls):
+        iw = np.clip(np.minimum(box[2], act_boxes[:, 2]) - np.maximum(box[0], act_boxes[:, 0]), 0, None)
+        ih = np.clip(np.minimum(box[3], act_boxes[:, 3]) - np.maximum(box[1], act_boxes[:, 1]), 0, None)
+        inter = iw * ih
+        union = (box[2] - box[0]) * (box[3] - box[1]) + \
+            (act_boxes[:, 2] - act_boxes[:, 0]) * (act_boxes[:, 3] - act_boxes[:, 1]) - inter
+        iou = np.where((act_cls == cls) & ~used, inter / np.maximum(union, 1e-9), 0)
+        if len(iou) and iou.max() >= iou_threshold:
+            used[iou.argmax()] = True
+            matched += 1
+    return matched
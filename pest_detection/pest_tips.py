@@ -0,0 +1,109 @@
+# Advice returned with pest detections, keyed by canonical pest name.
+# Lookups go through tips.tip_index, which normalizes case, underscores and
+# plurals, so keys here only need to be written once in plain words.
+PEST_TIPS = {
+    "aphid": (
+        "Spray colonies off with a strong jet of water or use insecticidal soap or neem oil. "
+        "Encourage ladybirds and lacewings, and avoid excess nitrogen fertilizer."
+    ),
+    "armyworm": (
+        "Scout the crop twice a week and handpick egg masses and larvae. Apply a Bt "
+        "(Bacillus thuringiensis) or emamectin-based spray into the whorl while larvae are small."
+    ),
+    "whitefly": (
+        "Hang yellow sticky traps, remove heavily infested leaves and spray neem oil or "
+        "insecticidal soap on leaf undersides. Keep weeds around the field under control."
+    ),
+    "spider mite": (
+        "Mites thrive in hot, dry conditions: irrigate to reduce dust and water stress, spray "
+        "leaf undersides with water or a miticide, and avoid broad-spectrum insecticides that kill predators."
+    ),
+    "thrips": (
+        "Use blue sticky traps, remove crop residues and weeds, and apply spinosad or neem "
+        "oil. Overhead irrigation helps reduce populations."
+    ),
+    "locust": (
+        "Report swarms to your local agricultural extension office immediately. Control is "
+        "coordinated regionally; protect small plots with approved biopesticides (Metarhizium)."
+    ),
+    "grasshopper": (
+        "Till field margins to destroy egg pods, keep borders weed-free and use bait or "
+        "Metarhizium-based biopesticides when numbers are high."
+    ),
+    "stem borer": (
+        "Remove and destroy crop stubble after harvest, plant early and evenly, and use "
+        "push-pull intercropping (desmodium with napier grass borders)."
+    ),
+    "leafminer": (
+        "Pick and destroy mined leaves, use yellow sticky traps and avoid over-spraying so "
+        "parasitic wasps can control the larvae."
+    ),
+    "mealybug": (
+        "Prune and burn infested parts, control the ants that protect mealybugs and spray "
+        "insecticidal soap or neem oil. Release parasitoids where available."
+    ),
+    "cutworm": (
+        "Plough before planting to expose larvae, place collars around transplants and "
+        "handpick larvae from the soil around cut plants at night."
+    ),
+    "caterpillar": (
+        "Handpick caterpillars and eggs, and spray Bt (Bacillus thuringiensis) on young "
+        "larvae. Check leaf undersides regularly."
+    ),
+    "beetle": (
+        "Handpick beetles in the morning, rotate crops and use neem-based sprays. Row "
+        "covers protect young plants."
+    ),
+    "weevil": (
+        "Harvest promptly, dry grain well and store it in hermetic bags. Destroy infested "
+        "residues and rotate crops."
+    ),
+    "termite": (
+        "Remove dead wood and crop residues, keep plants well watered and apply "
+        "wood ash or neem cake around the base of affected plants."
+    ),
+    "fruit fly": (
+        "Collect and bury fallen fruit, use protein bait or methyl eugenol traps and "
+        "bag high-value fruit."
+    ),
+    "scale insect": (
+        "Scrape off scales, prune heavily infested branches and spray horticultural oil "
+        "during the crawler stage."
+    ),
+    "snail": (
+        "Handpick at night or after rain, clear debris where snails shelter and use "
+        "barriers such as wood ash around beds."
+    ),
+}
+
+# Other names detectors and farmers use for the same pests
+PEST_ALIASES = {
+    "greenfly": "aphid",
+    "blackfly": "aphid",
+    "plant louse": "aphid",
+    "fall armyworm": "armyworm",
+    "faw": "armyworm",
+    "african armyworm": "armyworm",
+    "silverleaf whitefly": "whitefly",
+    "red spider mite": "spider mite",
+    "two spotted spider mite": "spider mite",
+    "mite": "spider mite",
+    "desert locust": "locust",
+    "maize stalk borer": "stem borer",
+    "stalk borer": "stem borer",
+    "borer": "stem borer",
+    "leaf miner": "leafminer",
+    "tuta absoluta": "leafminer",
+    "tomato leafminer": "leafminer",
+    "black cutworm": "cutworm",
+    "bollworm": "caterpillar",
+    "hornworm": "caterpillar",
+    "looper": "caterpillar",
+    "flea beetle": "beetle",
+    "colorado potato beetle": "beetle",
+    "maize weevil": "weevil",
+    "banana weevil": "weevil",
+    "white ant": "termite",
+    "scale": "scale insect",
+    "slug": "snail",
+}
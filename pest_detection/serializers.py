@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import PestDetection
+from .models import PestDetection, PestStat
 
 class PestDetectionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,3 +13,11 @@ class PestDetectionSerializer(serializers.ModelSerializer):
             "created_at"
         ]
         read_only_fields = ["detected_pests", "confidence_scores", "tips"]
+
+
+class PestStatSerializer(serializers.ModelSerializer):
+    average_confidence = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = PestStat
+        fields = ["pest", "detections", "boxes", "average_confidence", "last_seen"]
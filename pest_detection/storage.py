@@ -0,0 +1,16 @@
+from django.core.files.base import ContentFile
+
+from .models import PestDetection
+
+
+def persist_detection_image(detection_id, filename, data):
+    """
+    Background task: upload the original photo after the response has been
+    sent, then point the detection at the stored file.
+    """
+    field = PestDetection._meta.get_field("image")
+    instance = PestDetection(id=detection_id)
+    name = field.generate_filename(instance, filename)
+    stored_name = field.storage.save(name, ContentFile(data), max_length=field.max_length)
+    PestDetection.objects.filter(id=detection_id).update(image=stored_name)
+    return stored_name
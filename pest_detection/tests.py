@@ -1,3 +1,226 @@
-from django.test import TestCase
+import importlib.util
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+import torch
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from utils.model_registry import registry
+
+from .history import record_detection, users_who_saw
+from .inference import merge_detections, run_tiled_detection, tile_windows
+from .onnx_runtime import OnnxYolo, letterbox, postprocess
+from .models import PestStat
+from .tips import TipIndex, tip_index
+
+HAS_ULTRALYTICS = importlib.util.find_spec("ultralytics") is not None
+
+
+class _Boxes(SimpleNamespace):
+    def __init__(self, xyxy):
+        super().__init__(xyxy=xyxy, conf=torch.full((len(xyxy),), 0.9), cls=torch.zeros(len(xyxy)))
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+class FakeYolo:
+    """Finds one 'aphid' wherever the crop contains a white pixel block."""
+
+    def __call__(self, images, verbose=False):
+        outputs = []
+        for img in images:
+            ys, xs = np.nonzero(np.asarray(img)[:, :, 0] > 128)
+            if len(xs):
+                xyxy = torch.tensor([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]], dtype=torch.float32)
+            else:
+                xyxy = torch.zeros((0, 4))
+            outputs.append(SimpleNamespace(names={0: "aphid"}, boxes=_Boxes(xyxy)))
+        return outputs
+
+
+class TiledInferenceTests(SimpleTestCase):
+    def test_tiles_cover_the_whole_image(self):
+        windows = tile_windows(1500, 700, tile_size=640, overlap=0.2)
+        self.assertEqual(max(w[2] for w in windows), 1500)
+        self.assertEqual(max(w[3] for w in windows), 700)
+        self.assertTrue(all(w[2] - w[0] == 640 and w[3] - w[1] == 640 for w in windows))
+        self.assertEqual(tile_windows(300, 200, 640, 0.2), [(0, 0, 300, 200)])
+
+    def test_boxes_cut_by_a_tile_edge_are_deduplicated(self):
+        boxes = np.array([[100, 100, 140, 130], [100, 100, 120, 130], [300, 300, 340, 330]], dtype=np.float32)
+        scores = np.array([0.8, 0.9, 0.7], dtype=np.float32)
+        classes = np.array([0, 0, 0], dtype=np.float32)
+        # The higher-scoring (here: cut) box survives; the full box is suppressed
+        self.assertEqual(merge_detections(boxes, scores, classes).tolist(), [1, 2])
+
+        # Different classes never suppress each other
+        classes = np.array([0, 1, 0], dtype=np.float32)
+        self.assertEqual(sorted(merge_detections(boxes, scores, classes).tolist()), [0, 1, 2])
+
+    def test_pest_spanning_tiles_is_reported_once(self):
+        img = Image.new("RGB", (1200, 640))
+        img.paste((255, 255, 255), (500, 300, 560, 340))  # straddles the first tile edge
+
+        pests, scores = run_tiled_detection(img, tile_size=640, overlap=0.2, model=FakeYolo())
+        self.assertEqual(pests, ["aphid"])
+        self.assertEqual(scores, [0.9])
+
+
+class OnnxRuntimeTests(SimpleTestCase):
+    def test_letterbox_pads_to_stride_or_square(self):
+        img = Image.new("RGB", (400, 300), (255, 0, 0))
+
+        chw, (gain, left, top) = letterbox(img, (640, 640), stride=32)
+        self.assertEqual(chw.shape, (3, 480, 640))
+        self.assertEqual((gain, left, top), (1.6, 0, 0))
+
+        chw, (gain, left, top) = letterbox(img, (640, 640))
+        self.assertEqual(chw.shape, (3, 640, 640))
+        self.assertEqual((left, top), (0, 80))
+        self.assertAlmostEqual(float(chw[1, 0, 0]), 114 / 255, places=5)
+        self.assertAlmostEqual(float(chw[0, 80, 0]), 1.0, places=5)
+
+    @skipUnless(HAS_ULTRALYTICS, "ultralytics not installed")
+    def test_postprocess_matches_ultralytics_nms(self):
+        from ultralytics.utils.nms import non_max_suppression
+
+        # Clusters of overlapping boxes over three classes
+        rng = np.random.default_rng(0)
+        centers = rng.uniform(50, 590, size=(20, 2))
+        xy = np.repeat(centers, 30, axis=0) + rng.normal(0, 6, size=(600, 2))
+        wh = rng.uniform(20, 80, size=(600, 2))
+        scores = rng.uniform(0, 1, size=(600, 3)) ** 3
+        pred = np.concatenate([xy, wh, scores], axis=1).T.astype(np.float32)
+
+        xyxy, conf, cls = postprocess(pred)
+        expected = non_max_suppression(torch.from_numpy(pred[None]), 0.25, 0.7, max_det=300)[0].numpy()
+
+        self.assertEqual(len(xyxy), len(expected))
+        np.testing.assert_allclose(xyxy, expected[:, :4], atol=1e-4)
+        np.testing.assert_allclose(conf, expected[:, 4], atol=1e-6)
+        np.testing.assert_array_equal(cls, expected[:, 5])
+
+    @staticmethod
+    def export_random_yolo(tmp):
+        from ultralytics import YOLO
+
+        weights = os.path.join(tmp, "pest.pt")
+        YOLO("yolov8n.yaml").save(weights)
+        eager = YOLO(weights)
+        return eager, eager.export(format="onnx", imgsz=160, dynamic=True, simplify=False, verbose=False)
+
+    @skipUnless(HAS_ULTRALYTICS, "ultralytics not installed")
+    def test_exported_graph_matches_eager(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            eager, path = self.export_random_yolo(tmp)
+            model = OnnxYolo(path)
+
+            img = Image.new("RGB", (200, 150), (40, 120, 40))
+            sample, _ = letterbox(img, model.imgsz, stride=32)
+            with torch.no_grad():
+                reference = eager.model.eval()(torch.from_numpy(sample[None]))[0].numpy()
+            output = model.runtime.session.run(None, {model.input_name: sample[None]})[0]
+
+            np.testing.assert_allclose(output, reference, atol=1e-3)
+            self.assertEqual(model.names, eager.names)
+            self.assertEqual(model.imgsz, (160, 160))
+            self.assertEqual(len(model([img, img])), 2)
+
+    @skipUnless(HAS_ULTRALYTICS, "ultralytics not installed")
+    def test_onnx_backend_does_not_import_torch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            _, path = self.export_random_yolo(tmp)
+            script = (
+                "import sys\n"
+                "from PIL import Image\n"
+                "from pest_detection.onnx_runtime import OnnxYolo\n"
+                f"OnnxYolo({path!r})(Image.new('RGB', (200, 150)))\n"
+                "print('torch' in sys.modules)\n"
+            )
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True)
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+class TipIndexTests(SimpleTestCase):
+    def test_labels_are_matched_after_normalization(self):
+        for label in ["Aphids", "aphid ", "Fall-Armyworm", "army_worm", "Whiteflies", "Leaf Miner", "Thrips"]:
+            self.assertIsNotNone(tip_index.match(label), label)
+        self.assertEqual(tip_index.match("Tomato_Spider_mites_Two_spotted_spider_mite"), "spider mite")
+        self.assertIsNone(tip_index.match("Tomato_Leaf_Mold"))
+
+    def test_fuzzy_fallback_is_optional(self):
+        index = TipIndex({"caterpillar": "Handpick."}, fuzzy_threshold=0.6)
+        self.assertEqual(index.match("catterpillar"), "caterpillar")
+        self.assertIsNone(TipIndex({"caterpillar": "Handpick."}, fuzzy_threshold=0).match("catterpillar"))
+
+    def test_repeated_pests_get_one_tip(self):
+        tips = tip_index.tips_for(["aphid"] * 40 + ["Aphids", "whitefly", "unknown-bug"])
+        self.assertEqual([tip["pest"] for tip in tips], ["aphid", "whitefly"])
+
+
+@override_settings(
+    BACKGROUND_TASKS_EAGER=True,
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class PestHistoryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="farmer@example.com", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_detect_updates_stats_incrementally(self):
+        img = Image.new("RGB", (300, 200))
+        img.paste((255, 255, 255), (10, 10, 40, 40))
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        upload = SimpleUploadedFile("field.png", buf.getvalue(), content_type="image/png")
+
+        with patch.object(registry, "get", return_value=FakeYolo()):
+            response = self.client.post("/pest/detect/", {"image": upload}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["tips"][0]["pest"], "aphid")
+
+        record_detection(self.user, ["aphid", "aphid", "whitefly"], [0.7, 0.5, 0.8], [])
+
+        stats = self.client.get("/pest/stats/").data
+        self.assertEqual([(s["pest"], s["detections"], s["boxes"]) for s in stats],
+                         [("aphid", 2, 3), ("whitefly", 1, 1)])
+        self.assertEqual(stats[0]["average_confidence"], 0.7)
+        self.assertEqual(list(users_who_saw("aphid", timezone.now() - timedelta(days=7))), [self.user.id])
+        self.assertEqual(PestStat.objects.count(), 2)
+
+    def test_history_is_keyset_paginated(self):
+        for pests in (["aphid"], ["thrips"], ["aphid", "whitefly"]):
+            record_detection(self.user, pests, [0.9] * len(pests), [])
+
+        page = self.client.get("/pest/history/?limit=2").data
+        self.assertEqual([r["detected_pests"] for r in page["results"]], [["aphid", "whitefly"], ["thrips"]])
+        self.assertEqual(len(self.client.get(page["next"]).data["results"]), 1)
+
+    @skipUnless(connection.vendor == "postgresql", "jsonb containment needs Postgres")
+    def test_history_filters_by_pest(self):
+        record_detection(self.user, ["aphid"], [0.9], [])
+        record_detection(self.user, ["thrips"], [0.9], [])
+        results = self.client.get("/pest/history/?pest=thrips").data["results"]
+        self.assertEqual([r["detected_pests"] for r in results], [["thrips"]])
@@ -0,0 +1,108 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+
+from .pest_tips import PEST_ALIASES, PEST_TIPS
+
+# Words whose trailing "s" is not a plural
+_SINGULAR_S = {"thrips", "virus", "asparagus", "hibiscus", "citrus", "grass", "moss"}
+
+
+def _singular(word):
+    if word in _SINGULAR_S or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def normalize(label):
+    """'Fall_Armyworms' / 'fall-armyworm' / 'FALL ARMYWORM' -> ['fall', 'armyworm']."""
+    return [_singular(word) for word in re.findall(r"[a-z0-9]+", label.lower())]
+
+
+def _trigrams(key):
+    padded = f"${key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TipIndex:
+    """
+    Tip lookup for detector labels. Keys are normalized once (case,
+    underscores, plurals, spacing), so "Spider_mites", "spider-mite" and
+    "spidermite" hit the same entry. Labels that embed a pest name
+    ("Tomato_Spider_mites_Two_spotted_spider_mite") match on their longest
+    known word run; anything else can fall back to trigram similarity.
+    """
+
+    def __init__(self, tips, aliases=None, fuzzy_threshold=0.6, cache_size=4096):
+        self.advice = {}
+        self.keys = {}  # compact key ("spidermite") -> canonical name
+        for name, advice in tips.items():
+            canonical = " ".join(normalize(name))
+            self.advice[canonical] = advice
+            self.keys["".join(normalize(name))] = canonical
+        for alias, name in (aliases or {}).items():
+            self.keys["".join(normalize(alias))] = " ".join(normalize(name))
+
+        self.fuzzy_threshold = fuzzy_threshold
+        self.max_words = max(len(normalize(key)) for key in (*tips, *(aliases or {})))
+        self._by_trigram = defaultdict(set)
+        for key in self.keys:
+            for trigram in _trigrams(key):
+                self._by_trigram[trigram].add(key)
+
+        # Detectors emit a small, fixed label vocabulary
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, label):
+        """Canonical pest name for a detector label, or None."""
+        words = normalize(label)
+        if not words:
+            return None
+
+        # Longest run of words that is a known name
+        for n in range(min(len(words), self.max_words), 0, -1):
+            for start in range(len(words) - n + 1):
+                canonical = self.keys.get("".join(words[start:start + n]))
+                if canonical:
+                    return canonical
+
+        if self.fuzzy_threshold:
+            return self._fuzzy("".join(words))
+        return None
+
+    def _fuzzy(self, compact):
+        trigrams = _trigrams(compact)
+        candidates = set().union(*(self._by_trigram.get(t, ()) for t in trigrams))
+
+        best, best_score = None, self.fuzzy_threshold
+        for key in candidates:
+            key_trigrams = _trigrams(key)
+            score = len(trigrams & key_trigrams) / len(trigrams | key_trigrams)
+            if score >= best_score:
+                best, best_score = key, score
+        return self.keys[best] if best else None
+
+    def tips_for(self, labels):
+        """One {"pest", "advice"} entry per distinct pest, in first-seen order."""
+        tips, seen = [], set()
+        for label in dict.fromkeys(labels):
+            canonical = self.match(label)
+            if canonical and canonical not in seen:
+                seen.add(canonical)
+                tips.append({"pest": label, "advice": self.advice[canonical]})
+        return tips
+
+
+tip_index = TipIndex(
+    PEST_TIPS,
+    PEST_ALIASES,
+    fuzzy_threshold=getattr(settings, "PEST_TIP_FUZZY_THRESHOLD", 0.6),
+)
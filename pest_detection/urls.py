@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import PestDetectionView
+from .views import PestDetectionView, PestHistoryView, PestStatsView
 
 urlpatterns = [
     path("detect/", PestDetectionView.as_view(), name="pest-detect"),
+    path("history/", PestHistoryView.as_view(), name="pest-history"),
+    path("stats/", PestStatsView.as_view(), name="pest-stats"),
 ]
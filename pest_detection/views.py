@@ -1,14 +1,21 @@
 from django.shortcuts import render
 
+from rest_framework import generics
+from rest_framework.pagination import CursorPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from PIL import UnidentifiedImageError
 
+from utils import background, inference
+from utils.inference import InferenceBusy, InferenceUnavailable
+from utils.views import inference_unavailable_response
+from .history import record_detection
 from .models import PestDetection
-from .serializers import PestDetectionSerializer
-from .inference import run_pest_detection
-from .pest_tips import PEST_TIPS
+from .serializers import PestDetectionSerializer, PestStatSerializer
+from .tips import tip_index
+from .storage import persist_detection_image
 
 
 class PestDetectionView(APIView):
@@ -19,35 +26,58 @@ class PestDetectionView(APIView):
             return Response({"error": "Image is required"}, status=400)
 
         image = request.FILES["image"]
+        data = image.read()
 
-        # Save temp instance to get file path
-        pest_instance = PestDetection.objects.create(
-            user=request.user,
-            image=image
-        )
+        # Run model inference on the upload buffer; nothing is stored yet
+        try:
+            detected_pests, confidence_scores = inference.run("pest", data)
+        except (InferenceBusy, InferenceUnavailable) as e:
+            return inference_unavailable_response(e)
+        except (UnidentifiedImageError, OSError):
+            return Response({"error": "Could not read the image"}, status=400)
 
-        # Run model inference
-        detected_pests, confidence_scores = run_pest_detection(
-            pest_instance.image.path
-        )
+        # One tip per distinct pest, however many boxes it was found in
+        tips = tip_index.tips_for(detected_pests)
 
-        # Attach tips based on detected pests
-        tips = []
-        for pest in detected_pests:
-            if pest.lower() in PEST_TIPS:
-                tips.append({
-                    "pest": pest,
-                    "advice": PEST_TIPS[pest.lower()]
-                })
-
-        # Update instance
-        pest_instance.detected_pests = detected_pests
-        pest_instance.confidence_scores = confidence_scores
-        pest_instance.tips = tips
-        pest_instance.save()
+        # Detection row and the user's pest stats in one transaction; the
+        # photo is uploaded to storage after the response
+        pest_instance = record_detection(request.user, detected_pests, confidence_scores, tips)
+        background.submit(persist_detection_image, pest_instance.id, image.name, data)
 
         return Response(
             PestDetectionSerializer(pest_instance).data,
             status=201
         )
 
+
+
+class PestHistoryPagination(CursorPagination):
+    # Keyset pagination on the (user, created_at) index
+    ordering = "-created_at"
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+
+class PestHistoryView(generics.ListAPIView):
+    """The current user's pest scans, newest first. Optional ?pest= filter."""
+    serializer_class = PestDetectionSerializer
+    pagination_class = PestHistoryPagination
+
+    def get_queryset(self):
+        queryset = PestDetection.objects.filter(user=self.request.user)
+
+        pest = self.request.query_params.get("pest")
+        if pest:
+            # jsonb containment, served by the GIN index on Postgres
+            queryset = queryset.filter(detected_pests__contains=[pest])
+        return queryset
+
+
+class PestStatsView(generics.ListAPIView):
+    """Per-pest totals for the current user: frequency, average confidence, last seen."""
+    serializer_class = PestStatSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        return self.request.user.pest_stats.order_by("-detections", "pest")
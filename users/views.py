@@ -17,8 +17,10 @@ from .serializers import (
     ResetPasswordSerializer,
     UserProfileUpdateSerializer,
 )
+from analytics.services import WeatherAnalyticsService
 from emails.models import EmailOTP
 from emails.services import EmailService
+from utils import background
 
 
 User = get_user_model()
@@ -184,3 +186,12 @@ class UserProfileUpdateView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         return self.request.user
+
+    def perform_update(self, serializer):
+        before = (serializer.instance.city, serializer.instance.state, serializer.instance.country)
+        user = serializer.save()
+
+        # Geocode the new location now so the next dashboard load is a cache hit
+        location = (user.city, user.state, user.country)
+        if user.city and location != before:
+            background.submit(WeatherAnalyticsService.get_coordinates, *location, refresh=True)
@@ -0,0 +1,59 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+
+    # Worker threads do not survive fork(), so each process builds its own pool
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "BACKGROUND_WORKERS", 4),
+                    thread_name_prefix="background",
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background task {fn.__name__} failed")
+        raise
+    finally:
+        # Each pool thread has its own DB connection; don't leak it
+        close_old_connections()
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Run `fn` outside the request/response cycle on a small in-process
+    thread pool and return a Future.
+
+    With BACKGROUND_TASKS_EAGER (used by tests) the task runs inline.
+    """
+    if getattr(settings, "BACKGROUND_TASKS_EAGER", False):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            logger.exception(f"Background task {fn.__name__} failed")
+            future.set_exception(e)
+        return future
+
+    return _get_executor().submit(_run, fn, args, kwargs)
@@ -0,0 +1,227 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 502, 503, 504}
+LATENCY_SAMPLES = 256
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The host failed repeatedly; calls fail fast until the breaker half-opens."""
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker: `failure_threshold` consecutive failures open it for
+    `reset_timeout` seconds, then a single trial request is let through
+    (half-open). Its success closes the breaker, its failure reopens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.probing = True
+            return True
+
+    def release(self):
+        """A trial request ended without telling us anything about the host."""
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+
+def _host_stats():
+    return {"requests": 0, "errors": 0, "retries": 0, "short_circuited": 0, "latencies": deque(maxlen=LATENCY_SAMPLES)}
+
+
+class HttpClient:
+    """
+    Shared client for outbound APIs (Open-Meteo, Paystack).
+
+    - One requests.Session per process, with a keep-alive connection pool
+      of `pool_size` per host.
+    - Idempotent calls (GET, ...) are retried up to `retries` times on
+      connection errors, timeouts and 429/502/503/504, with full-jitter
+      exponential backoff. POSTs are only retried with `retry=True`.
+    - A CircuitBreaker per host makes calls to a host that keeps failing
+      raise CircuitOpenError immediately instead of waiting on timeouts.
+    - stats() reports per-host request, error and retry counts and latency.
+    """
+
+    def __init__(self, pool_size=10, retries=2, backoff=0.2, backoff_max=2.0,
+                 failure_threshold=5, reset_timeout=30.0, connect_timeout=3.05):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.connect_timeout = connect_timeout
+        self._session = None
+        self._session_pid = None
+        self._breakers = {}
+        self._stats = defaultdict(_host_stats)
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Pooled sockets must not be shared with a forked child
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._lock:
+                if self._session is None or self._session_pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session, self._session_pid = session, pid
+        return self._session
+
+    def breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def request(self, method, url, retry=None, timeout=10, **kwargs):
+        """
+        Same arguments as requests.request(). `timeout` is the read timeout;
+        connecting gets `connect_timeout`. Returns the Response (including
+        4xx/5xx ones once retries are spent); raises requests exceptions.
+        """
+        method = method.upper()
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        attempts = 1 + (self.retries if (method in IDEMPOTENT_METHODS if retry is None else retry) else 0)
+        if not isinstance(timeout, tuple):
+            timeout = (min(self.connect_timeout, timeout), timeout)
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                self._record(host, "short_circuited")
+                raise CircuitOpenError(f"Circuit open for {host}; failing fast")
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                breaker.record_failure()
+                self._record(host, "errors", time.perf_counter() - start)
+                if attempt + 1 == attempts:
+                    raise
+                error = e
+            except Exception:
+                breaker.release()
+                raise
+            else:
+                self._record(host, None, time.perf_counter() - start)
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code not in RETRY_STATUSES or attempt + 1 == attempts:
+                    return response
+                error = f"HTTP {response.status_code}"
+                response.close()
+
+            self._record(host, "retries")
+            delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+            logger.info(f"{method} {host} failed ({error}); retry {attempt + 1} in {delay:.2f}s")
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, host, counter, latency=None):
+        with self._lock:
+            stats = self._stats[host]
+            if latency is not None:
+                stats["requests"] += 1
+                stats["latencies"].append(latency * 1000)
+            if counter:
+                stats[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            hosts = {host: dict(stats, latencies=sorted(stats["latencies"])) for host, stats in self._stats.items()}
+            breakers = {host: breaker.state for host, breaker in self._breakers.items()}
+
+        report = {}
+        for host, stats in hosts.items():
+            latencies = stats.pop("latencies")
+
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else None
+
+            report[host] = {**stats, "p50_ms": percentile(0.5), "p95_ms": percentile(0.95),
+                            "circuit": breakers.get(host, "closed")}
+        return report
+
+    def reset(self):
+        """Forget stats and breaker state (tests, or after an incident)."""
+        with self._lock:
+            self._stats.clear()
+            self._breakers.clear()
+
+
+def client_from_settings():
+    return HttpClient(
+        pool_size=getattr(settings, "HTTP_POOL_SIZE", 10),
+        retries=getattr(settings, "HTTP_RETRIES", 2),
+        backoff=getattr(settings, "HTTP_RETRY_BACKOFF", 0.2),
+        backoff_max=getattr(settings, "HTTP_RETRY_BACKOFF_MAX", 2.0),
+        failure_threshold=getattr(settings, "HTTP_BREAKER_THRESHOLD", 5),
+        reset_timeout=getattr(settings, "HTTP_BREAKER_RESET", 30.0),
+    )
+
+
+client = client_from_settings()
+get = client.get
+post = client.post
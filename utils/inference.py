@@ -0,0 +1,191 @@
+import importlib
+import os
+import pickle
+import socket
+import struct
+import threading
+
+from django.conf import settings
+
+# Messages on the inference socket are length-prefixed pickles. The socket is
+# a local Unix socket readable only by the app user (see inference_server.py).
+_HEADER = struct.Struct("!I")
+
+_tasks = {}
+_client = None
+_client_lock = threading.Lock()
+
+
+class InferenceBusy(Exception):
+    """The task's queue on the inference server is full; retry later."""
+
+
+class InferenceUnavailable(Exception):
+    """The inference server could not be reached or is shutting down."""
+
+
+class Task:
+    def __init__(self, handler, max_batch=1):
+        self._handler = handler
+        self.max_batch = max_batch
+
+    @property
+    def handler(self):
+        if isinstance(self._handler, str):
+            module_path, attr = self._handler.rsplit(".", 1)
+            self._handler = getattr(importlib.import_module(module_path), attr)
+        return self._handler
+
+
+def register_task(name, handler, max_batch=1):
+    """
+    `handler` (a callable or "package.module.function" path) takes a list
+    of payloads and returns one result per payload. The server hands it up
+    to `max_batch` queued requests at once.
+    """
+    _tasks[name] = Task(handler, max_batch)
+
+
+def get_task(name):
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise KeyError(f"No inference task registered under {name!r}") from None
+
+
+def task_names():
+    return list(_tasks)
+
+
+def execute(task, payloads):
+    """
+    Run a batch and return one ("ok", result) / ("error", exception) pair
+    per payload. A failing batch is retried item by item so one bad upload
+    does not fail the requests it was batched with.
+    """
+    try:
+        return [("ok", result) for result in get_task(task).handler(payloads)]
+    except Exception as e:
+        if len(payloads) == 1:
+            return [("error", _portable(e))]
+    return [execute(task, [payload])[0] for payload in payloads]
+
+
+def _portable(exc):
+    # Exceptions are re-raised in the Django worker, so they must pickle
+    try:
+        pickle.dumps(exc)
+        return exc
+    except Exception:
+        return RuntimeError(f"{type(exc).__name__}: {exc}")
+
+
+def send_message(sock, obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    (size,) = struct.unpack("!I", _recv_exactly(sock, _HEADER.size))
+    return pickle.loads(_recv_exactly(sock, size))
+
+
+def _recv_exactly(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(min(size - len(buf), 1 << 20))
+        if not chunk:
+            raise EOFError("Inference socket closed")
+        buf += chunk
+    return bytes(buf)
+
+
+class InferenceClient:
+    """
+    Talks to `manage.py run_inference_server` over its Unix socket. Each
+    thread keeps one connection open (requests on a connection are
+    sequential); connections are not carried across fork().
+    """
+
+    def __init__(self, socket_path, timeout=30):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def call(self, task, payload):
+        return self.request(("call", task, payload))
+
+    def stats(self):
+        return self.request(("stats",))
+
+    def request(self, message):
+        sock, reused = self._connection()
+        try:
+            send_message(sock, message)
+        except OSError:
+            self._close()
+            if not reused:
+                raise InferenceUnavailable(f"Cannot reach inference server at {self.socket_path}")
+            # The server restarted since this connection was opened
+            sock, _ = self._connection()
+            try:
+                send_message(sock, message)
+            except OSError as e:
+                self._close()
+                raise InferenceUnavailable(f"Cannot reach inference server at {self.socket_path}") from e
+
+        try:
+            status, value = recv_message(sock)
+        except (OSError, EOFError) as e:
+            # A late reply would be read by the next request; start over
+            self._close()
+            raise InferenceUnavailable(f"No reply from inference server: {e}") from e
+
+        if status == "error":
+            raise value
+        return value
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None and self._local.pid == os.getpid():
+            return sock, True
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise InferenceUnavailable(f"Cannot reach inference server at {self.socket_path}") from e
+        self._local.sock, self._local.pid = sock, os.getpid()
+        return sock, False
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+
+def get_client():
+    global _client
+
+    if _client is None or _client.socket_path != settings.INFERENCE_SOCKET:
+        with _client_lock:
+            if _client is None or _client.socket_path != settings.INFERENCE_SOCKET:
+                _client = InferenceClient(settings.INFERENCE_SOCKET, timeout=settings.INFERENCE_TIMEOUT)
+    return _client
+
+
+def run(task, payload):
+    """
+    Run one inference request. With INFERENCE_SOCKET set it goes to the
+    shared model-serving processes; otherwise the handler runs in this
+    process (development, tests).
+
+    Raises InferenceBusy when the server's queue for `task` is full and
+    InferenceUnavailable when the server cannot be reached.
+    """
+    if getattr(settings, "INFERENCE_SOCKET", ""):
+        return get_client().call(task, payload)
+    return get_task(task).handler([payload])[0]
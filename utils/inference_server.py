@@ -0,0 +1,324 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socketserver
+import threading
+import time
+from collections import defaultdict, deque
+
+from . import inference
+from .inference import InferenceBusy, InferenceUnavailable, recv_message, send_message
+from .model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+STOP_TIMEOUT = 30
+
+
+class _Pending:
+    __slots__ = ("payload", "queued_at", "outcome", "done")
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.queued_at = time.monotonic()
+        self.outcome = None
+        self.done = threading.Event()
+
+
+def _task_stats():
+    return {"running": 0, "completed": 0, "failed": 0, "rejected": 0, "total_ms": 0.0}
+
+
+class Scheduler:
+    """
+    Per-task bounded FIFO queues shared by all worker processes. A free
+    worker takes the task whose oldest request has waited longest, together
+    with up to the task's max_batch requests queued behind it.
+    """
+
+    def __init__(self, max_queue):
+        self.max_queue = max_queue
+        self.queues = defaultdict(deque)
+        self.stats = defaultdict(_task_stats)
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def submit(self, task, payload):
+        inference.get_task(task)  # unknown tasks fail before queueing
+
+        with self.cond:
+            if self.closed:
+                raise InferenceUnavailable("Inference server is shutting down")
+            queue = self.queues[task]
+            if len(queue) >= self.max_queue:
+                self.stats[task]["rejected"] += 1
+                raise InferenceBusy(f"{len(queue)} {task!r} requests already waiting")
+
+            pending = _Pending(payload)
+            queue.append(pending)
+            self.cond.notify()
+        return pending
+
+    def next_batch(self, retiring):
+        """Block until there is work. Returns None once `retiring()` or closed and drained."""
+        with self.cond:
+            while True:
+                if retiring():
+                    return None
+                waiting = [task for task, queue in self.queues.items() if queue]
+                if waiting:
+                    break
+                if self.closed:
+                    return None
+                self.cond.wait(0.5)
+
+            task = min(waiting, key=lambda name: self.queues[name][0].queued_at)
+            queue = self.queues[task]
+            batch = [queue.popleft() for _ in range(min(inference.get_task(task).max_batch, len(queue)))]
+            self.stats[task]["running"] += len(batch)
+            return task, batch
+
+    def finish(self, task, batch, outcomes):
+        now = time.monotonic()
+        with self.cond:
+            stats = self.stats[task]
+            stats["running"] -= len(batch)
+            for pending, (status, _) in zip(batch, outcomes):
+                stats["completed" if status == "ok" else "failed"] += 1
+                stats["total_ms"] += (now - pending.queued_at) * 1000
+
+        for pending, outcome in zip(batch, outcomes):
+            pending.outcome = outcome
+            pending.done.set()
+
+    def wake(self):
+        with self.cond:
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def snapshot(self):
+        with self.cond:
+            tasks = {}
+            for task in set(self.queues) | set(self.stats):
+                stats = self.stats[task]
+                done = stats["completed"] + stats["failed"]
+                tasks[task] = {
+                    "queued": len(self.queues[task]),
+                    "running": stats["running"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "rejected": stats["rejected"],
+                    "avg_latency_ms": round(stats["total_ms"] / done, 1) if done else None,
+                }
+            return tasks
+
+
+def _worker_main(conn):
+    # The server process handles signals and tells workers when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        task, payloads = message
+        conn.send(inference.execute(task, payloads))
+
+
+class _Worker:
+    def __init__(self, generation):
+        ctx = multiprocessing.get_context("fork")
+        self.conn, child_conn = ctx.Pipe()
+        # Forked after warmup, so the weights are shared copy-on-write
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.generation = generation
+        self.retiring = False
+        self.thread = None
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server.inference_server
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (OSError, EOFError):
+                return
+
+            if message[0] == "stats":
+                reply = ("ok", server.stats())
+            else:
+                _, task, payload = message
+                try:
+                    pending = server.scheduler.submit(task, payload)
+                except (InferenceBusy, InferenceUnavailable, KeyError) as e:
+                    reply = ("error", e)
+                else:
+                    pending.done.wait()
+                    reply = pending.outcome
+
+            try:
+                send_message(self.request, reply)
+            except OSError:
+                return
+
+
+class _SocketServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    # Every web worker thread connects on its first request; the default
+    # backlog of 5 makes non-blocking Unix connects fail with EAGAIN.
+    request_queue_size = 256
+
+
+class InferenceServer:
+    """
+    A small pool of model-serving processes behind a Unix socket, shared by
+    every Django worker on the host (see utils/inference.py for the client).
+
+    - Backpressure: each task queue holds at most `max_queue` requests;
+      further requests fail fast with InferenceBusy.
+    - restart() (SIGHUP) reloads the models and replaces the workers; old
+      workers finish their current batch first, so no request is dropped.
+    - shutdown() (SIGTERM/SIGINT) stops accepting, drains the queues and
+      stops the workers.
+    """
+
+    def __init__(self, socket_path, workers=2, max_queue=64, preload=True):
+        self.socket_path = socket_path
+        self.num_workers = workers
+        self.preload = preload
+        self.scheduler = Scheduler(max_queue)
+        self.workers = []
+        self.generation = 0
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    def serve_forever(self):
+        if self.preload:
+            registry.warmup()
+        with self._lock:
+            self._spawn()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        old_umask = os.umask(0o177)  # socket only usable by this user
+        try:
+            self._server = _SocketServer(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.inference_server = self
+        self.started_at = time.time()
+        logger.info(f"Inference server listening on {self.socket_path} with {self.num_workers} workers")
+
+        try:
+            self._server.serve_forever(poll_interval=0.2)
+        finally:
+            self._server.server_close()
+            self._stop_workers()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def install_signal_handlers(self):
+        # serve_forever() runs in the main thread; shutdown() would deadlock there
+        def in_thread(fn):
+            return lambda signum, frame: threading.Thread(target=fn, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, in_thread(self.shutdown))
+        signal.signal(signal.SIGINT, in_thread(self.shutdown))
+        signal.signal(signal.SIGHUP, in_thread(self.restart))
+
+    def restart(self):
+        """Reload models and roll the workers over to a new generation."""
+        with self._lock:
+            if self.preload:
+                for name in registry.names():
+                    registry.unload(name)
+                registry.warmup()
+            old = self.workers
+            self._spawn()
+            for worker in old:
+                worker.retiring = True
+        self.scheduler.wake()
+        logger.info(f"Inference workers restarted (generation {self.generation})")
+
+    def shutdown(self):
+        logger.info("Inference server shutting down; draining queues")
+        self.scheduler.close()
+        if self._server is not None:
+            self._server.shutdown()
+
+    def stats(self):
+        with self._lock:
+            workers = [
+                {"pid": w.process.pid, "generation": w.generation, "retiring": w.retiring}
+                for w in self.workers
+            ]
+        return {
+            "workers": workers,
+            "generation": self.generation,
+            "max_queue": self.scheduler.max_queue,
+            "uptime_s": round(time.time() - self.started_at, 1) if self.started_at else 0,
+            "tasks": self.scheduler.snapshot(),
+        }
+
+    def _spawn(self):
+        self.generation += 1
+        self.workers = [self._start_worker() for _ in range(self.num_workers)]
+
+    def _start_worker(self):
+        worker = _Worker(self.generation)
+        worker.thread = threading.Thread(target=self._feed, args=(worker,), daemon=True)
+        worker.thread.start()
+        return worker
+
+    def _feed(self, worker):
+        """Dispatch batches to one worker process until it retires or the queues drain."""
+        while True:
+            job = self.scheduler.next_batch(lambda: worker.retiring)
+            if job is None:
+                break
+            task, batch = job
+            try:
+                worker.conn.send((task, [pending.payload for pending in batch]))
+                outcomes = worker.conn.recv()
+            except (EOFError, OSError):
+                error = InferenceUnavailable(f"Inference worker {worker.process.pid} died")
+                self.scheduler.finish(task, batch, [("error", error)] * len(batch))
+                self._replace(worker)
+                return
+            self.scheduler.finish(task, batch, outcomes)
+
+        try:
+            worker.conn.send(None)
+        except OSError:
+            pass
+        worker.process.join(STOP_TIMEOUT)
+        if worker.process.is_alive():
+            worker.process.terminate()
+
+    def _replace(self, worker):
+        logger.error(f"Inference worker {worker.process.pid} exited with {worker.process.exitcode}; replacing it")
+        worker.process.join(1)
+        with self._lock:
+            if worker in self.workers and not self.scheduler.closed:
+                self.workers[self.workers.index(worker)] = self._start_worker()
+
+    def _stop_workers(self):
+        self.scheduler.close()
+        with self._lock:
+            workers = list(self.workers)
+        for worker in workers:
+            worker.thread.join(STOP_TIMEOUT)
@@ -0,0 +1,69 @@
+import importlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Loads ML models on first use instead of at import time.
+
+    Loaders are registered as dotted paths so registering a model does not
+    import torch/timm/ultralytics. Call `warmup()` in a pre-forking master
+    (gunicorn --preload) to load weights once and share them copy-on-write
+    with every worker.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        """`loader` is a callable or a "package.module.function" path."""
+        self._loaders[name] = loader
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(name)
+            if model is None:
+                model = self._load(name)
+                self._models[name] = model
+        return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def names(self):
+        return list(self._loaders)
+
+    def warmup(self, names=None):
+        """Load the given (default: all registered) models now."""
+        for name in names or self.names():
+            self.get(name)
+
+    def unload(self, name):
+        with self._lock:
+            self._models.pop(name, None)
+
+    def _load(self, name):
+        try:
+            loader = self._loaders[name]
+        except KeyError:
+            raise KeyError(f"No model registered under {name!r}") from None
+
+        if isinstance(loader, str):
+            module_path, attr = loader.rsplit(".", 1)
+            loader = getattr(importlib.import_module(module_path), attr)
+
+        logger.info(f"Loading model {name!r} in pid {os.getpid()}")
+        return loader()
+
+
+registry = ModelRegistry()
@@ -0,0 +1,42 @@
+import os
+
+
+class OnnxSession:
+    """
+    Lazily created ONNX Runtime CPU session for a model file. Deliberately
+    free of torch imports, so ONNX-only serving paths do not load it.
+    """
+
+    def __init__(self, path, intra_op_threads=0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("ONNX Runtime backends require the onnxruntime package.") from e
+
+        self.path = path
+        self.intra_op_threads = intra_op_threads
+        self._ort = ort
+        self._session = None
+        self._pid = None
+
+    @property
+    def session(self):
+        # ONNX Runtime's thread pools do not survive fork(), so a session
+        # created in a pre-forking master is rebuilt in each worker.
+        if self._session is None or self._pid != os.getpid():
+            options = self._ort.SessionOptions()
+            options.graph_optimization_level = self._ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.intra_op_threads:
+                options.intra_op_num_threads = self.intra_op_threads
+
+            self._session = self._ort.InferenceSession(
+                self.path,
+                sess_options=options,
+                providers=["CPUExecutionProvider"],
+            )
+            self._pid = os.getpid()
+        return self._session
+
+    @property
+    def custom_metadata(self):
+        return self.session.get_modelmeta().custom_metadata_map
@@ -2,7 +2,17 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .cloudinary_service import CloudinaryService
-from rest_framework.permissions import IsAuthenticated
+from . import http_client
+from .inference import InferenceBusy
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+
+def inference_unavailable_response(error):
+    """503 for InferenceBusy (queue full) / InferenceUnavailable (model server down)."""
+    response = Response({"error": "Detection is busy, please retry shortly."},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response["Retry-After"] = "1" if isinstance(error, InferenceBusy) else "5"
+    return response
+
 
 class CloudinaryUploadView(APIView):
     permission_classes = [IsAuthenticated]
@@ -18,3 +28,11 @@ class CloudinaryUploadView(APIView):
         if url:
             return Response({"url": url}, status=status.HTTP_200_OK)
         return Response({"error": "Upload failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class OutboundHttpStatsView(APIView):
+    """Per-host latency, retries and circuit state of outbound API calls in this process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(http_client.client.stats())